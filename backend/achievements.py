@@ -0,0 +1,98 @@
+"""Compiled rule engine for the achievement catalog.
+
+The catalog is loaded once and indexed by achievement id and by the metric
+each unlock condition depends on. Metric values come from resolver functions
+registered by name, so a new kind of achievement only needs a resolver and a
+catalog entry - the endpoints never change.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# (user document, user stats) -> metric value
+MetricResolver = Callable[[Dict, Any], float]
+
+
+class AchievementEngine:
+    """Evaluates "metric >= value" unlock conditions against user metrics"""
+
+    def __init__(self, catalog: Iterable[Dict], resolvers: Optional[Dict[str, MetricResolver]] = None):
+        self.by_id: Dict[str, Dict] = {}
+        self._order: Dict[str, int] = {}
+        # metric -> parallel lists of ascending thresholds and achievement ids
+        self._thresholds: Dict[str, List[float]] = defaultdict(list)
+        self._rule_ids: Dict[str, List[str]] = defaultdict(list)
+        self.resolvers: Dict[str, MetricResolver] = dict(resolvers or {})
+        for achievement in catalog:
+            self.add_achievement(achievement)
+
+    @property
+    def catalog(self) -> List[Dict]:
+        return list(self.by_id.values())
+
+    @property
+    def metrics(self) -> List[str]:
+        return list(self._thresholds)
+
+    def register_metric(self, name: str, resolver: MetricResolver) -> None:
+        self.resolvers[name] = resolver
+
+    def add_achievement(self, achievement: Dict) -> None:
+        achievement_id = achievement['id']
+        if achievement_id in self.by_id:
+            raise ValueError(f"Duplicate achievement id: {achievement_id}")
+
+        condition = achievement['unlock_condition']
+        metric, threshold = condition['type'], condition['value']
+        thresholds = self._thresholds[metric]
+        position = bisect_right(thresholds, threshold)
+        thresholds.insert(position, threshold)
+        self._rule_ids[metric].insert(position, achievement_id)
+
+        self._order[achievement_id] = len(self._order)
+        self.by_id[achievement_id] = achievement
+
+    def get(self, achievement_id: str) -> Optional[Dict]:
+        return self.by_id.get(achievement_id)
+
+    def details(self, achievement_ids: Iterable[str]) -> List[Dict]:
+        """Catalog entries for the given ids, skipping unknown ones"""
+        return [self.by_id[a] for a in achievement_ids if a in self.by_id]
+
+    def resolve_metrics(self, user_data: Dict, stats: Any,
+                        metrics: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Compute metric values, limited to `metrics` when given"""
+        names = self.metrics if metrics is None else [m for m in metrics if m in self._thresholds]
+        values = {}
+        for name in names:
+            resolver = self.resolvers.get(name)
+            if resolver is None:
+                raise KeyError(f"No resolver registered for achievement metric '{name}'")
+            values[name] = resolver(user_data, stats)
+        return values
+
+    def evaluate(self, metric_values: Dict[str, float], earned: Iterable[str] = (),
+                 changed: Optional[Iterable[str]] = None) -> List[str]:
+        """Return newly unlocked achievement ids in catalog order.
+
+        Only rules for metrics in `changed` are considered when it is given.
+        """
+        earned = set(earned)
+        metrics = metric_values.keys() if changed is None else changed
+        unlocked: Set[str] = set()
+        for metric in metrics:
+            if metric not in metric_values or metric not in self._thresholds:
+                continue
+            # Thresholds are sorted, so every rule up to the cut-off is satisfied
+            cutoff = bisect_right(self._thresholds[metric], metric_values[metric])
+            unlocked.update(a for a in self._rule_ids[metric][:cutoff] if a not in earned)
+        return sorted(unlocked, key=self._order.__getitem__)
+
+    def evaluate_many(self, users: Iterable[Tuple[str, Dict[str, float], Iterable[str]]]) -> Dict[str, List[str]]:
+        """Batch evaluation for backfills: (user_id, metric values, earned ids) -> new ids"""
+        results = {}
+        for user_id, metric_values, earned in users:
+            new_ids = self.evaluate(metric_values, earned)
+            if new_ids:
+                results[user_id] = new_ids
+        return results
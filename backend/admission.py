@@ -0,0 +1,195 @@
+"""Admission control for LLM-bound requests.
+
+Every LLM call takes a slot from a global limit on in-flight calls. When all
+slots are busy, requests wait in one of two FIFO lanes: SOS requests use the
+priority lane, which is always served first. Each user also has a token
+bucket, so one client can't monopolise the slots. A full lane, an empty
+bucket or a wait past the queue timeout is rejected straight away with a
+retry hint, rather than letting requests pile up on the event loop.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+PRIORITY = "priority"
+NORMAL = "normal"
+
+
+class AdmissionRejected(Exception):
+    """Raised instead of queueing; `retry_after` is a hint in whole seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Consume a token; returns 0, or the seconds until one is available"""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionTicket:
+    """A held slot; release() is idempotent so every exit path can call it"""
+
+    def __init__(self, controller: "LlmAdmission"):
+        self._controller = controller
+        self._released = False
+        self.acquired_at = controller.clock()
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(self.acquired_at)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+class LlmAdmission:
+    def __init__(self, max_in_flight: int = 32, max_queue: int = 64, queue_timeout: float = 10.0,
+                 user_rate: float = 30 / 60, user_burst: float = 15,
+                 clock: Callable[[], float] = time.monotonic, metrics=None):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.clock = clock
+        self.in_flight = 0
+        self._lanes: Dict[str, Deque[asyncio.Future]] = {PRIORITY: deque(), NORMAL: deque()}
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Moving average of how long a call holds its slot, for Retry-After
+        self._hold_seconds = 1.0
+        self.admitted = 0
+        self.rejected = 0
+
+        self._wait_histogram = self._rejections = None
+        if metrics is not None:
+            self._wait_histogram = metrics.histogram(
+                "aura_llm_admission_wait_seconds", "Time LLM requests waited for a slot, by lane")
+            self._rejections = metrics.counter(
+                "aura_llm_admission_rejected_total", "LLM requests rejected by admission control")
+
+    def queued(self, lane: Optional[str] = None) -> int:
+        if lane is not None:
+            return len(self._lanes[lane])
+        return sum(len(waiters) for waiters in self._lanes.values())
+
+    def _retry_after(self) -> int:
+        backlog = (self.queued() + 1) / max(1, self.max_in_flight)
+        return max(1, math.ceil(backlog * self._hold_seconds))
+
+    def _reject(self, reason: str, lane: str, retry_after: Optional[float] = None) -> AdmissionRejected:
+        self.rejected += 1
+        if self._rejections is not None:
+            self._rejections.inc(reason=reason, lane=lane)
+        if retry_after is None:
+            return AdmissionRejected(reason, self._retry_after())
+        return AdmissionRejected(reason, max(1, math.ceil(retry_after)))
+
+    def _check_bucket(self, user_id: str, now: float) -> float:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            if len(self._buckets) >= 10000:
+                self._prune_buckets(now)
+            bucket = self._buckets[user_id] = TokenBucket(self.user_rate, self.user_burst, now)
+        return bucket.take(now)
+
+    def _prune_buckets(self, now: float) -> None:
+        # A refilled bucket is indistinguishable from a new one
+        for user_id, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.burst:
+                del self._buckets[user_id]
+
+    async def acquire(self, user_id: str, priority: bool = False) -> AdmissionTicket:
+        """Wait for a slot; raises AdmissionRejected instead of queueing past the limits
+
+        Priority (SOS) requests skip the per-user bucket: someone in crisis is
+        never told to slow down.
+        """
+        lane = PRIORITY if priority else NORMAL
+        now = self.clock()
+        if not priority:
+            wait = self._check_bucket(user_id, now)
+            if wait:
+                raise self._reject("user_rate", lane, wait)
+
+        if self.in_flight < self.max_in_flight and not self.queued():
+            return self._admit(lane, 0.0)
+
+        waiters = self._lanes[lane]
+        if len(waiters) >= self.max_queue:
+            raise self._reject("queue_full", lane)
+
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            # Not wait_for: it can swallow a cancellation that races with the handover
+            done, _ = await asyncio.wait((waiter,), timeout=self.queue_timeout)
+            if not done:
+                waiter.cancel()
+                raise self._reject("queue_timeout", lane)
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as the request was abandoned
+            if waiter.done() and not waiter.cancelled():
+                self._release(self.clock())
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in waiters:
+                waiters.remove(waiter)
+        return self._admit(lane, self.clock() - now, transferred=True)
+
+    def _admit(self, lane: str, waited: float, transferred: bool = False) -> AdmissionTicket:
+        if not transferred:
+            self.in_flight += 1
+        self.admitted += 1
+        if self._wait_histogram is not None:
+            self._wait_histogram.observe(waited, lane=lane)
+        return AdmissionTicket(self)
+
+    def _release(self, acquired_at: float) -> None:
+        self._hold_seconds = 0.9 * self._hold_seconds + 0.1 * (self.clock() - acquired_at)
+        # Hand the slot straight to the next waiter, priority lane first
+        for lane in (PRIORITY, NORMAL):
+            waiters = self._lanes[lane]
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued_priority": self.queued(PRIORITY),
+            "queued_normal": self.queued(NORMAL),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "tracked_users": len(self._buckets),
+        }
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Roll idle chat sessions into compressed chat_archive buckets.
+
+Every session with no message in the last --days days has its not yet
+archived rows written as buckets (see chat_archive.py). With --expire-raw the
+archived rows are then deleted from chat_messages. Without it they stay and
+are simply no longer read by the history endpoint, so a first run can be
+checked before anything is removed. Prints the raw BSON size of the archived
+rows against the size of the buckets that replace them.
+
+Usage (from the backend directory):
+    python archive_chat_messages.py [--days 30] [--expire-raw] [--codec zlib|zstd] [--bucket-size 500] [--dry-run]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from chat_archive import CODECS
+from server import chat_archive
+
+
+def format_bytes(count):
+    for unit in ("B", "KB", "MB"):
+        if count < 1024:
+            return f"{count:.0f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+async def run(days=30, expire_raw=False, codec="zlib", bucket_size=500, dry_run=False):
+    chat_archive.codec = codec
+    chat_archive.bucket_size = bucket_size
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+    start = time.time()
+    totals = {"sessions": 0, "messages": 0, "buckets": 0, "raw_bytes": 0, "stored_bytes": 0, "expired": 0}
+    async for user_id, session_id in chat_archive.idle_sessions(cutoff):
+        result = await chat_archive.archive_session(user_id, session_id, expire_raw=expire_raw, dry_run=dry_run)
+        totals["sessions"] += 1
+        for key, value in result.items():
+            totals[key] += value
+        if totals["sessions"] % 500 == 0:
+            print(f"  {totals['sessions']} sessions, {totals['messages']} messages archived")
+
+    raw, stored = totals["raw_bytes"], totals["stored_bytes"]
+    saved = 1 - stored / raw if raw else 0.0
+    action = "would archive" if dry_run else "archived"
+    print(f"✅ {action} {totals['messages']} messages from {totals['sessions']} sessions "
+          f"into {totals['buckets']} buckets in {time.time() - start:.1f}s")
+    print(f"   {format_bytes(raw)} of rows -> {format_bytes(stored)} of buckets ({codec}): {saved:.0%} smaller")
+    if expire_raw and not dry_run:
+        print(f"   {totals['expired']} raw rows expired from chat_messages")
+    return {**totals, "savings": saved}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive idle chat sessions into compressed buckets")
+    parser.add_argument("--days", type=int, default=30, help="archive sessions idle for at least this many days")
+    parser.add_argument("--expire-raw", action="store_true", help="delete archived rows from chat_messages")
+    parser.add_argument("--codec", choices=sorted(CODECS), default="zlib")
+    parser.add_argument("--bucket-size", type=int, default=500, help="messages per bucket")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.days, args.expire_raw, args.codec, args.bucket_size, args.dry_run))
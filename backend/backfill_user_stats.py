@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Backfill the user_stats collection from existing check-ins and award any
+achievements the rebuilt stats unlock.
+
+Usage (from the backend directory):
+    python backfill_user_stats.py            # every user with check-ins
+    python backfill_user_stats.py USER_ID... # specific users
+"""
+import asyncio
+import sys
+import time
+
+from pymongo import UpdateOne
+
+from server import db, rebuild_user_stats, achievement_engine
+
+BATCH_SIZE = 500
+
+
+async def award_batch(stats_by_user):
+    """Evaluate achievements for a batch of users and write them in one bulk call"""
+    user_docs = await db.users.find(
+        {"id": {"$in": list(stats_by_user)}},
+        {"_id": 0, "id": 1, "current_streak": 1, "achievements": 1}
+    ).to_list(None)
+
+    new_by_user = achievement_engine.evaluate_many(
+        (doc["id"],
+         achievement_engine.resolve_metrics(doc, stats_by_user[doc["id"]]),
+         doc.get("achievements", []))
+        for doc in user_docs
+    )
+    if new_by_user:
+        await db.users.bulk_write([
+            UpdateOne({"id": user_id}, {"$addToSet": {"achievements": {"$each": new_ids}}, "$inc": {"revision": 1}})
+            for user_id, new_ids in new_by_user.items()
+        ], ordered=False)
+    return sum(len(ids) for ids in new_by_user.values())
+
+
+async def backfill(user_ids=None):
+    if not user_ids:
+        user_ids = await db.checkins.distinct("user_id")
+
+    start = time.time()
+    awarded = 0
+    for offset in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[offset:offset + BATCH_SIZE]
+        stats_by_user = {}
+        for user_id in batch:
+            stats_by_user[user_id] = await rebuild_user_stats(user_id)
+        awarded += await award_batch(stats_by_user)
+        print(f"  {offset + len(batch)}/{len(user_ids)} users rebuilt")
+
+    print(f"✅ Rebuilt stats for {len(user_ids)} users and awarded {awarded} achievements in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill(sys.argv[1:]))
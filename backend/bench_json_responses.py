@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the response path for check-ins and chat history.
+
+Serves the same in-memory documents two ways through FastAPI: the old path
+(model instances re-validated against response_model, or the stdlib
+JSONResponse) and the projected FastJSONResponse path. Requests go through
+httpx's ASGI transport, so routing and serialization are measured but no
+database or network is involved.
+
+Requires httpx. Usage (from the backend directory):
+    python bench_json_responses.py [--requests 500]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+import fast_json
+from fast_json import FastJSONResponse
+from server import CheckIn, checkin_projector
+
+
+def make_checkins(count):
+    start = datetime.now(timezone.utc)
+    return [{
+        "_id": ObjectId(),
+        "id": str(uuid.uuid4()),
+        "user_id": "bench-user",
+        "date": (start - timedelta(days=i)).date().isoformat(),
+        "stayed_on_track": i % 5 != 0,
+        "mood": i % 5 + 1,
+        "had_urges": i % 3 == 0,
+        "urge_triggers": "stress" if i % 3 == 0 else None,
+        "created_at": (start - timedelta(days=i)).isoformat()
+    } for i in range(count)]
+
+
+def make_history(count):
+    start = datetime.now(timezone.utc)
+    return [{
+        "id": str(uuid.uuid4()),
+        "message_type": "ai" if i % 2 else "user",
+        "content": "I hear you. Let's make a plan for the next hour together. " * 4,
+        "personalities": ["alex", "casey"] if i % 2 else None,
+        "created_at": (start + timedelta(seconds=i)).isoformat()
+    } for i in range(count)]
+
+
+def build_app(checkins, history):
+    app = FastAPI()
+
+    @app.get("/legacy/checkins", response_model=List[CheckIn])
+    async def legacy_checkins():
+        return [CheckIn(**checkin) for checkin in checkins]
+
+    @app.get("/fast/checkins")
+    async def fast_checkins():
+        return FastJSONResponse(checkin_projector.many(checkins))
+
+    @app.get("/legacy/history")
+    async def legacy_history():
+        return JSONResponse(history)
+
+    @app.get("/fast/history")
+    async def fast_history():
+        return FastJSONResponse(history)
+
+    return app
+
+
+async def time_path(client, path, requests):
+    response = await client.get(path)
+    response.raise_for_status()
+    started = time.perf_counter()
+    for _ in range(requests):
+        await client.get(path)
+    return (time.perf_counter() - started) / requests * 1e6, len(response.content)
+
+
+async def run(args):
+    app = build_app(make_checkins(30), make_history(args.history))
+    transport = httpx.ASGITransport(app=app)
+    print(f"Encoder: {'orjson' if fast_json.orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'endpoint':<12}{'legacy µs':>12}{'fast µs':>10}{'saved µs':>10}{'bytes':>9}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in ("checkins", "history"):
+            legacy, _ = await time_path(client, f"/legacy/{name}", args.requests)
+            fast, size = await time_path(client, f"/fast/{name}", args.requests)
+            print(f"{name:<12}{legacy:>12.0f}{fast:>10.0f}{legacy - fast:>10.0f}{size:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark legacy vs projected JSON responses")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--history", type=int, default=100, help="chat messages per history page")
+    args = parser.parse_args()
+    asyncio.run(run(args))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark PersonalityClassifier against the original per-indicator scan.
+
+Usage (from the backend directory):
+    python bench_personality_classifier.py [--repeat 200]
+"""
+import argparse
+import time
+from typing import List
+
+from personality_classifier import PersonalityClassifier
+
+
+def legacy_extract_personalities(ai_response: str) -> List[str]:
+    """The original implementation, kept verbatim for comparison"""
+    personalities = []
+    if '🫂alex:' in ai_response.lower() or 'alex speaking' in ai_response.lower():
+        personalities.append('alex')
+    if '🧠casey:' in ai_response.lower() or 'casey here' in ai_response.lower():
+        personalities.append('casey')
+    if '⚡leo:' in ai_response.lower() or 'leo speaking' in ai_response.lower():
+        personalities.append('leo')
+    if not personalities:
+        response_lower = ai_response.lower()
+        alex_indicators = ['understand', 'feel', 'tough', 'okay', 'support', 'here for you', 'validated', 'courage']
+        if any(indicator in response_lower for indicator in alex_indicators):
+            personalities.append('alex')
+        casey_indicators = ['plan', 'strategy', 'analyze', 'pattern', 'trigger', 'step', 'approach', 'solution']
+        if any(indicator in response_lower for indicator in casey_indicators):
+            personalities.append('casey')
+        leo_indicators = ['amazing', 'proud', 'win', 'victory', 'strong', 'power', 'champion', 'celebrate']
+        if any(indicator in response_lower for indicator in leo_indicators):
+            personalities.append('leo')
+    if not personalities:
+        personalities = ['alex']
+    return personalities
+
+
+SAMPLES = {
+    "explicit markers": "🫂Alex: That sounds really hard. 🧠Casey: Let's look at what happened. ⚡Leo: You've got this! ",
+    "inferred tone": "Thank you for telling me. Cravings come in waves and this one will pass too. Let's make a plan. ",
+    "no indicators": "Breathe in slowly through your nose and out through your mouth, counting to four each time. ",
+}
+
+
+def time_call(func, text, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    classifier = PersonalityClassifier()
+    print(f"Classifier backend: {classifier.backend}")
+    print(f"{'sample':<18}{'chars':>9}{'legacy µs':>12}{'new µs':>10}{'speedup':>9}")
+
+    for name, sentence in SAMPLES.items():
+        for copies in (1, 20, 200):
+            text = sentence * copies
+            assert classifier.classify(text) == legacy_extract_personalities(text), name
+            legacy = time_call(legacy_extract_personalities, text, args.repeat)
+            new = time_call(classifier.classify, text, args.repeat)
+            print(f"{name:<18}{len(text):>9}{legacy:>12.1f}{new:>10.1f}{legacy / new:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
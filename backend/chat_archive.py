@@ -0,0 +1,194 @@
+"""Compressed per-session archive for old chat_messages.
+
+Sessions that have been idle for a while are rolled into bucket documents in
+chat_archive. Each bucket holds up to `bucket_size` consecutive messages of
+one session. user_id and session_id are stored once per bucket, and the rows
+themselves as one compressed JSON array of
+[created_at, id, message_type, content, personalities].
+
+A session's archived messages always come before its hot ones in
+(created_at, id) order: buckets are only cut from rows after the newest
+archived message (the high-water mark). History reads archived rows up to
+that mark and chat_messages after it, so hot rows that were archived but not
+expired yet are never returned twice. Only the buckets a page needs are
+fetched and decompressed, chosen by their stored first/last keys.
+"""
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import bson
+from pymongo import ReplaceOne
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zlib is always available
+    zstandard = None
+
+CODECS = {"zlib": (lambda data: zlib.compress(data, 9), zlib.decompress)}
+if zstandard is not None:
+    CODECS["zstd"] = (zstandard.ZstdCompressor(level=19).compress,
+                      lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+
+def message_key(message: Dict) -> Tuple[str, str]:
+    return message["created_at"], message["id"]
+
+
+def after_key_filter(created_at: str, message_id: str) -> Dict:
+    """Messages strictly after (created_at, id)"""
+    return {"$or": [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, "id": {"$gt": message_id}}
+    ]}
+
+
+class ChatArchive:
+    def __init__(self, db, bucket_size: int = 500, codec: str = "zlib",
+                 summarize_through: Optional[Callable[[str, str, Dict], Awaitable[None]]] = None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown or unavailable codec: {codec}")
+        self.db = db
+        self.bucket_size = bucket_size
+        self.codec = codec
+        # Folds the session's context up to a key into its summary before raw rows go
+        self.summarize_through = summarize_through
+
+    async def _buckets(self, user_id: str, session_id: str, projection: Optional[Dict] = None) -> List[Dict]:
+        return await self.db.chat_archive.find(
+            {"user_id": user_id, "session_id": session_id}, projection
+        ).sort([("first.created_at", 1), ("first.id", 1)]).to_list(length=None)
+
+    @staticmethod
+    def _decode(bucket: Dict) -> List[Dict]:
+        rows = json.loads(CODECS[bucket["codec"]][1](bucket["data"]))
+        return [
+            {"id": message_id, "message_type": message_type, "content": content,
+             "personalities": personalities, "created_at": created_at}
+            for created_at, message_id, message_type, content, personalities in rows
+        ]
+
+    async def bucket_heads(self, user_id: str, session_id: str) -> List[Dict]:
+        """_id, first and last key of each bucket, in order, without the compressed rows"""
+        return await self._buckets(user_id, session_id, {"first": 1, "last": 1})
+
+    async def _load(self, head: Dict) -> List[Dict]:
+        bucket = await self.db.chat_archive.find_one({"_id": head["_id"]}, {"codec": 1, "data": 1})
+        return self._decode(bucket) if bucket else []
+
+    async def iter_messages(self, heads: List[Dict], after: Optional[Tuple[str, str]] = None,
+                            before: Optional[Tuple[str, str]] = None) -> AsyncIterator[Dict]:
+        """Archived messages strictly between the keys, oldest first, one bucket decoded at a time"""
+        for head in heads:
+            if after is not None and message_key(head["last"]) <= after:
+                continue
+            if before is not None and message_key(head["first"]) >= before:
+                return
+            for message in await self._load(head):
+                key = message_key(message)
+                if (after is None or key > after) and (before is None or key < before):
+                    yield message
+
+    async def messages_after(self, heads: List[Dict], after: Optional[Tuple[str, str]], count: int) -> List[Dict]:
+        """Up to `count` archived messages after the key, oldest first"""
+        found = []
+        async for message in self.iter_messages(heads, after=after):
+            found.append(message)
+            if len(found) == count:
+                break
+        return found
+
+    async def messages_before(self, heads: List[Dict], before: Optional[Tuple[str, str]], count: int) -> List[Dict]:
+        """Up to `count` archived messages before the key, newest first"""
+        found = []
+        for head in reversed(heads):
+            if before is not None and message_key(head["first"]) >= before:
+                continue
+            for message in reversed(await self._load(head)):
+                if before is None or message_key(message) < before:
+                    found.append(message)
+                    if len(found) == count:
+                        return found
+        return found
+
+    async def high_water(self, user_id: str, session_id: str) -> Optional[Dict]:
+        bucket = await self.db.chat_archive.find_one(
+            {"user_id": user_id, "session_id": session_id}, {"_id": 0, "last": 1},
+            sort=[("last.created_at", -1), ("last.id", -1)]
+        )
+        return bucket["last"] if bucket else None
+
+    async def idle_sessions(self, cutoff: datetime) -> AsyncIterator[Tuple[str, str]]:
+        """(user_id, session_id) of sessions with hot rows and no message since `cutoff`"""
+        pipeline = [
+            {"$group": {"_id": {"user_id": "$user_id", "session_id": "$session_id"},
+                        "last": {"$max": "$created_at"}}},
+            {"$match": {"last": {"$lt": cutoff.isoformat()}}},
+        ]
+        async for group in self.db.chat_messages.aggregate(pipeline, allowDiskUse=True):
+            yield group["_id"]["user_id"], group["_id"]["session_id"]
+
+    def _bucket(self, user_id: str, session_id: str, rows: List[Dict]) -> Dict:
+        compact = [
+            [row["created_at"], row["id"], row["message_type"], row["content"], row.get("personalities")]
+            for row in rows
+        ]
+        first, last = rows[0], rows[-1]
+        return {
+            # Derived from the contents, so a re-run after a crash overwrites instead of duplicating
+            "_id": f"{user_id}:{session_id}:{first['created_at']}:{first['id']}",
+            "user_id": user_id,
+            "session_id": session_id,
+            "first": {"created_at": first["created_at"], "id": first["id"]},
+            "last": {"created_at": last["created_at"], "id": last["id"]},
+            "count": len(rows),
+            "codec": self.codec,
+            "data": bson.Binary(CODECS[self.codec][0](json.dumps(compact, separators=(",", ":")).encode("utf-8"))),
+            "archived_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    async def archive_session(self, user_id: str, session_id: str, expire_raw: bool = False,
+                              dry_run: bool = False) -> Dict:
+        """Bucket the session's rows past the high-water mark; returns message and byte counts"""
+        query = {"user_id": user_id, "session_id": session_id}
+        mark = await self.high_water(user_id, session_id)
+        if mark:
+            query.update(after_key_filter(mark["created_at"], mark["id"]))
+        rows = await self.db.chat_messages.find(query).sort([("created_at", 1), ("id", 1)]).to_list(length=None)
+
+        buckets = [
+            self._bucket(user_id, session_id, rows[start:start + self.bucket_size])
+            for start in range(0, len(rows), self.bucket_size)
+        ]
+        result = {
+            "messages": len(rows),
+            "buckets": len(buckets),
+            "raw_bytes": sum(len(bson.encode(row)) for row in rows),
+            "stored_bytes": sum(len(bson.encode(bucket)) for bucket in buckets),
+            "expired": 0,
+        }
+        if dry_run:
+            return result
+
+        if buckets:
+            await self.db.chat_archive.bulk_write(
+                [ReplaceOne({"_id": bucket["_id"]}, bucket, upsert=True) for bucket in buckets], ordered=True
+            )
+        if expire_raw:
+            # Conversation context reads only chat_messages, so whatever it hasn't
+            # summarized yet is folded in before the rows disappear
+            mark = buckets[-1]["last"] if buckets else mark
+            if mark and self.summarize_through is not None:
+                await self.summarize_through(user_id, session_id, mark)
+            # Only rows whose id is in a written bucket are removed
+            archived_ids = [
+                message["id"] for bucket in await self._buckets(user_id, session_id)
+                for message in self._decode(bucket)
+            ]
+            for start in range(0, len(archived_ids), 1000):
+                deleted = await self.db.chat_messages.delete_many(
+                    {"user_id": user_id, "session_id": session_id, "id": {"$in": archived_ids[start:start + 1000]}}
+                )
+                result["expired"] += deleted.deleted_count
+        return result
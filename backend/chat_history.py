@@ -0,0 +1,112 @@
+"""Keyset-paged reads of a chat session's history.
+
+Messages are ordered by (created_at, id); id breaks created_at ties, so a
+cursor names exactly one position. Cursors are the url-safe base64 JSON of
+that key. Archived messages (chat_archive.py) always precede the hot rows in
+chat_messages, so a read takes archived rows first and hot rows after the
+newest archived key.
+"""
+import base64
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from chat_archive import ChatArchive, after_key_filter, message_key
+
+# Fields the chat UI renders; user_id and session_id are already in the URL
+CHAT_HISTORY_PROJECTION = {"_id": 0, "id": 1, "message_type": 1, "content": 1, "personalities": 1, "created_at": 1}
+
+
+def encode_history_cursor(message: Dict) -> str:
+    raw = json.dumps([message["created_at"], message["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(created_at), str(message_id)
+    except Exception:
+        raise ValueError("Invalid history cursor")
+
+
+def history_keyset_filter(key: Tuple[str, str], direction: str) -> Dict:
+    """Messages strictly before/after the key in (created_at, id) order"""
+    created_at, message_id = key
+    op = "$lt" if direction == "before" else "$gt"
+    return {"$or": [
+        {"created_at": {op: created_at}},
+        {"created_at": created_at, "id": {op: message_id}}
+    ]}
+
+
+class ChatHistory:
+    def __init__(self, db, archive: ChatArchive):
+        self.db = db
+        self.archive = archive
+
+    def _query(self, user_id: str, session_id: str, heads: List[Dict],
+               before: Optional[Tuple[str, str]], after: Optional[Tuple[str, str]]) -> Dict:
+        filters = []
+        if heads:
+            filters.append(after_key_filter(*message_key(heads[-1]["last"])))
+        if before:
+            filters.append(history_keyset_filter(before, "before"))
+        elif after:
+            filters.append(history_keyset_filter(after, "after"))
+        query = {"user_id": user_id, "session_id": session_id}
+        if len(filters) == 1:
+            query.update(filters[0])
+        elif filters:
+            query["$and"] = filters
+        return query
+
+    async def page(self, user_id: str, session_id: str, limit: int,
+                   before: Optional[Tuple[str, str]] = None,
+                   after: Optional[Tuple[str, str]] = None) -> Tuple[List[Dict], Dict[str, str]]:
+        """Up to `limit` messages, oldest first, and the X-Prev-Cursor / X-Next-Cursor headers.
+
+        Walks backwards from `before`, forwards from `after` or the start.
+        """
+        heads = await self.archive.bucket_heads(user_id, session_id)
+        query = self._query(user_id, session_id, heads, before, after)
+        # Fetch one extra to detect more
+        if before:
+            messages = await self.db.chat_messages.find(query, CHAT_HISTORY_PROJECTION).sort(
+                [("created_at", -1), ("id", -1)]
+            ).to_list(length=limit + 1)
+            missing = limit + 1 - len(messages)
+            if missing > 0 and heads:
+                messages.extend(await self.archive.messages_before(heads, before, missing))
+        else:
+            messages = await self.archive.messages_after(heads, after, limit + 1) if heads else []
+            missing = limit + 1 - len(messages)
+            if missing > 0:
+                messages.extend(await self.db.chat_messages.find(query, CHAT_HISTORY_PROJECTION).sort(
+                    [("created_at", 1), ("id", 1)]
+                ).to_list(length=missing))
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        if before:
+            messages.reverse()
+
+        headers = {}
+        if messages:
+            # Older messages exist when paging back found extras or we started after a cursor
+            if (before and has_more) or after:
+                headers["X-Prev-Cursor"] = encode_history_cursor(messages[0])
+            if (not before and has_more) or before:
+                headers["X-Next-Cursor"] = encode_history_cursor(messages[-1])
+        return messages, headers
+
+    async def iter_messages(self, user_id: str, session_id: str,
+                            before: Optional[Tuple[str, str]] = None,
+                            after: Optional[Tuple[str, str]] = None) -> AsyncIterator[Dict]:
+        """Every message between the keys, oldest first, without buffering"""
+        heads = await self.archive.bucket_heads(user_id, session_id)
+        cursor = self.db.chat_messages.find(
+            self._query(user_id, session_id, heads, before, after), CHAT_HISTORY_PROJECTION
+        ).sort([("created_at", 1), ("id", 1)])
+        async for message in self.archive.iter_messages(heads, after=after, before=before):
+            yield message
+        async for message in cursor:
+            yield message
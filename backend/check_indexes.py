@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Report the query plan for every query shape the API issues.
+
+Usage (from the backend directory):
+    python check_indexes.py            # explain only
+    python check_indexes.py --ensure   # create missing indexes first
+
+Exits with status 1 if any query still needs a collection scan.
+"""
+import asyncio
+import sys
+
+from db_indexes import ensure_indexes, explain_query_shapes
+from server import db
+
+
+async def main(ensure: bool) -> int:
+    if ensure:
+        await ensure_indexes(db)
+
+    scans = 0
+    for entry in await explain_query_shapes(db):
+        if entry["collection_scan"]:
+            scans += 1
+            status = "❌ COLLSCAN"
+        elif entry["in_memory_sort"]:
+            status = "⚠️  SORT"
+        else:
+            status = "✅ INDEXED"
+        print(f"{status}: {entry['collection']} - {entry['query']} ({' <- '.join(entry['stages'])})")
+
+    print()
+    print(f"{scans} query shape(s) need a collection scan" if scans else "All query shapes use an index")
+    return 1 if scans else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main("--ensure" in sys.argv[1:])))
@@ -0,0 +1,178 @@
+"""Bounded conversation context for LLM calls.
+
+Sessions can run for weeks, so sending the whole history would grow prompt
+size, latency and cost without limit. Each call gets at most the last N
+messages verbatim plus a rolling summary of everything older. The summary is
+stored per session and extended incrementally: only messages that have just
+left the verbatim window are folded in. The total stays under a token budget
+measured with a local tokenizer approximation.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from metrics import estimate_tokens
+
+# (current summary, messages to fold in oldest first, max tokens) -> new summary
+Summarizer = Callable[[str, List[Dict], int], Awaitable[str]]
+
+SPEAKERS = {"user": "User", "ai": "Aura"}
+
+
+def format_message(message: Dict) -> str:
+    return f"{SPEAKERS.get(message.get('message_type'), 'User')}: {message.get('content', '')}"
+
+
+class LocalSummarizer:
+    """Extractive summarizer that needs no network access.
+
+    Each folded message becomes one bullet holding its first sentence, capped
+    in length. When the summary outgrows its budget the oldest bullets go first.
+    """
+
+    def __init__(self, tokenizer: Callable[[str], int] = estimate_tokens, max_bullet_chars: int = 160):
+        self.tokenizer = tokenizer
+        self.max_bullet_chars = max_bullet_chars
+
+    def _bullet(self, message: Dict) -> str:
+        content = " ".join(message.get("content", "").split())
+        for end in (". ", "? ", "! "):
+            if end in content:
+                content = content[:content.index(end) + 1]
+                break
+        if len(content) > self.max_bullet_chars:
+            content = content[:self.max_bullet_chars - 1].rstrip() + "…"
+        return f"- {SPEAKERS.get(message.get('message_type'), 'User')}: {content}"
+
+    async def __call__(self, summary: str, messages: List[Dict], max_tokens: int) -> str:
+        bullets = [line for line in summary.splitlines() if line.strip()]
+        bullets.extend(self._bullet(m) for m in messages)
+        while bullets and self.tokenizer("\n".join(bullets)) > max_tokens:
+            bullets.pop(0)
+        return "\n".join(bullets)
+
+
+@dataclass
+class ContextWindow:
+    summary: str = ""
+    recent: List[Dict] = field(default_factory=list)
+
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"CONVERSATION SUMMARY (earlier in this session):\n{self.summary}")
+        if self.recent:
+            parts.append("RECENT CONVERSATION:\n" + "\n".join(format_message(m) for m in self.recent))
+        return "\n\n".join(parts)
+
+
+class ConversationContextManager:
+    def __init__(self, db, keep_messages: int = 10, token_budget: int = 2000,
+                 summary_share: float = 0.3, max_fold: int = 50,
+                 summarizer: Optional[Summarizer] = None,
+                 tokenizer: Callable[[str], int] = estimate_tokens):
+        self.db = db
+        self.keep_messages = keep_messages
+        self.token_budget = token_budget
+        self.summary_share = summary_share
+        self.max_fold = max_fold
+        self.tokenizer = tokenizer
+        self.summarizer = summarizer or LocalSummarizer(tokenizer)
+
+    def _unsummarized_query(self, user_id: str, session_id: str, through: Optional[Dict]) -> Dict:
+        query = {"user_id": user_id, "session_id": session_id}
+        if through:
+            query["$or"] = [
+                {"created_at": {"$gt": through["created_at"]}},
+                {"created_at": through["created_at"], "id": {"$gt": through["id"]}}
+            ]
+        return query
+
+    async def summarize_through(self, user_id: str, session_id: str, mark: Dict) -> None:
+        """Fold every unsummarized message up to and including `mark` into the stored summary.
+
+        Called before those rows are removed from chat_messages (see
+        chat_archive.py), so a resumed session keeps their gist.
+        """
+        summary_budget = int(self.token_budget * self.summary_share)
+        up_to_mark = {"$or": [
+            {"created_at": {"$lt": mark["created_at"]}},
+            {"created_at": mark["created_at"], "id": {"$lte": mark["id"]}}
+        ]}
+        while True:
+            state = await self.db.chat_summaries.find_one(
+                {"user_id": user_id, "session_id": session_id}, {"_id": 0}
+            ) or {}
+            query = self._unsummarized_query(user_id, session_id, state.get("through"))
+            query = {"$and": [query, up_to_mark]}
+            batch = await self.db.chat_messages.find(
+                query, {"_id": 0, "id": 1, "message_type": 1, "content": 1, "created_at": 1}
+            ).sort([("created_at", 1), ("id", 1)]).to_list(length=self.max_fold)
+            if not batch:
+                return
+            last = batch[-1]
+            await self.db.chat_summaries.update_one(
+                {"user_id": user_id, "session_id": session_id},
+                {"$set": {
+                    "summary": await self.summarizer(state.get("summary", ""), batch, summary_budget),
+                    "through": {"created_at": last["created_at"], "id": last["id"]},
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                }},
+                upsert=True
+            )
+
+    async def build(self, user_id: str, session_id: str, reserved_tokens: int = 0) -> ContextWindow:
+        """Context for the next call, folding overflow into the stored summary.
+
+        What is folded and stored depends only on the fixed budgets, never on
+        this call: `reserved_tokens` (the system message and new user message)
+        only trims the window rendered for this call, so one long message can't
+        shrink the stored summary.
+        """
+        summary_budget = int(self.token_budget * self.summary_share)
+        recent_budget = self.token_budget - summary_budget
+
+        state = await self.db.chat_summaries.find_one(
+            {"user_id": user_id, "session_id": session_id}, {"_id": 0}
+        ) or {}
+        summary = state.get("summary", "")
+
+        # Newest unsummarized messages; anything beyond max_fold older than the
+        # verbatim window is skipped rather than loaded
+        newest = await self.db.chat_messages.find(
+            self._unsummarized_query(user_id, session_id, state.get("through")),
+            {"_id": 0, "id": 1, "message_type": 1, "content": 1, "created_at": 1}
+        ).sort([("created_at", -1), ("id", -1)]).to_list(length=self.keep_messages + self.max_fold)
+        newest.reverse()
+
+        fold = newest[:-self.keep_messages] if len(newest) > self.keep_messages else []
+        recent = newest[len(fold):]
+
+        def recent_tokens():
+            return sum(self.tokenizer(format_message(m)) for m in recent)
+
+        # Verbatim messages that don't fit their share are summarized for good
+        while recent and recent_tokens() > recent_budget:
+            fold.append(recent.pop(0))
+
+        if fold:
+            summary = await self.summarizer(summary, fold, summary_budget)
+            last = fold[-1]
+            await self.db.chat_summaries.update_one(
+                {"user_id": user_id, "session_id": session_id},
+                {"$set": {
+                    "summary": summary,
+                    "through": {"created_at": last["created_at"], "id": last["id"]},
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                }},
+                upsert=True
+            )
+
+        # Fit this call only: drop the oldest messages, then the oldest summary lines
+        available = max(0, self.token_budget - reserved_tokens)
+        while recent and self.tokenizer(summary) + recent_tokens() > available:
+            recent.pop(0)
+        lines = summary.splitlines()
+        while lines and self.tokenizer("\n".join(lines)) > available:
+            lines.pop(0)
+        return ContextWindow(summary="\n".join(lines), recent=recent)
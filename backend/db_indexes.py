@@ -0,0 +1,122 @@
+"""MongoDB index declarations and query-plan diagnostics.
+
+INDEXES lists the indexes every hot query relies on and is applied at startup.
+QUERY_SHAPES mirrors the queries the API issues, so explain_query_shapes() can
+flag any that would fall back to a collection scan.
+"""
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "checkins": [
+        # Per-user history (newest first) and weekly windows on created_at
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+    ],
+    "chat_messages": [
+        # id breaks created_at ties for keyset pagination
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)],
+                   name="user_session_created_id"),
+        # Lets replayed write-behind inserts be rejected as duplicates
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "user_stats": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "chat_archive": [
+        # Buckets of one session in order; the high-water lookup sorts on last
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING), ("first.created_at", ASCENDING),
+                    ("first.id", ASCENDING)], name="user_session_first"),
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING), ("last.created_at", DESCENDING),
+                    ("last.id", DESCENDING)], name="user_session_last"),
+    ],
+    "chat_summaries": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING)], name="user_session_unique", unique=True),
+    ],
+    "weekly_reports": [
+        # Guards the versioned report upsert; legacy duplicates are removed first
+        IndexModel([("user_id", ASCENDING), ("week_start", ASCENDING)], name="user_week_unique", unique=True),
+    ],
+}
+
+# Unique index name -> its key fields, for indexes older deployments may hold duplicates for
+DEDUPE_BEFORE_UNIQUE: Dict[str, Dict[str, List[str]]] = {
+    "weekly_reports": {"user_week_unique": ["user_id", "week_start"]},
+}
+
+# name -> (collection, filter, sort) for every query the endpoints run
+QUERY_SHAPES = {
+    "user by id": ("users", {"id": "x"}, None),
+    "recent checkins": ("checkins", {"user_id": "x"}, [("created_at", DESCENDING)]),
+    "weekly checkins": ("checkins", {"user_id": "x", "created_at": {"$gte": "2024-01-01"}}, None),
+    "chat history": ("chat_messages", {"user_id": "x", "session_id": "y"}, [("created_at", ASCENDING), ("id", ASCENDING)]),
+    "chat history page": ("chat_messages", {
+        "user_id": "x", "session_id": "y",
+        "$or": [{"created_at": {"$lt": "2024-01-01"}}, {"created_at": "2024-01-01", "id": {"$lt": "z"}}]
+    }, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    "chat archive": ("chat_archive", {"user_id": "x", "session_id": "y"},
+                     [("first.created_at", ASCENDING), ("first.id", ASCENDING)]),
+    "user stats": ("user_stats", {"user_id": "x"}, None),
+    "chat summary": ("chat_summaries", {"user_id": "x", "session_id": "y"}, None),
+    "weekly report": ("weekly_reports", {"user_id": "x", "week_start": "2024-01-01", "stale": False}, None),
+}
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create any missing indexes, deduplicating first where a unique one is new; others are left untouched"""
+    for collection, unique in DEDUPE_BEFORE_UNIQUE.items():
+        existing = await db[collection].index_information()
+        for name, fields in unique.items():
+            if name not in existing:
+                await remove_duplicates(db[collection], fields)
+    created = {}
+    for collection, indexes in INDEXES.items():
+        created[collection] = await db[collection].create_indexes(indexes)
+    return created
+
+
+async def remove_duplicates(collection, fields: List[str]) -> int:
+    """Keep the most recently inserted document per combination of `fields`; returns how many were deleted"""
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": {field: f"${field}" for field in fields}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    deleted = 0
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        result = await collection.delete_many({"_id": {"$in": group["ids"][:-1]}})
+        deleted += result.deleted_count
+    return deleted
+
+
+def _plan_stages(plan: Dict) -> List[str]:
+    """Flatten a winningPlan tree into its stage names"""
+    stages = [plan.get("stage", "?")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+async def explain_query_shapes(db) -> List[Dict]:
+    """Run explain() on each query shape and report the winning plan"""
+    report = []
+    for name, (collection, query, sort) in QUERY_SHAPES.items():
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        stages = _plan_stages(explanation.get("queryPlanner", {}).get("winningPlan", {}))
+        report.append({
+            "query": name,
+            "collection": collection,
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages,
+            "in_memory_sort": "SORT" in stages,
+        })
+    return report
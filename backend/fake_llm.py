@@ -0,0 +1,75 @@
+"""Local stand-in for the Emergent LlmChat client.
+
+Enabled with AURA_FAKE_LLM=1 so the chat endpoints can be exercised without
+network access or an API key. Replies are deterministic and streamed in small
+chunks, which makes the streaming endpoints easy to test.
+AURA_FAKE_LLM_LATENCY sets the delay in seconds before the first chunk, to
+model provider latency in load tests.
+
+Faults can be injected to exercise deadlines, hedging and the circuit breaker:
+AURA_FAKE_LLM_FAILURE_RATE is the share of calls that raise FakeLlmError,
+AURA_FAKE_LLM_STALL_RATE the share that hang for AURA_FAKE_LLM_STALL_SECONDS
+before answering. AURA_FAKE_LLM_SEED makes the fault sequence repeatable.
+"""
+import asyncio
+import os
+import random
+from typing import AsyncIterator, List, Optional
+
+DEFAULT_REPLY = (
+    "🫂Alex: It sounds tough, and thank you for sharing this with me. "
+    "🧠Casey: Let's break this down into one concrete step you can take right now. "
+    "⚡Leo: You're building something amazing - keep going!"
+)
+
+# Shared so the fault sequence is repeatable across pooled clients
+_fault_rng = random.Random(os.environ.get('AURA_FAKE_LLM_SEED'))
+
+
+class FakeLlmError(RuntimeError):
+    """Injected provider failure"""
+
+
+class FakeLlmChat:
+    """Mimics the LlmChat interface used by server.py"""
+
+    def __init__(self, api_key: Optional[str] = None, session_id: Optional[str] = None,
+                 system_message: str = "", reply: str = DEFAULT_REPLY,
+                 chunk_size: int = 8, chunk_delay: float = 0.0, latency: Optional[float] = None,
+                 failure_rate: Optional[float] = None, stall_rate: Optional[float] = None,
+                 stall_seconds: Optional[float] = None):
+        self.api_key = api_key
+        self.session_id = session_id
+        self.system_message = system_message
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        if latency is None:
+            latency = float(os.environ.get('AURA_FAKE_LLM_LATENCY', '0'))
+        self.latency = latency
+        self.failure_rate = failure_rate if failure_rate is not None else float(os.environ.get('AURA_FAKE_LLM_FAILURE_RATE', '0'))
+        self.stall_rate = stall_rate if stall_rate is not None else float(os.environ.get('AURA_FAKE_LLM_STALL_RATE', '0'))
+        self.stall_seconds = stall_seconds if stall_seconds is not None else float(os.environ.get('AURA_FAKE_LLM_STALL_SECONDS', '60'))
+        self.messages: List[str] = []
+
+    def with_model(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        return self
+
+    async def stream_message(self, user_message) -> AsyncIterator[str]:
+        """Yield the reply a few characters at a time"""
+        self.messages.append(user_message.text)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.stall_rate and _fault_rng.random() < self.stall_rate:
+            await asyncio.sleep(self.stall_seconds)
+        if self.failure_rate and _fault_rng.random() < self.failure_rate:
+            raise FakeLlmError("Injected LLM failure")
+        for start in range(0, len(self.reply), self.chunk_size):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield self.reply[start:start + self.chunk_size]
+
+    async def send_message(self, user_message) -> str:
+        return "".join([chunk async for chunk in self.stream_message(user_message)])
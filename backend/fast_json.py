@@ -0,0 +1,71 @@
+"""Response-side JSON helpers that skip Pydantic revalidation.
+
+Documents read back from Mongo were validated by their model when they were
+written, so responses only need the model's fields (with defaults filled in
+for rows written before a field existed) and a fast encoder. Inbound request
+bodies still go through full model validation.
+
+orjson is used when installed (pip install orjson); otherwise the stdlib
+encoder is used with compact separators.
+"""
+import json
+from typing import Any, Dict, Iterable, List, Type
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(content: Any) -> str:
+    return dumps(content).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class DocumentProjector:
+    """Pre-built projection of stored documents onto a model's fields
+
+    `projection` is the Mongo projection that fetches exactly those fields;
+    calling the projector fills missing fields from the model defaults
+    without validating anything.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        self.projection = {"_id": 0, **{name: 1 for name in self.fields}}
+        self._defaults = {}
+        self._factories = {}
+        for name, info in model.model_fields.items():
+            if info.default_factory is not None:
+                self._factories[name] = info.default_factory
+            elif not info.is_required():
+                self._defaults[name] = info.default
+
+    def __call__(self, doc: Dict) -> Dict:
+        projected = {name: doc[name] for name in self.fields if name in doc}
+        if len(projected) != len(self.fields):
+            for name, default in self._defaults.items():
+                projected.setdefault(name, default)
+            for name, factory in self._factories.items():
+                if name not in projected:
+                    projected[name] = factory()
+        return projected
+
+    def many(self, docs: Iterable[Dict]) -> List[Dict]:
+        return [self(doc) for doc in docs]
@@ -0,0 +1,124 @@
+"""Galaxy visualization payloads.
+
+Each day of the current streak is a star. Stars only depend on their day,
+so the whole table (capped at MAX_STARS) is built once at import and
+responses slice it. Clients that already hold the first N stars can pass
+since_day=N and receive only the newer ones; star_offset in the payload says
+where the returned stars start (0 means "replace what you have").
+"""
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+MAX_STARS = 365  # Cap at 365 for performance
+
+CONSTELLATION_MILESTONES = (7, 14, 30, 60, 90, 180, 365)
+CONSTELLATION_NAMES = (
+    "Determination",
+    "Strength",
+    "Resilience",
+    "Wisdom",
+    "Transformation",
+    "Mastery",
+    "Transcendence",
+    "Infinity",  # past the last milestone
+)
+
+
+def constellation_index(day: int) -> int:
+    """Index into CONSTELLATION_NAMES of the first milestone at or after day"""
+    return bisect_left(CONSTELLATION_MILESTONES, day)
+
+
+def get_constellation_name(day: int) -> Optional[str]:
+    """Get constellation name for specific day milestones"""
+    return CONSTELLATION_NAMES[constellation_index(day)]
+
+
+def _build_star_table():
+    stars = []
+    brightness = []
+    constellations = []
+    for day in range(1, MAX_STARS + 1):
+        value = min(1.0, (day - 1) / 100)  # Stars get brighter over time
+        index = constellation_index(day)
+        stars.append({
+            "day": day,
+            "brightness": value,
+            "constellation": CONSTELLATION_NAMES[index],
+            "achieved": True
+        })
+        brightness.append(value)
+        constellations.append(index)
+    return tuple(stars), tuple(brightness), tuple(constellations)
+
+
+# STAR_TABLE[i] is the star for day i + 1; the compact columns mirror it
+STAR_TABLE, STAR_BRIGHTNESS, STAR_CONSTELLATIONS = _build_star_table()
+
+
+def get_unlocked_constellations(streak: int) -> List[str]:
+    """Get list of constellation names unlocked by current streak"""
+    return list(_unlocked_constellations(min(streak, MAX_STARS)))
+
+
+@lru_cache(maxsize=None)
+def _unlocked_constellations(streak: int):
+    return CONSTELLATION_NAMES[:bisect_right(CONSTELLATION_MILESTONES, streak)]
+
+
+def get_next_constellation(streak: int) -> Optional[Dict]:
+    """Get info about the next constellation to unlock"""
+    index = bisect_right(CONSTELLATION_MILESTONES, streak)
+    if index == len(CONSTELLATION_MILESTONES):
+        return None
+    milestone = CONSTELLATION_MILESTONES[index]
+    return {
+        "name": CONSTELLATION_NAMES[index],
+        "days_needed": milestone - streak,
+        "milestone": milestone
+    }
+
+
+def star_offset(streak: int, since_day: Optional[int]) -> int:
+    """Index of the first star a response with this since_day includes"""
+    star_count = max(0, min(streak, MAX_STARS))
+    return since_day if since_day is not None and 0 <= since_day <= star_count else 0
+
+
+def galaxy_etag(streak: int, total_days: int, compact: bool = False, since_day: Optional[int] = None) -> str:
+    """Weak validator for the galaxy body; deltas starting at different stars get different tags"""
+    offset = star_offset(streak, since_day)
+    return f'W/"galaxy-{streak}-{total_days}{f"-s{offset}" if offset else ""}{"-c" if compact else ""}"'
+
+
+def get_galaxy_progress_data(streak: int, total_days: int, achievements: List[str],
+                             since_day: Optional[int] = None, compact: bool = False) -> Dict:
+    """Generate galaxy visualization data based on user progress
+
+    since_day: number of leading stars the client already has. If the streak
+    has since dropped below it the full (shorter) star list is returned.
+    compact: return the stars as parallel brightness/constellation columns
+    instead of one dict per star.
+    """
+    star_count = max(0, min(streak, MAX_STARS))
+    offset = star_offset(streak, since_day)
+
+    galaxy = {
+        "star_offset": offset,
+        # Calculate galaxy level based on total progress
+        "galaxy_level": min(10, max(1, (total_days // 30) + 1)),
+        "constellations_unlocked": get_unlocked_constellations(streak),
+        "next_constellation": get_next_constellation(streak),
+        "total_light_years": total_days * 10  # Fun metric
+    }
+    if compact:
+        galaxy["star_table"] = {
+            "first_day": offset + 1,
+            "brightness": STAR_BRIGHTNESS[offset:star_count],
+            "constellation": STAR_CONSTELLATIONS[offset:star_count],
+        }
+        galaxy["constellation_names"] = CONSTELLATION_NAMES
+    else:
+        galaxy["stars"] = STAR_TABLE[offset:star_count]
+    return galaxy
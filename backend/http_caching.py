@@ -0,0 +1,30 @@
+"""Conditional GET helpers: weak ETags, If-None-Match matching and 304 responses."""
+from typing import Dict, Optional
+
+from fastapi import Response
+
+# Per-user resources are revalidated on every poll; the catalog only changes on deploy
+USER_CACHE_CONTROL = "private, no-cache"
+CATALOG_CACHE_CONTROL = "public, max-age=86400"
+
+
+def user_etag(user_doc: Dict, resource: str, *variant) -> str:
+    """Weak ETag from the user's revision counter, bumped on check-in, relapse and award"""
+    parts = (resource, user_doc.get('revision', 0)) + variant
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match header (list or *)"""
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str, cache_control: str = USER_CACHE_CONTROL) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
@@ -0,0 +1,67 @@
+"""Per-user push channel behind the /ws/users/{id} WebSocket.
+
+State changes are published once on a pub/sub channel. Each worker holds a
+single subscription and fans events out to the sockets it has open for that
+user, so an event reaches a dashboard whichever worker made the change
+(given a cross-worker pub/sub backend such as MongoPubSub).
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Set
+
+logger = logging.getLogger(__name__)
+
+UPDATES_CHANNEL = "users:updates"
+
+
+class LiveUpdates:
+    """Routes published user events to the local subscriber queues"""
+
+    def __init__(self, pubsub, queue_size: int = 64):
+        self.pubsub = pubsub
+        self.queue_size = queue_size
+        self._queues: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        pubsub.subscribe(UPDATES_CHANNEL, self._on_update)
+
+    def connect(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues[user_id].add(queue)
+        return queue
+
+    def disconnect(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._queues.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._queues[user_id]
+
+    async def publish(self, user_id: str, event: Dict) -> None:
+        """Send `event` to every open socket for the user, on any worker"""
+        self.published += 1
+        try:
+            await self.pubsub.publish(UPDATES_CHANNEL, {"user_id": user_id, "event": event})
+        except Exception as e:
+            # Live updates are best effort; clients still converge on their next fetch
+            logger.error(f"Publishing live update for {user_id} failed: {e}")
+
+    def _on_update(self, message: Dict) -> None:
+        for queue in self._queues.get(message["user_id"], ()):
+            if queue.full():
+                # A stalled client loses its oldest event rather than blocking fan-out
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message["event"])
+            self.delivered += 1
+
+    def stats(self) -> Dict:
+        return {
+            "users": len(self._queues),
+            "connections": sum(len(queues) for queues in self._queues.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,129 @@
+"""Bounded pool of reusable LLM chat sessions.
+
+Creating an LlmChat per request repeats client setup on every call, and a
+client keeps the turns it has handled in its own history. The pool keeps one
+chat per session_id so follow-up turns reuse that history instead of
+re-rendering it. A pooled chat is keyed by its context key (the static prompt
+plus the user block, which only changes when the user's stats do), not by the
+stored conversation, and is rebuilt after `max_turns` turns, or once its
+system prompt plus the turns it has carried would exceed `token_budget`, so
+the history it sends stays bounded. Sessions idle too long are evicted and the number of
+live clients is capped, dropping the least recently used first.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+
+@dataclass
+class _PooledSession:
+    chat: Any
+    context_key: str
+    last_used: float
+    turns: int = 1
+    tokens: int = 0  # system prompt plus the turns in the chat's own history
+
+
+class LlmSessionPool:
+    """LRU + idle-TTL cache of chat clients keyed by session_id"""
+
+    def __init__(self, max_sessions: int = 256, idle_ttl: float = 900.0, max_turns: int = 5,
+                 token_budget: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.clock = clock
+        self._sessions: "OrderedDict[str, _PooledSession]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, session_id: str, context_key: str, message_tokens: int = 0):
+        """The pooled chat for the next turn of a session, or None if it must be rebuilt.
+
+        A chat is rebuilt when the user's context changed (e.g. the streak
+        moved), it has carried `max_turns` turns of its own history, or sending
+        a `message_tokens` message would take its prompt over `token_budget`.
+        """
+        now = self.clock()
+        self.evict_idle(now)
+
+        entry = self._sessions.get(session_id)
+        if (entry is not None and entry.context_key == context_key and entry.turns < self.max_turns
+                and (self.token_budget is None or entry.tokens + message_tokens <= self.token_budget)):
+            self.hits += 1
+            entry.turns += 1
+            entry.last_used = now
+            self._sessions.move_to_end(session_id)
+            return entry.chat
+
+        self.misses += 1
+        self._sessions.pop(session_id, None)
+        return None
+
+    def put(self, session_id: str, context_key: str, chat, tokens: int = 0) -> None:
+        """Pool a freshly built chat whose system prompt is `tokens` long; it is about to handle a turn"""
+        self._sessions[session_id] = _PooledSession(chat, context_key, self.clock(), tokens=tokens)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop sessions unused for longer than idle_ttl"""
+        now = self.clock() if now is None else now
+        evicted = 0
+        # Entries are kept in last-used order, so expired ones sit at the front
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry.last_used < self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def record_turn(self, session_id: str, tokens: int) -> None:
+        """Add a finished turn (message plus reply) to the session's prompt size"""
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            entry.tokens += tokens
+
+    def discard(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "live_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_ttl_seconds": self.idle_ttl,
+            "max_turns": self.max_turns,
+            "token_budget": self.token_budget or 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def configure_shared_http_client(max_connections: int = 100) -> bool:
+    """Share one keep-alive HTTP connection pool across all LLM sessions.
+
+    LlmChat talks to providers through litellm, which reuses a module-level
+    httpx client when one is set. Returns False when litellm/httpx are absent.
+    """
+    try:
+        import httpx
+        import litellm
+    except ImportError:
+        return False
+
+    if getattr(litellm, "aclient_session", None) is None:
+        litellm.aclient_session = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections)
+        )
+    return True
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+In-process load test for the Aura API.
+
+Boots server.app inside this process with the fake LLM (fake_llm.FakeLlmChat)
+and either a local MongoDB or the mongomock in-memory stand-in. Then it
+drives a mixed workload at a fixed concurrency. For each endpoint it reports
+p50/p95/p99 latency and requests per second. Results can be saved as a
+baseline and diffed against later runs.
+
+Requires httpx, plus mongomock-motor for --mongo mongomock:// (the default).
+
+Usage (from the backend directory):
+    python load_test.py --concurrency 32 --duration 20 --llm-latency 0.8
+    python load_test.py --save-baseline baseline.json
+    python load_test.py --compare baseline.json --regression-threshold 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+DEFAULT_MIX = "chat=1,checkin=2,progress=4,weekly_report=2,user=3"
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+async def op_chat(client, user_id, rng):
+    return await client.post("/api/chat", json={
+        "user_id": user_id,
+        "message": rng.choice(["I'm having an urge right now", "Had a good day today", "Can we make a plan?"]),
+        "session_id": f"load-{user_id}"
+    })
+
+
+async def op_checkin(client, user_id, rng):
+    return await client.post("/api/checkins", json={
+        "user_id": user_id,
+        "stayed_on_track": rng.random() < 0.85,
+        "mood": rng.randint(1, 5),
+        "had_urges": rng.random() < 0.4,
+        "urge_triggers": rng.choice([None, "boredom", "stress", "late night", "loneliness"])
+    })
+
+
+async def op_progress(client, user_id, rng):
+    return await client.get(f"/api/users/{user_id}/progress")
+
+
+async def op_weekly_report(client, user_id, rng):
+    return await client.get(f"/api/users/{user_id}/weekly-report")
+
+
+async def op_user(client, user_id, rng):
+    return await client.get(f"/api/users/{user_id}")
+
+
+OPERATIONS = {
+    "chat": op_chat,
+    "checkin": op_checkin,
+    "progress": op_progress,
+    "weekly_report": op_weekly_report,
+    "user": op_user,
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies, errors, elapsed):
+    results = {}
+    for name in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies.get(name, []))
+        results[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        }
+    return results
+
+
+async def run_load(args):
+    # Configure the app before it is imported
+    os.environ["AURA_FAKE_LLM"] = "1"
+    os.environ["AURA_FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["MONGO_URL"] = args.mongo
+    # A few synthetic users send far more chats than a person would; measure
+    # throughput, not the per-user rate limit (export the variable to test it)
+    os.environ.setdefault("LLM_USER_REQUESTS_PER_MINUTE", "1000000")
+
+    import httpx
+    import server
+
+    await server.app.router.startup()
+    transport = httpx.ASGITransport(app=server.app)
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+        user_ids = []
+        for i in range(args.users):
+            response = await client.post("/api/users", json={"name": f"Load User {i}", "goal": "Benchmark"})
+            user_ids.append(response.json()["id"])
+        # Give every user some history so reports and progress have data
+        for user_id in user_ids:
+            for _ in range(args.warmup_checkins):
+                await op_checkin(client, user_id, rng)
+
+        deadline = time.perf_counter() + args.duration
+        start = time.perf_counter()
+
+        async def worker(worker_rng):
+            while time.perf_counter() < deadline:
+                name = worker_rng.choices(names, weights)[0]
+                user_id = worker_rng.choice(user_ids)
+                began = time.perf_counter()
+                try:
+                    response = await OPERATIONS[name](client, user_id, worker_rng)
+                    ok = response.status_code < 400
+                except Exception:
+                    ok = False
+                if ok:
+                    latencies[name].append(time.perf_counter() - began)
+                else:
+                    errors[name] += 1
+
+        await asyncio.gather(*(worker(random.Random(rng.random())) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    await server.app.router.shutdown()
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "users": args.users,
+            "llm_latency": args.llm_latency,
+            "mix": mix,
+            "mongo": args.mongo,
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "total_rps": round(sum(len(v) for v in latencies.values()) / elapsed, 2),
+        "endpoints": summarize(latencies, errors, elapsed),
+    }
+
+
+def print_report(report):
+    print(f"🏁 {report['total_rps']} req/s overall over {report['elapsed_seconds']}s")
+    print(f"{'endpoint':<15}{'reqs':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in report["endpoints"].items():
+        print(f"{name:<15}{row['requests']:>8}{row['errors']:>8}{row['rps']:>10}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+def compare(report, baseline, threshold):
+    """Print per-endpoint changes against a baseline; return the regressions found"""
+    regressions = []
+    print()
+    print(f"{'endpoint':<15}{'metric':<8}{'baseline':>10}{'current':>10}{'change':>10}")
+    for name, row in report["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if not base:
+            continue
+        for metric, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("rps", False)):
+            if not base[metric]:
+                continue
+            change = (row[metric] - base[metric]) / base[metric] * 100
+            worse = change > threshold if higher_is_worse else change < -threshold
+            flag = " ❌" if worse else ""
+            print(f"{name:<15}{metric:<8}{base[metric]:>10}{row[metric]:>10}{change:>+9.1f}%{flag}")
+            if worse:
+                regressions.append((name, metric, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process load test for the Aura API")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--warmup-checkins", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake LLM seconds to first token")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--mongo", default="mongomock://", help="MongoDB URL, or mongomock:// for in-memory")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to diff against")
+    parser.add_argument("--regression-threshold", type=float, default=10.0, help="percent")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.regression_threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.regression_threshold}%")
+            sys.exit(1)
+        print("\n✅ No regressions beyond threshold")
+
+
+if __name__ == "__main__":
+    main()
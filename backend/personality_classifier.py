@@ -0,0 +1,85 @@
+"""Single-pass classifier for which Aura personalities a reply used.
+
+Each reply is lowercased once. The six explicit markers are checked first
+with plain substring tests, which is the common case and is cheapest that
+way. Only replies without a marker are scanned for inferred indicators: in
+one pass of an Aho-Corasick automaton (pyahocorasick, in requirements.txt).
+If it is missing the scan falls back to C-level substring tests; a
+pure-Python automaton was benchmarked slower than that fallback.
+"""
+from typing import Dict, Iterable, List
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+PERSONALITIES = ("alex", "casey", "leo")
+
+# Explicit hand-offs such as "🫂Alex:" win over inferred tone
+EXPLICIT_MARKERS = {
+    "alex": ["🫂alex:", "alex speaking"],
+    "casey": ["🧠casey:", "casey here"],
+    "leo": ["⚡leo:", "leo speaking"],
+}
+
+INFERRED_INDICATORS = {
+    # Emotional support
+    "alex": ["understand", "feel", "tough", "okay", "support", "here for you", "validated", "courage"],
+    # Strategy/analysis
+    "casey": ["plan", "strategy", "analyze", "pattern", "trigger", "step", "approach", "solution"],
+    # Motivation
+    "leo": ["amazing", "proud", "win", "victory", "strong", "power", "champion", "celebrate"],
+}
+
+
+class PersonalityClassifier:
+    def __init__(self, explicit: Dict[str, List[str]] = EXPLICIT_MARKERS,
+                 inferred: Dict[str, List[str]] = INFERRED_INDICATORS,
+                 default: str = "alex"):
+        self.explicit = explicit
+        self.inferred = inferred
+        self.default = default
+        self.automaton = None
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            # A phrase may indicate several personalities
+            payloads: Dict[str, set] = {}
+            for personality, phrases in inferred.items():
+                for phrase in phrases:
+                    payloads.setdefault(phrase, set()).add(personality)
+            for phrase, personalities in payloads.items():
+                self.automaton.add_word(phrase, frozenset(personalities))
+            self.automaton.make_automaton()
+
+    @property
+    def backend(self) -> str:
+        return "aho-corasick" if self.automaton is not None else "substring"
+
+    def _ordered(self, found: Iterable[str]) -> List[str]:
+        found = set(found)
+        return [p for p in PERSONALITIES if p in found]
+
+    def classify(self, text: str) -> List[str]:
+        """Personalities used in a reply; explicit markers first, then tone, else the default"""
+        lowered = text.lower()
+
+        found = []
+        for personality, markers in self.explicit.items():
+            for marker in markers:
+                if marker in lowered:
+                    found.append(personality)
+                    break
+        if not found:
+            if self.automaton is not None:
+                found = set()
+                for _, personalities in self.automaton.iter(lowered):
+                    found.update(personalities)
+            else:
+                found = [p for p, phrases in self.inferred.items() if any(i in lowered for i in phrases)]
+
+        return self._ordered(found) or [self.default]
+
+    def classify_many(self, texts: Iterable[str]) -> List[List[str]]:
+        """Batch form for reclassifying stored history"""
+        return [self.classify(text) for text in texts]
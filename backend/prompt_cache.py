@@ -0,0 +1,215 @@
+"""Prompt assembly split into a static prefix and a small per-user suffix.
+
+The persona prompt is identical for every request, so it always comes first
+and byte-for-byte unchanged; providers that cache prompt prefixes (OpenAI
+does so automatically, Anthropic when the prefix is marked) can then skip
+reprocessing it. The USER CONTEXT block only changes when one of the fields
+it shows changes, so it is rendered once per distinct set of values.
+
+enable_provider_prompt_caching() adds a cache breakpoint for Anthropic models
+by wrapping litellm.acompletion, and passes the cached-token usage and
+latency of every non-streamed completion to PromptCacheUsage. The persona
+prefix alone is shorter than the smallest prompt Anthropic caches, so the
+breakpoint goes at the end of what the next call of the same chat repeats:
+the last turn of its history, or on a chat's first call its whole system
+prompt (prefix, user block and history snapshot). Prompts too short to be
+cached get no breakpoint.
+"""
+import hashlib
+import importlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+USER_CONTEXT_FIELDS = ("name", "goal", "current_streak", "best_streak", "achievements")
+
+# Anthropic ignores cache breakpoints on shorter prompts (claude-3-5-sonnet)
+MIN_CACHEABLE_TOKENS = 1024
+
+
+class PromptAssembler:
+    def __init__(self, static_prefix: str, max_user_blocks: int = 10000):
+        self.static_prefix = static_prefix
+        self.max_user_blocks = max_user_blocks
+        self._blocks: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def user_key(user: Dict) -> str:
+        values = [user.get(field) for field in USER_CONTEXT_FIELDS]
+        return hashlib.blake2b(json.dumps(values, default=str).encode(), digest_size=16).hexdigest()
+
+    def user_context_block(self, user: Dict) -> str:
+        key = self.user_key(user)
+        block = self._blocks.get(key)
+        if block is not None:
+            self.hits += 1
+            self._blocks.move_to_end(key)
+            return block
+
+        self.misses += 1
+        block = (
+            f"\n\nUSER CONTEXT:\n- Name: {user.get('name', 'User')}\n- Goal: {user.get('goal', 'Personal growth')}"
+            f"\n- Current Streak: {user.get('current_streak', 0)} days\n- Best Streak: {user.get('best_streak', 0)} days"
+            f"\n- Recent Achievements: {', '.join(user.get('achievements', []))}"
+        )
+        self._blocks[key] = block
+        if len(self._blocks) > self.max_user_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def assemble(self, user: Dict) -> str:
+        """Static prefix followed by the user's block; session history goes after it"""
+        return self.static_prefix + self.user_context_block(user)
+
+    def stats(self) -> Dict:
+        return {"user_blocks": len(self._blocks), "user_block_hits": self.hits, "user_block_misses": self.misses}
+
+
+class PromptCacheUsage:
+    """Provider-reported prompt tokens, how many were served from cache, and call latency"""
+
+    def __init__(self, metrics=None):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self._seconds = {"hit": 0.0, "miss": 0.0}
+        self._calls = {"hit": 0, "miss": 0}
+
+        self._tokens = self._latency = None
+        if metrics is not None:
+            self._tokens = metrics.counter(
+                "aura_llm_provider_prompt_tokens_total", "Provider-reported prompt tokens, by cache outcome")
+            self._latency = metrics.histogram(
+                "aura_llm_call_seconds", "Non-streamed LLM call latency, by prompt cache outcome")
+
+    def record(self, model: str, prompt_tokens: int, cache_read: int, cache_write: int, seconds: float) -> None:
+        outcome = "hit" if cache_read else "miss"
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.cache_read_tokens += cache_read
+        self.cache_write_tokens += cache_write
+        self._seconds[outcome] += seconds
+        self._calls[outcome] += 1
+        if self._tokens is not None:
+            self._tokens.inc(cache_read, cache="read")
+            self._tokens.inc(cache_write, cache="write")
+            self._tokens.inc(max(0, prompt_tokens - cache_read - cache_write), cache="uncached")
+            self._latency.observe(seconds, prompt_cache=outcome)
+
+    def stats(self) -> Dict:
+        hit_mean = self._seconds["hit"] / self._calls["hit"] if self._calls["hit"] else 0.0
+        miss_mean = self._seconds["miss"] / self._calls["miss"] if self._calls["miss"] else 0.0
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "cached_token_ratio": self.cache_read_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            # Mean call latency saved when the prefix was cached; 0 until both outcomes were seen
+            "latency_saved_seconds": miss_mean - hit_mean if hit_mean and miss_mean else 0.0,
+        }
+
+
+# (model, prompt tokens, cache-read tokens, cache-write tokens, seconds)
+UsageCallback = Callable[[str, int, int, int, float], None]
+
+
+def _text_length(content) -> int:
+    if isinstance(content, str):
+        return len(content)
+    return sum(len(block.get("text", "")) for block in content or [] if isinstance(block, dict))
+
+
+def _with_breakpoint(message: Dict) -> Dict:
+    content = message.get("content")
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = [dict(block) for block in content]
+    blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return {**message, "content": blocks}
+
+
+def _mark_cacheable_prefix(messages: List[Dict], static_prefix: str,
+                           min_tokens: int = MIN_CACHEABLE_TOKENS) -> List[Dict]:
+    """Put one cache breakpoint on the last message before the new user turn.
+
+    Only prompts whose system message starts with the prefix are marked, and
+    only when the marked span (everything up to the breakpoint, ~4 characters
+    per token) reaches `min_tokens`.
+    """
+    if len(messages) < 2:
+        return messages
+    system = messages[0]
+    content = system.get("content")
+    if system.get("role") != "system" or not isinstance(content, str) or not content.startswith(static_prefix):
+        return messages
+    # The final message is the new user turn; everything before it is repeated on the next call
+    stable = len(messages) - 2 if messages[-1].get("role") == "user" else len(messages) - 1
+    if sum(_text_length(m.get("content")) for m in messages[:stable + 1]) // 4 < min_tokens:
+        return messages
+    marked = list(messages)
+    marked[stable] = _with_breakpoint(messages[stable])
+    return marked
+
+
+def _usage_numbers(response):
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    if not cache_read and details is not None:
+        cache_read = getattr(details, "cached_tokens", 0) or 0
+    return prompt_tokens, cache_read, cache_write
+
+
+def enable_provider_prompt_caching(static_prefix: str, on_usage: UsageCallback,
+                                   client_module: str = "emergentintegrations.llm.chat") -> bool:
+    """Wrap litellm.acompletion; returns False when litellm isn't installed
+
+    `client_module` is the module that calls acompletion; if it imported the
+    function by name, its reference is replaced too.
+    """
+    try:
+        import litellm
+    except ImportError:
+        return False
+
+    original = litellm.acompletion
+    if getattr(original, "_aura_prompt_cache", False):
+        return True
+
+    async def acompletion(*args, **kwargs):
+        model = kwargs.get("model") or (args[0] if args else "")
+        if "messages" in kwargs and ("claude" in model or model.startswith("anthropic/")):
+            kwargs["messages"] = _mark_cacheable_prefix(kwargs["messages"] or [], static_prefix)
+        started = time.perf_counter()
+        response = await original(*args, **kwargs)
+        if not kwargs.get("stream"):
+            try:
+                numbers = _usage_numbers(response)
+                if numbers is not None:
+                    on_usage(model, *numbers, time.perf_counter() - started)
+            except Exception as e:
+                logger.warning(f"Could not read prompt cache usage: {e}")
+        return response
+
+    acompletion._aura_prompt_cache = True
+    litellm.acompletion = acompletion
+    try:
+        client = importlib.import_module(client_module)
+    except ImportError:
+        client = None
+    if getattr(client, "acompletion", None) is original:
+        client.acompletion = acompletion
+    return True
@@ -0,0 +1,116 @@
+"""Minimal publish/subscribe used to fan events out across uvicorn workers.
+
+LocalPubSub only reaches subscribers in the current process. MongoPubSub
+publishes into a capped collection that every worker tails. That is enough for
+cross-worker notifications without adding a broker to the stack.
+"""
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict], Union[None, Awaitable[None]]]
+
+
+class LocalPubSub:
+    """In-process pub/sub - handlers run synchronously on publish"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers[channel].append(handler)
+
+    def unsubscribe(self, channel: str, handler: Handler) -> None:
+        if handler in self._handlers.get(channel, []):
+            self._handlers[channel].remove(handler)
+
+    async def publish(self, channel: str, message: Dict) -> None:
+        await self._dispatch(channel, message)
+
+    async def _dispatch(self, channel: str, message: Dict) -> None:
+        for handler in list(self._handlers.get(channel, [])):
+            try:
+                result = handler(message)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"pubsub handler for '{channel}' failed: {e}")
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class MongoPubSub(LocalPubSub):
+    """Cross-worker pub/sub over a tailable cursor on a capped collection.
+
+    Local handlers are called immediately on publish; the tailer skips events
+    this worker published itself, so each handler sees a message once.
+    """
+
+    def __init__(self, db, collection: str = "pubsub_events", size_bytes: int = 16 * 1024 * 1024):
+        super().__init__()
+        self.db = db
+        self.collection_name = collection
+        self.size_bytes = size_bytes
+        self.worker_id = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+
+    async def _ensure_collection(self):
+        try:
+            await self.db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass  # already exists
+
+    async def publish(self, channel: str, message: Dict) -> None:
+        await self._dispatch(channel, message)
+        await self.db[self.collection_name].insert_one(
+            {"channel": channel, "origin": self.worker_id, "message": message}
+        )
+
+    async def start(self) -> None:
+        await self._ensure_collection()
+        self._task = asyncio.create_task(self._tail())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _tail(self) -> None:
+        collection = self.db[self.collection_name]
+        # Only deliver events published after this worker started
+        last = await collection.find_one({}, sort=[("$natural", -1)])
+        last_id = last["_id"] if last else None
+
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                while cursor.alive:
+                    async for event in cursor:
+                        last_id = event["_id"]
+                        if event.get("origin") != self.worker_id:
+                            await self._dispatch(event["channel"], event["message"])
+                    await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"pubsub tail on {self.collection_name} failed: {e}")
+            await asyncio.sleep(1)
+
+
+def create_pubsub(backend: str, db) -> LocalPubSub:
+    """Build the pub/sub backend named by configuration ("local" or "mongo")"""
+    if backend == "mongo":
+        return MongoPubSub(db)
+    return LocalPubSub()
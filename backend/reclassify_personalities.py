@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Re-run personality classification over stored AI messages.
+
+Streams ai messages from chat_messages and rewrites the personalities field
+wherever the classifier now disagrees, in one bulk_write per batch.
+
+Usage (from the backend directory):
+    python reclassify_personalities.py [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import asyncio
+import time
+
+from pymongo import UpdateOne
+
+from server import db, personality_classifier
+
+
+async def reclassify(batch_size=1000, dry_run=False):
+    cursor = db.chat_messages.find(
+        {"message_type": "ai"},
+        {"_id": 0, "id": 1, "content": 1, "personalities": 1}
+    ).batch_size(batch_size)
+
+    start = time.time()
+    scanned = changed = 0
+    batch = []
+
+    async def flush():
+        nonlocal changed
+        labels = personality_classifier.classify_many(m.get("content", "") for m in batch)
+        updates = [
+            UpdateOne({"id": message["id"]}, {"$set": {"personalities": personalities}})
+            for message, personalities in zip(batch, labels)
+            if message.get("personalities") != personalities
+        ]
+        changed += len(updates)
+        if updates and not dry_run:
+            await db.chat_messages.bulk_write(updates, ordered=False)
+        batch.clear()
+
+    async for message in cursor:
+        batch.append(message)
+        scanned += 1
+        if len(batch) >= batch_size:
+            await flush()
+            print(f"  {scanned} messages scanned, {changed} changed")
+    if batch:
+        await flush()
+
+    action = "would change" if dry_run else "changed"
+    print(f"✅ {scanned} messages scanned, {changed} {action} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reclassify personalities on stored AI messages")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(reclassify(args.batch_size, args.dry_run))
@@ -0,0 +1,193 @@
+"""Keeping chat responsive when the LLM provider is slow or failing.
+
+- CircuitBreaker stops sending requests after a burst of errors or very slow
+  calls, then lets a single probe through once a cool-down has passed.
+- hedged and iterate_with_deadline bound how long one call may take;
+  hedged starts a second attempt if the first is slow and keeps whichever
+  answers first.
+- FallbackResponder serves precomputed grounding replies in Alex's voice
+  while the provider is unavailable, so SOS never ends in an error page.
+"""
+import asyncio
+import time
+import zlib
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the provider while the breaker is open"""
+
+
+class CircuitBreaker:
+    """Rolling-window breaker; a call slower than `slow_call_seconds` counts as a failure"""
+
+    def __init__(self, window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 15.0, open_seconds: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True = failed
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.clock() - self.opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self, duration: float) -> None:
+        if duration >= self.slow_call_seconds:
+            self.record_failure()
+            return
+        if self.state == HALF_OPEN:
+            self._close()
+        else:
+            self._outcomes.append(False)
+
+    def abandon(self) -> None:
+        """The call was cancelled before it finished; free the probe without judging it"""
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        self._outcomes.append(True)
+        failures = sum(self._outcomes)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.times_opened += 1
+        self._outcomes.clear()
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._outcomes.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "open": int(self.state != CLOSED),
+            "half_open": int(self.state == HALF_OPEN),
+            "times_opened": self.times_opened,
+            "recent_failures": sum(self._outcomes),
+            "recent_calls": len(self._outcomes),
+        }
+
+
+async def hedged(call: Callable[[], Awaitable[T]], hedge_after: float, deadline: float) -> T:
+    """Start `call`; if it is still running after `hedge_after` (or already failed), start a second one.
+
+    Returns the first successful result and cancels the other attempt. Fails
+    only if both attempts fail or the deadline passes.
+    """
+    loop = asyncio.get_running_loop()
+    give_up_at = loop.time() + deadline
+    first = asyncio.ensure_future(call())
+    attempts = {first}
+    last_error: Optional[BaseException] = None
+    try:
+        await asyncio.wait(attempts, timeout=min(hedge_after, deadline))
+        if first.done():
+            if first.exception() is None:
+                return first.result()
+            last_error = first.exception()
+            attempts.discard(first)
+        attempts.add(asyncio.ensure_future(call()))
+        while attempts:
+            remaining = give_up_at - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, _ = await asyncio.wait(attempts, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise asyncio.TimeoutError()
+            for attempt in done:
+                attempts.discard(attempt)
+                if attempt.exception() is None:
+                    return attempt.result()
+                last_error = attempt.exception()
+        raise last_error
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+
+
+async def iterate_with_deadline(items: AsyncIterator[T], first_item_timeout: float,
+                                deadline: float) -> AsyncIterator[T]:
+    """Re-yield `items`, raising asyncio.TimeoutError if the first item or the whole stream is late"""
+    loop = asyncio.get_running_loop()
+    give_up_at = loop.time() + deadline
+    timeout = min(first_item_timeout, deadline)
+    iterator = items.__aiter__()
+    while True:
+        try:
+            item = await asyncio.wait_for(iterator.__anext__(), timeout)
+        except StopAsyncIteration:
+            return
+        yield item
+        timeout = give_up_at - loop.time()
+        if timeout <= 0:
+            raise asyncio.TimeoutError()
+
+
+SOS_GROUNDING_REPLIES = (
+    "I'm right here with you. Let's slow this moment down together. Breathe in through your nose for four counts, "
+    "hold for four, and breathe out slowly for six. Do that three times with me. The urge you're feeling is real, "
+    "and it is also temporary - urges rise, peak and pass, usually within 15 to 20 minutes.",
+    "Thank you for reaching out instead of acting on the urge - that takes real courage. Let's ground you right now: "
+    "name five things you can see, four you can touch, three you can hear, two you can smell and one you can taste. "
+    "Take your time with each one. I'm not going anywhere.",
+    "You're not alone in this moment. Try to change your surroundings, even slightly: stand up, step into another "
+    "room or outside, and splash some cold water on your face. Then notice where you feel the urge in your body and "
+    "just watch it like a wave. You don't have to fight it - only ride it until it fades.",
+)
+
+CHAT_FALLBACK_REPLIES = (
+    "I'm having a little trouble gathering my thoughts right now, but I'm still here with you. While I catch up, "
+    "take one slow breath and notice how you're feeling in this moment. Whatever it is, it's okay to feel it.",
+    "I can't give you my full attention for a moment, and I don't want to rush you. Take a breath with me - in for "
+    "four, out for six. I'll be back to my usual self shortly, and I'd love to hear more then.",
+)
+
+CRISIS_LINE = (
+    " If you feel you might hurt yourself or you're in danger, please contact your local emergency number "
+    "or a crisis line right away."
+)
+
+
+class FallbackResponder:
+    """Precomputed Alex replies for when the LLM can't be reached"""
+
+    def __init__(self):
+        self._sos = tuple(f"🫂Alex: {reply}{CRISIS_LINE}" for reply in SOS_GROUNDING_REPLIES)
+        self._chat = tuple(f"🫂Alex: {reply}" for reply in CHAT_FALLBACK_REPLIES)
+        self.served = 0
+
+    def reply(self, message: str, sos: bool = False) -> str:
+        # Deterministic per message, so retries of the same request read the same
+        replies = self._sos if sos else self._chat
+        self.served += 1
+        return replies[zlib.crc32(message.encode("utf-8")) % len(replies)]
@@ -0,0 +1,282 @@
+"""Instant replies for near-duplicate SOS messages and chat openers.
+
+Incoming messages are normalised and turned into hashed character n-gram
+vectors (the hashing trick, computed locally with NumPy). A message whose
+cosine similarity to a known entry clears the threshold is answered
+straight away, without waiting on the LLM.
+
+There are two kinds of entries:
+- vetted templates, shipped below and personalised with the user's name
+  and streak; these never expire
+- the user's own recent LLM replies, so repeating a message in a bad moment
+  gets the same considered answer again; these expire after a TTL and the
+  least recently used users are evicted first
+
+Messages that mention self-harm, suicide or a means of it are never
+answered from the cache, nor learned. Entries are kept separately per lane
+("sos" and "chat"), and learned replies are only served to the user they
+were written for. NumPy is optional: without it the cache reports itself
+disabled.
+"""
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the cache is simply unavailable
+    np = None
+
+SOS = "sos"
+CHAT = "chat"
+
+# Example phrasings -> reply template; {name} and {streak} come from the user
+VETTED_TEMPLATES = {
+    SOS: [
+        ((
+            "I'm having an urge right now",
+            "I'm having a strong urge right now and I need immediate support",
+            "I'm having a strong urge right now and I need immediate support. Please help me through this moment "
+            "and give me strategies to get through it safely.",
+            "I'm having urges",
+            "I really want to use right now, please help",
+            "the cravings are really bad right now",
+            "I'm about to relapse",
+        ), (
+            "🫂Alex: {name}, I'm right here with you, and reaching out instead of acting on the urge was exactly the "
+            "right move. Let's ride this wave together. Breathe in for four counts, hold for four, and breathe out "
+            "slowly for six - three times with me. Urges rise, peak and pass, usually within 15 to 20 minutes. "
+            "🧠Casey: It can help to change your surroundings right now: stand up, step into another room or "
+            "outside, and drink a glass of cold water. "
+            "⚡Leo: You've already got {streak} days behind you. You don't have to win the whole day - just "
+            "the next ten minutes. Tell me what's happening around you right now."
+        )),
+        ((
+            "I feel like giving up",
+            "I can't do this anymore",
+            "I'm struggling so much right now",
+        ), (
+            "🫂Alex: {name}, I hear how heavy this feels, and I'm glad you told me instead of carrying it alone. "
+            "Let's slow this moment down: name five things you can see, four you can touch, three you can hear, "
+            "two you can smell and one you can taste. "
+            "⚡Leo: Feeling like giving up is a feeling, not a verdict. You've shown up for {streak} days "
+            "already. If you feel you might hurt yourself or you're in danger, please contact your local emergency "
+            "number or a crisis line right away. What's weighing on you most right now?"
+        )),
+    ],
+    CHAT: [
+        ((
+            "hi",
+            "hello",
+            "hey",
+            "hey there",
+            "hi aura",
+            "good morning",
+        ), (
+            "🫂Alex: Hi {name}, it's really good to hear from you. ⚡Leo: {streak} days on your journey so far - "
+            "that's worth noticing. 🫂Alex: How are you feeling today, and what would be most helpful to talk about?"
+        )),
+        ((
+            "I'm struggling today",
+            "today is a hard day",
+            "I'm not doing well today",
+        ), (
+            "🫂Alex: I'm sorry today is hard, {name}, and I'm glad you reached out. Hard days are part of the "
+            "journey, not a sign you're failing at it. 🧠Casey: It often helps to name what's behind it - is it "
+            "stress, tiredness, loneliness, or something that happened? Tell me a little about your day."
+        )),
+    ],
+}
+
+_BRACKETED = re.compile(r"\[[^\]]*\]")
+_NON_WORD = re.compile(r"[^a-z0-9\s]+")
+_SPACES = re.compile(r"\s+")
+# "not having an urge" is close to "having an urge" by n-grams; such pairs never match
+_NEGATIONS = frozenset({"not", "no", "never", "dont", "cant", "wont", "isnt", "arent", "wasnt", "didnt", "nothing"})
+
+
+def normalize_message(text: str) -> str:
+    """Lowercase, drop tags like [SOS - URGENT SUPPORT NEEDED], punctuation and extra spaces"""
+    text = _BRACKETED.sub(" ", text.lower()).replace("'", "").replace("’", "")
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text)).strip()
+
+
+# Possible risk of self-harm always goes to the LLM, however close a template is
+_CRISIS = re.compile(
+    r"\b(?:suicid\w*|(?:kill|hurt|harm|cut|hang|drown|poison|shoot)(?:ing)? (?:my ?self|me)|self ?harm\w*"
+    r"|end (?:it|it all|my life|things)|(?:want|wanna|going|ready|deserve) to die|die|dying|dead"
+    r"|pills?|overdos\w*|od|knife|knives|blade|razor|rope|gun|bridge|jump(?:ing)? off"
+    r"|no reason to live|better off without me)\b"
+)
+
+
+def mentions_crisis(normalized: str) -> bool:
+    return _CRISIS.search(normalized) is not None
+
+
+def negations(normalized: str) -> frozenset:
+    return _NEGATIONS.intersection(normalized.split())
+
+
+class HashingVectorizer:
+    """L2-normalised hashed counts of words and in-word character 3- and 4-grams"""
+
+    def __init__(self, n_features: int = 1 << 14):
+        self.n_features = n_features
+
+    def _features(self, normalized: str) -> List[str]:
+        words = normalized.split()
+        features = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f" {word} "
+            for n in (3, 4):
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def transform(self, normalized: str):
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        for feature in self._features(normalized):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            # The top bit picks a sign so colliding features tend to cancel out
+            vector[digest % self.n_features] += 1.0 if digest & 0x80000000 else -1.0
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+class _Personalised(dict):
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+class ResponseCache:
+    def __init__(self, threshold: float = 0.8, ttl_seconds: float = 3600, max_users: int = 5000,
+                 replies_per_user: int = 8, clock: Callable[[], float] = time.monotonic, metrics=None):
+        self.enabled = np is not None
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self.replies_per_user = replies_per_user
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.crisis_bypassed = 0
+        # (user_id, lane) -> [(vector, negations, reply, expires_at)], least recently used first
+        self._learned: "OrderedDict[Tuple[str, str], List[Tuple]]" = OrderedDict()
+        # lane -> (example vectors, their negations, reply per example)
+        self._templates: Dict[str, Tuple[object, List[frozenset], List[str]]] = {}
+
+        self._lookups = None
+        if metrics is not None:
+            self._lookups = metrics.counter(
+                "aura_response_cache_lookups_total", "Semantic response cache lookups, by lane and result")
+        if not self.enabled:
+            return
+
+        self.vectorizer = HashingVectorizer()
+        for lane, entries in VETTED_TEMPLATES.items():
+            vectors, example_negations, replies = [], [], []
+            for examples, reply in entries:
+                for example in examples:
+                    normalized = normalize_message(example)
+                    vectors.append(self.vectorizer.transform(normalized))
+                    example_negations.append(negations(normalized))
+                    replies.append(reply)
+            self._templates[lane] = (np.vstack(vectors), example_negations, replies)
+
+    def lookup(self, user: Dict, lane: str, message: str) -> Optional[str]:
+        """The cached reply for a near-duplicate message, or None"""
+        if not self.enabled:
+            return None
+        normalized = normalize_message(message)
+        if not normalized:
+            return None
+        if mentions_crisis(normalized):
+            self.crisis_bypassed += 1
+            if self._lookups is not None:
+                self._lookups.inc(lane=lane, result="crisis")
+            return None
+        vector = self.vectorizer.transform(normalized)
+        negated = negations(normalized)
+
+        reply, result = self._lookup_learned(user["id"], lane, vector, negated), "learned"
+        if reply is None:
+            reply, result = self._lookup_template(user, lane, vector, negated), "vetted"
+        if reply is None:
+            result = "miss"
+            self.misses += 1
+        else:
+            self.hits += 1
+        if self._lookups is not None:
+            self._lookups.inc(lane=lane, result=result)
+        return reply
+
+    def _best_match(self, scores, example_negations: List[frozenset], negated: frozenset) -> Optional[int]:
+        for index, example_negated in enumerate(example_negations):
+            if example_negated != negated:
+                scores[index] = -1.0
+        best = int(np.argmax(scores))
+        return best if scores[best] >= self.threshold else None
+
+    def _lookup_learned(self, user_id: str, lane: str, vector, negated: frozenset) -> Optional[str]:
+        key = (user_id, lane)
+        entries = self._learned.get(key)
+        if not entries:
+            return None
+        now = self.clock()
+        live = [entry for entry in entries if entry[3] > now]
+        self.expired += len(entries) - len(live)
+        if not live:
+            del self._learned[key]
+            return None
+        self._learned[key] = live
+        self._learned.move_to_end(key)
+        scores = np.vstack([entry[0] for entry in live]) @ vector
+        best = self._best_match(scores, [entry[1] for entry in live], negated)
+        return None if best is None else live[best][2]
+
+    def _lookup_template(self, user: Dict, lane: str, vector, negated: frozenset) -> Optional[str]:
+        templates = self._templates.get(lane)
+        if templates is None:
+            return None
+        matrix, example_negations, replies = templates
+        best = self._best_match(matrix @ vector, example_negations, negated)
+        if best is None:
+            return None
+        return replies[best].format_map(_Personalised(
+            name=user.get("name") or "friend",
+            streak=user.get("current_streak", 0)
+        ))
+
+    def store(self, user_id: str, lane: str, message: str, reply: str) -> None:
+        """Remember an LLM reply for this user's near-duplicate messages"""
+        if not self.enabled or self.ttl_seconds <= 0:
+            return
+        normalized = normalize_message(message)
+        if not normalized or mentions_crisis(normalized):
+            return
+        key = (user_id, lane)
+        entries = self._learned.pop(key, [])
+        entries.append((self.vectorizer.transform(normalized), negations(normalized), reply,
+                        self.clock() + self.ttl_seconds))
+        self._learned[key] = entries[-self.replies_per_user:]
+        while len(self._learned) > self.max_users:
+            self._learned.popitem(last=False)
+            self.evicted += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": int(self.enabled),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "learned_users": len(self._learned),
+            "learned_replies": sum(len(entries) for entries in self._learned.values()),
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "crisis_bypassed": self.crisis_bypassed,
+        }
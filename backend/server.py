@@ -1,19 +1,56 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Header, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.background import BackgroundTask
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, AsyncIterator, Set
 from datetime import datetime, timezone, timedelta
 import os
 import uuid
 import re
+import json
+import logging
+import hashlib
+import asyncio
+import time
 from dotenv import load_dotenv
 from emergentintegrations.llm.chat import LlmChat, UserMessage
+from llm_pool import LlmSessionPool, configure_shared_http_client
+from achievements import AchievementEngine
+from personality_classifier import PersonalityClassifier
+from galaxy import get_galaxy_progress_data, galaxy_etag, MAX_STARS
+from http_caching import USER_CACHE_CONTROL, CATALOG_CACHE_CONTROL, user_etag, etag_matches, not_modified
+from fast_json import FastJSONResponse, DocumentProjector, dumps, dumps_str
+from db_indexes import ensure_indexes
+from pubsub import create_pubsub
+from live_updates import LiveUpdates
+from admission import LlmAdmission, AdmissionRejected
+from resilience import CircuitBreaker, CircuitOpen, FallbackResponder, hedged, iterate_with_deadline
+from user_cache import UserCache, UserRepository
+from write_behind import WriteBehindQueue
+from conversation_context import ConversationContextManager
+from chat_archive import ChatArchive
+from chat_history import ChatHistory, decode_history_cursor
+from prompt_cache import PromptAssembler, PromptCacheUsage, enable_provider_prompt_caching
+from response_cache import ResponseCache, SOS, CHAT
+from metrics import MetricsRegistry, StageTimer, MongoCommandMetrics, MetricsMiddleware, estimate_tokens
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Metrics - METRICS_SAMPLE_RATE is the fraction of requests timed (0 disables)
+metrics = MetricsRegistry(sample_rate=float(os.environ.get('METRICS_SAMPLE_RATE', '1.0')))
+stage_timer = StageTimer(metrics)
+llm_token_counter = metrics.counter("aura_llm_tokens_total", "Approximate LLM tokens by direction")
+error_counter = metrics.counter("aura_errors_total", "Errors by endpoint and exception type")
+
+app = FastAPI(default_response_class=FastJSONResponse)
+app.add_middleware(MetricsMiddleware, registry=metrics)
 
 # CORS Configuration
 app.add_middleware(
@@ -22,15 +59,58 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Prev-Cursor", "X-Next-Cursor", "ETag"],
 )
 
 # Database Setup
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/aura_app')
-client = AsyncIOMotorClient(MONGO_URL)
+if MONGO_URL.startswith('mongomock://'):
+    # In-memory stand-in for load tests (pip install mongomock-motor)
+    from mongomock_motor import AsyncMongoMockClient
+    client = AsyncMongoMockClient()
+else:
+    client = AsyncIOMotorClient(MONGO_URL, event_listeners=[MongoCommandMetrics(metrics)])
 db = client.aura_app
 
+# Cross-worker notifications ("local" or "mongo")
+PUBSUB_BACKEND = os.environ.get('PUBSUB_BACKEND', 'local')
+pubsub = create_pubsub(PUBSUB_BACKEND, db)
+
+# Progress and achievement events pushed to open /ws/users/{id} sockets
+live_updates = LiveUpdates(pubsub, queue_size=int(os.environ.get('LIVE_UPDATES_QUEUE_SIZE', '64')))
+
+# Cached user reads - every users access goes through the repository
+user_repository = UserRepository(
+    db.users,
+    UserCache(
+        max_entries=int(os.environ.get('USER_CACHE_SIZE', '10000')),
+        ttl=float(os.environ.get('USER_CACHE_TTL_SECONDS', '30'))
+    ),
+    pubsub
+)
+
+# Post-response writes, journaled to disk until Mongo acknowledges them
+write_behind = WriteBehindQueue(
+    db,
+    journal_dir=os.environ.get('WRITE_BEHIND_JOURNAL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'journal')),
+    workers=int(os.environ.get('WRITE_BEHIND_WORKERS', '4')),
+    max_attempts=int(os.environ.get('WRITE_BEHIND_MAX_ATTEMPTS', '10'))
+)
+
 # LLM Configuration
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
+LLM_API_KEY = EMERGENT_LLM_KEY
+
+# Local fake LLM for offline testing (streams a canned reply)
+if os.environ.get('AURA_FAKE_LLM'):
+    from fake_llm import FakeLlmChat as LlmChat
+# Opt-in: call the provider through litellm directly so streamed replies arrive token by token
+elif os.environ.get('LLM_STREAMING') == '1':
+    from streaming_llm import LiteLlmChat as LlmChat
+    LLM_API_KEY = os.environ.get('LLM_STREAMING_API_KEY')
+
+LLM_POOL_MAX_SESSIONS = int(os.environ.get('LLM_POOL_MAX_SESSIONS', '256'))
+LLM_POOL_IDLE_SECONDS = float(os.environ.get('LLM_POOL_IDLE_SECONDS', '900'))
 
 # Data Models
 class User(BaseModel):
@@ -79,6 +159,15 @@ class Relapse(BaseModel):
     time_of_day: Optional[str] = None
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+class UserStats(BaseModel):
+    """Running per-user counters maintained on every check-in"""
+    user_id: str
+    checkins: int = 0
+    urges_resisted: int = 0
+    triggers: List[str] = Field(default_factory=list)  # normalized, unique
+    good_mood_streak: int = 0  # consecutive most recent check-ins with mood 4+
+    updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
 class WeeklyReport(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -92,6 +181,10 @@ class WeeklyReport(BaseModel):
     insights: List[str]
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Stored documents are validated on write; responses project them onto these
+user_projector = DocumentProjector(User)
+checkin_projector = DocumentProjector(CheckIn)
+
 # Request/Response Models
 class CreateUserRequest(BaseModel):
     name: str
@@ -120,6 +213,8 @@ class ChatResponse(BaseModel):
     personalities_used: List[str]
     session_id: str
     user_progress: Optional[Dict] = None
+    fallback: bool = False  # served by the local responder because the LLM was unavailable
+    cached: bool = False  # served by the response cache; see RESPONSE_CACHE_FOLLOW_UP
 
 # Achievement System
 ACHIEVEMENTS = [
@@ -133,6 +228,18 @@ ACHIEVEMENTS = [
     {"id": "century_club", "name": "Century Club", "description": "100 days of transformation", "icon": "💎", "category": "milestone", "unlock_condition": {"type": "streak", "value": 100}},
 ]
 
+# Compiled once; each unlock_condition type maps to a metric resolver
+achievement_engine = AchievementEngine(ACHIEVEMENTS, resolvers={
+    "streak": lambda user_data, stats: user_data.get('current_streak', 0),
+    "checkins": lambda user_data, stats: stats.checkins,
+    "urges_resisted": lambda user_data, stats: stats.urges_resisted,
+    "triggers_identified": lambda user_data, stats: len(stats.triggers),
+    "good_mood_streak": lambda user_data, stats: stats.good_mood_streak,
+})
+
+# Changes only with the catalog; part of the catalog and progress ETags
+ACHIEVEMENTS_VERSION = hashlib.sha1(dumps(achievement_engine.catalog)).hexdigest()[:12]
+
 # Enhanced Personality System
 def get_unified_system_message():
     return """You are "Aura," a compassionate and intelligent AI guide with three integrated personality aspects. You seamlessly transition between these aspects based on what the user needs most:
@@ -167,185 +274,366 @@ def get_unified_system_message():
 
 Your goal is to provide a seamless, multi-faceted support experience that feels like talking to one unified, deeply caring guide."""
 
-async def create_unified_llm_chat(session_id: str, user_context: Dict):
-    """Create a unified LLM chat instance that can use all personalities"""
-    system_message = get_unified_system_message()
+def build_llm_chat(session_id: str, system_message: str):
+    """Construct a new LLM client for a session"""
+    return LlmChat(
+        api_key=LLM_API_KEY,
+        session_id=session_id,
+        system_message=system_message
+    ).with_model("anthropic", "claude-3-5-sonnet-20241022")
+
+# Last N messages verbatim plus a rolling summary, kept under a token budget
+conversation_context = ConversationContextManager(
+    db,
+    keep_messages=int(os.environ.get('CHAT_CONTEXT_MESSAGES', '10')),
+    token_budget=int(os.environ.get('CHAT_CONTEXT_TOKEN_BUDGET', '3000'))
+)
+
+# Idle sessions are rolled into compressed buckets by archive_chat_messages.py
+chat_archive = ChatArchive(db, summarize_through=conversation_context.summarize_through)
+chat_history = ChatHistory(db, chat_archive)
+
+# Chat clients are reused across requests in the same session
+llm_pool = LlmSessionPool(
+    max_sessions=LLM_POOL_MAX_SESSIONS,
+    idle_ttl=LLM_POOL_IDLE_SECONDS,
+    # Rebuilt from stored context once its own history reaches the verbatim window,
+    # or would take the prompt past the same budget the stored context is held to
+    max_turns=max(1, conversation_context.keep_messages // 2),
+    token_budget=conversation_context.token_budget
+)
+configure_shared_http_client()
+
+# The persona prompt is a fixed prefix; only the USER CONTEXT block and history vary
+prompt_assembler = PromptAssembler(
+    get_unified_system_message(),
+    max_user_blocks=int(os.environ.get('PROMPT_USER_BLOCK_CACHE_SIZE', '10000'))
+)
+PROMPT_PREFIX_TOKENS = estimate_tokens(prompt_assembler.static_prefix)
+prompt_cache_usage = PromptCacheUsage(metrics)
+prompt_segment_counter = metrics.counter("aura_llm_prompt_tokens_total", "Approximate system prompt tokens by segment")
+if os.environ.get('LLM_PROMPT_CACHING', '1') != '0':
+    if not enable_provider_prompt_caching(prompt_assembler.static_prefix, prompt_cache_usage.record):
+        logger.info("litellm not installed; provider prompt caching is off")
+
+# Bounds in-flight LLM calls; SOS requests jump the queue and skip the per-user rate
+llm_admission = LlmAdmission(
+    max_in_flight=int(os.environ.get('LLM_MAX_IN_FLIGHT', '32')),
+    max_queue=int(os.environ.get('LLM_MAX_QUEUE', '64')),
+    queue_timeout=float(os.environ.get('LLM_QUEUE_TIMEOUT_SECONDS', '10')),
+    user_rate=float(os.environ.get('LLM_USER_REQUESTS_PER_MINUTE', '30')) / 60,
+    user_burst=float(os.environ.get('LLM_USER_BURST', '15')),
+    metrics=metrics
+)
+
+# Per-call deadlines; SOS_HEDGE_AFTER_SECONDS=0 turns hedging off
+LLM_DEADLINE_SECONDS = float(os.environ.get('LLM_DEADLINE_SECONDS', '30'))
+LLM_FIRST_TOKEN_SECONDS = float(os.environ.get('LLM_FIRST_TOKEN_SECONDS', '10'))
+SOS_HEDGE_AFTER_SECONDS = float(os.environ.get('SOS_HEDGE_AFTER_SECONDS', '4'))
+
+# Opens on a high share of failed or slow calls; Alex's local replies fill in meanwhile
+llm_breaker = CircuitBreaker(
+    window=int(os.environ.get('LLM_BREAKER_WINDOW', '20')),
+    failure_rate=float(os.environ.get('LLM_BREAKER_FAILURE_RATE', '0.5')),
+    slow_call_seconds=float(os.environ.get('LLM_BREAKER_SLOW_CALL_SECONDS', '15')),
+    open_seconds=float(os.environ.get('LLM_BREAKER_OPEN_SECONDS', '30'))
+)
+fallback_responder = FallbackResponder()
+fallback_counter = metrics.counter("aura_llm_fallback_total", "Replies served by the local fallback responder")
+
+# Opt-in: near-duplicate SOS messages and session openers get an instant reply,
+# optionally followed by the full LLM answer over /ws/users/{id}
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '0') == '1'
+RESPONSE_CACHE_FOLLOW_UP = os.environ.get('RESPONSE_CACHE_FOLLOW_UP', '0') == '1'
+response_cache = ResponseCache(
+    threshold=float(os.environ.get('RESPONSE_CACHE_THRESHOLD', '0.8')),
+    ttl_seconds=float(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '3600')),
+    max_users=int(os.environ.get('RESPONSE_CACHE_MAX_USERS', '5000')),
+    metrics=metrics
+)
+if RESPONSE_CACHE_ENABLED and not response_cache.enabled:
+    logger.warning("RESPONSE_CACHE_ENABLED=1 but numpy is not installed; the response cache is off")
+follow_up_tasks: Set[asyncio.Task] = set()
+
+async def admit_llm_request(user_id: str, priority: bool = False):
+    """Take an LLM slot, turning a rejection into a fast 429 with Retry-After"""
+    try:
+        return await llm_admission.acquire(user_id, priority=priority)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Aura is busy right now ({e.reason}), please try again shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def create_unified_llm_chat(session_id: str, user_context: Dict, message: str = ""):
+    """Get a unified LLM chat instance that can use all personalities"""
+    # Static prefix first so providers can reuse their cached copy of it
+    context_key = prompt_assembler.assemble(user_context)
     
-    # Add user context to system message
-    context_addition = f"\n\nUSER CONTEXT:\n- Name: {user_context.get('name', 'User')}\n- Goal: {user_context.get('goal', 'Personal growth')}\n- Current Streak: {user_context.get('current_streak', 0)} days\n- Best Streak: {user_context.get('best_streak', 0)} days\n- Recent Achievements: {', '.join(user_context.get('achievements', []))}"
+    # A pooled chat already holds this session's recent turns in its own history
+    chat = llm_pool.get(session_id, context_key, estimate_tokens(message))
+    if chat is not None:
+        return chat
     
-    full_system_message = system_message + context_addition
+    system_tokens = estimate_tokens(context_key)
     
-    chat = LlmChat(
-        api_key=EMERGENT_LLM_KEY,
-        session_id=session_id,
-        system_message=full_system_message
-    ).with_model("anthropic", "claude-3-5-sonnet-20241022")
+    # Earlier turns of this session, bounded to the remaining token budget
+    conversation = await conversation_context.build(
+        user_context['id'],
+        session_id,
+        reserved_tokens=system_tokens + estimate_tokens(message)
+    )
+    rendered_conversation = conversation.render()
+    system_message = context_key
+    if rendered_conversation:
+        system_message += "\n\n" + rendered_conversation
+    prompt_segment_counter.inc(PROMPT_PREFIX_TOKENS, segment="static_prefix")
+    prompt_segment_counter.inc(system_tokens - PROMPT_PREFIX_TOKENS, segment="user_context")
+    prompt_segment_counter.inc(estimate_tokens(rendered_conversation), segment="conversation")
     
+    # Stored history is rendered only into a fresh chat; later turns of the
+    # pooled chat add to its own history instead of repeating this snapshot
+    chat = build_llm_chat(session_id, system_message)
+    llm_pool.put(session_id, context_key, chat, estimate_tokens(system_message))
     return chat
 
+async def stream_llm_reply(chat, user_message: UserMessage) -> AsyncIterator[str]:
+    """Yield reply chunks as the LLM produces them, if the client can.
+
+    Clients with a ``stream_message`` method stream token by token: LiteLlmChat
+    (LLM_STREAMING=1) and FakeLlmChat (AURA_FAKE_LLM=1). The default
+    emergentintegrations LlmChat has no streaming API, so with it the whole
+    reply arrives as one chunk once generation has finished.
+    """
+    stream_message = getattr(chat, 'stream_message', None)
+    if stream_message is None:
+        yield await chat.send_message(user_message)
+        return
+    async for chunk in stream_message(user_message):
+        if chunk:
+            yield chunk
+
+async def request_llm_reply(chat, session_id: str, message: str, priority: bool = False) -> str:
+    """Send one message under the circuit breaker and deadline.
+
+    SOS requests are hedged: if the first attempt is still running after
+    SOS_HEDGE_AFTER_SECONDS a second client is tried and the first answer wins.
+    """
+    if not llm_breaker.allow():
+        raise CircuitOpen()
+    
+    unused_clients = [chat]
+    
+    def attempt():
+        # The hedge gets its own client so the two calls don't share session state
+        if unused_clients:
+            client = unused_clients.pop()
+        else:
+            client = build_llm_chat(session_id, getattr(chat, 'system_message', None) or get_unified_system_message())
+        return client.send_message(UserMessage(text=message))
+    
+    started = time.monotonic()
+    try:
+        if priority and SOS_HEDGE_AFTER_SECONDS > 0:
+            response = await hedged(attempt, SOS_HEDGE_AFTER_SECONDS, LLM_DEADLINE_SECONDS)
+        else:
+            response = await asyncio.wait_for(attempt(), LLM_DEADLINE_SECONDS)
+    except asyncio.CancelledError:
+        llm_breaker.abandon()
+        raise
+    except Exception:
+        llm_breaker.record_failure()
+        raise
+    llm_breaker.record_success(time.monotonic() - started)
+    return response
+
+async def stream_llm_reply_guarded(chat, message: str) -> AsyncIterator[str]:
+    """stream_llm_reply under the circuit breaker, a first-token deadline and an overall deadline"""
+    if not llm_breaker.allow():
+        raise CircuitOpen()
+    
+    started = time.monotonic()
+    first_token = None
+    try:
+        chunks = stream_llm_reply(chat, UserMessage(text=message))
+        async for chunk in iterate_with_deadline(chunks, LLM_FIRST_TOKEN_SECONDS, LLM_DEADLINE_SECONDS):
+            if first_token is None:
+                first_token = time.monotonic() - started
+            yield chunk
+    except (asyncio.CancelledError, GeneratorExit):
+        llm_breaker.abandon()
+        raise
+    except Exception:
+        llm_breaker.record_failure()
+        raise
+    # Streams are judged by time to first token, not by reply length
+    llm_breaker.record_success(first_token if first_token is not None else time.monotonic() - started)
+
+def response_cache_lane(request: ChatRequest, priority: bool) -> Optional[str]:
+    """SOS messages always, plain chat only for the first message of a session"""
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    if priority:
+        return SOS
+    return CHAT if not request.session_id else None
+
+def fallback_reply(message: str, reason: str, sos: bool) -> str:
+    fallback_counter.inc(reason=reason, lane="sos" if sos else "chat")
+    return fallback_responder.reply(message, sos=sos)
+
+# Compiled once from the indicator phrase lists
+personality_classifier = PersonalityClassifier()
+
 def extract_personalities_from_response(ai_response: str) -> List[str]:
     """Extract which personalities were used in the response"""
-    personalities = []
-    
-    # Check for personality indicators in response
-    if '🫂alex:' in ai_response.lower() or 'alex speaking' in ai_response.lower():
-        personalities.append('alex')
-    if '🧠casey:' in ai_response.lower() or 'casey here' in ai_response.lower():
-        personalities.append('casey')
-    if '⚡leo:' in ai_response.lower() or 'leo speaking' in ai_response.lower():
-        personalities.append('leo')
-    
-    # If no explicit indicators, try to infer from content
-    if not personalities:
-        response_lower = ai_response.lower()
-        
-        # Alex indicators (emotional support)
-        alex_indicators = ['understand', 'feel', 'tough', 'okay', 'support', 'here for you', 'validated', 'courage']
-        if any(indicator in response_lower for indicator in alex_indicators):
-            personalities.append('alex')
-            
-        # Casey indicators (strategy/analysis)
-        casey_indicators = ['plan', 'strategy', 'analyze', 'pattern', 'trigger', 'step', 'approach', 'solution']
-        if any(indicator in response_lower for indicator in casey_indicators):
-            personalities.append('casey')
-            
-        # Leo indicators (motivation)
-        leo_indicators = ['amazing', 'proud', 'win', 'victory', 'strong', 'power', 'champion', 'celebrate']
-        if any(indicator in response_lower for indicator in leo_indicators):
-            personalities.append('leo')
-    
-    # Default to Alex if nothing detected
-    if not personalities:
-        personalities = ['alex']
-        
-    return personalities
+    return personality_classifier.classify(ai_response)
 
-async def check_and_award_achievements(user_id: str, user_data: Dict) -> List[str]:
-    """Check if user has earned new achievements and award them"""
-    new_achievements = []
-    current_achievements = user_data.get('achievements', [])
+def normalize_trigger(trigger: Optional[str]) -> Optional[str]:
+    """Canonical form used to count distinct triggers"""
+    if not trigger:
+        return None
+    return trigger.lower().strip() or None
+
+async def compute_user_stats(user_id: str) -> UserStats:
+    """Compute a user's stats from their full check-in history, without storing them"""
+    stats = UserStats(user_id=user_id)
+    triggers = set()
+    counting_good_moods = True
     
-    # Get user stats
-    streak = user_data.get('current_streak', 0)
-    checkins = await db.checkins.count_documents({"user_id": user_id})
-    
-    # Check recent moods for mood master achievement
-    recent_checkins = await db.checkins.find({"user_id": user_id}).sort("created_at", -1).limit(5).to_list(5)
-    good_mood_streak = 0
-    for checkin in recent_checkins:
-        if checkin.get('mood', 0) >= 4:
-            good_mood_streak += 1
-        else:
-            break
+    cursor = db.checkins.find(
+        {"user_id": user_id},
+        {"_id": 0, "mood": 1, "had_urges": 1, "stayed_on_track": 1, "urge_triggers": 1}
+    ).sort("created_at", -1)
+    async for checkin in cursor:
+        stats.checkins += 1
+        if checkin.get('had_urges') and checkin.get('stayed_on_track'):
+            stats.urges_resisted += 1
+        trigger = normalize_trigger(checkin.get('urge_triggers'))
+        if trigger:
+            triggers.add(trigger)
+        # Newest first, so the good-mood run ends at the first low mood
+        if counting_good_moods:
+            if checkin.get('mood', 0) >= 4:
+                stats.good_mood_streak += 1
+            else:
+                counting_good_moods = False
     
-    # Count unique triggers identified
-    trigger_checkins = await db.checkins.find({"user_id": user_id, "urge_triggers": {"$exists": True, "$ne": None, "$ne": ""}}).to_list(None)
-    unique_triggers = len(set(checkin.get('urge_triggers', '').lower().strip() for checkin in trigger_checkins if checkin.get('urge_triggers')))
+    stats.triggers = sorted(triggers)
+    return stats
+
+async def rebuild_user_stats(user_id: str) -> UserStats:
+    """Recompute and store a user's stats document; used by backfill_user_stats.py"""
+    stats = await compute_user_stats(user_id)
+    await db.user_stats.replace_one({"user_id": user_id}, stats.dict(), upsert=True)
+    return stats
+
+async def record_checkin_stats(checkin: CheckIn) -> None:
+    """Fold a new check-in into the user's stats document in one atomic update"""
+    update = {
+        "$inc": {
+            "checkins": 1,
+            "urges_resisted": 1 if checkin.had_urges and checkin.stayed_on_track else 0
+        },
+        "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
+    }
+    if checkin.mood >= 4:
+        update["$inc"]["good_mood_streak"] = 1
+    else:
+        update["$set"]["good_mood_streak"] = 0
     
-    # Count urges resisted (had urges but stayed on track)
-    urges_resisted = await db.checkins.count_documents({"user_id": user_id, "had_urges": True, "stayed_on_track": True})
+    trigger = normalize_trigger(checkin.urge_triggers)
+    if trigger:
+        update["$addToSet"] = {"triggers": trigger}
     
-    # Check each achievement
-    for achievement in ACHIEVEMENTS:
-        if achievement['id'] in current_achievements:
-            continue
-            
-        condition = achievement['unlock_condition']
-        earned = False
-        
-        if condition['type'] == 'streak' and streak >= condition['value']:
-            earned = True
-        elif condition['type'] == 'checkins' and checkins >= condition['value']:
-            earned = True
-        elif condition['type'] == 'good_mood_streak' and good_mood_streak >= condition['value']:
-            earned = True
-        elif condition['type'] == 'triggers_identified' and unique_triggers >= condition['value']:
-            earned = True
-        elif condition['type'] == 'urges_resisted' and urges_resisted >= condition['value']:
-            earned = True
-            
-        if earned:
-            new_achievements.append(achievement['id'])
-            
-    # Update user achievements in database
+    # create_user seeds the document; the upsert only covers users created
+    # before stats existed, which backfill_user_stats.py rebuilds beforehand
+    await db.user_stats.update_one({"user_id": checkin.user_id}, update, upsert=True)
+
+async def get_user_stats(user_id: str) -> UserStats:
+    stats_doc = await db.user_stats.find_one({"user_id": user_id}, {"_id": 0})
+    if stats_doc:
+        return UserStats(**stats_doc)
+    # Not backfilled yet - read from history rather than racing live updates with a write
+    return await compute_user_stats(user_id)
+
+async def check_and_award_achievements(user_id: str, user_data: Dict,
+                                       changed_metrics: Optional[List[str]] = None) -> List[str]:
+    """Check if user has earned new achievements and award them.
+
+    When `changed_metrics` is given only the rules depending on those metrics
+    are evaluated.
+    """
+    current_achievements = user_data.get('achievements', [])
+    
+    # Get user stats
+    stats = await get_user_stats(user_id)
+    metric_values = achievement_engine.resolve_metrics(user_data, stats, changed_metrics)
+    new_achievements = achievement_engine.evaluate(metric_values, current_achievements)
+    
+    # Update user achievements in database; unseen ones are announced on the next progress fetch
     if new_achievements:
-        updated_achievements = current_achievements + new_achievements
-        await db.users.update_one(
-            {"id": user_id},
-            {"$set": {"achievements": updated_achievements}}
+        await user_repository.update(
+            user_id,
+            {"$addToSet": {
+                "achievements": {"$each": new_achievements},
+                "unseen_achievements": {"$each": new_achievements}
+            }, "$inc": {"revision": 1}}
         )
+        await live_updates.publish(user_id, {
+            "type": "achievements",
+            "achievements": achievement_engine.details(new_achievements)
+        })
         
     return new_achievements
 
-def get_galaxy_progress_data(streak: int, total_days: int, achievements: List[str]) -> Dict:
-    """Generate galaxy visualization data based on user progress"""
-    # Each star represents a day, with constellations forming at milestones
-    stars = []
-    
-    # Create stars for each day in current streak
-    for day in range(min(streak, 365)):  # Cap at 365 for performance
-        brightness = min(1.0, day / 100)  # Stars get brighter over time
-        star = {
-            "day": day + 1,
-            "brightness": brightness,
-            "constellation": get_constellation_name(day + 1),
-            "achieved": True
-        }
-        stars.append(star)
-    
-    # Calculate galaxy level based on total progress
-    galaxy_level = min(10, max(1, (total_days // 30) + 1))
-    
+def build_progress_event(user_doc: Dict, since_day: Optional[int] = None) -> Dict:
+    """Streak and galaxy delta pushed to open dashboards after a state change"""
+    streak = user_doc.get('current_streak', 0)
     return {
-        "stars": stars,
-        "galaxy_level": galaxy_level,
-        "constellations_unlocked": get_unlocked_constellations(streak),
-        "next_constellation": get_next_constellation(streak),
-        "total_light_years": total_days * 10  # Fun metric
+        "type": "progress",
+        "revision": user_doc.get('revision', 0),
+        "stats": {
+            "current_streak": streak,
+            "best_streak": user_doc.get('best_streak', 0),
+            "total_days_clean": user_doc.get('total_days_clean', 0),
+            "total_achievements": len(user_doc.get('achievements', []))
+        },
+        "galaxy": get_galaxy_progress_data(
+            streak,
+            user_doc.get('total_days_clean', 0),
+            user_doc.get('achievements', []),
+            since_day=since_day
+        )
     }
 
-def get_constellation_name(day: int) -> Optional[str]:
-    """Get constellation name for specific day milestones"""
-    constellations = {
-        7: "Determination",
-        14: "Strength", 
-        30: "Resilience",
-        60: "Wisdom",
-        90: "Transformation",
-        180: "Mastery",
-        365: "Transcendence"
-    }
-    
-    for milestone in sorted(constellations.keys()):
-        if day <= milestone:
-            return constellations[milestone]
-    return "Infinity"
+# Startup
 
-def get_unlocked_constellations(streak: int) -> List[str]:
-    """Get list of constellation names unlocked by current streak"""
-    milestones = [7, 14, 30, 60, 90, 180, 365]
-    unlocked = []
-    
-    for milestone in milestones:
-        if streak >= milestone:
-            unlocked.append(get_constellation_name(milestone))
-            
-    return unlocked
-
-def get_next_constellation(streak: int) -> Optional[Dict]:
-    """Get info about the next constellation to unlock"""
-    milestones = [7, 14, 30, 60, 90, 180, 365]
-    
-    for milestone in milestones:
-        if streak < milestone:
-            return {
-                "name": get_constellation_name(milestone),
-                "days_needed": milestone - streak,
-                "milestone": milestone
-            }
-            
-    return None
+@app.on_event("startup")
+async def provision_indexes():
+    """Make sure every hot query shape is backed by an index"""
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        # Serving without indexes is slow but still correct
+        logger.error(f"Index provisioning failed: {e}")
+
+@app.on_event("startup")
+async def start_pubsub():
+    await pubsub.start()
+
+@app.on_event("shutdown")
+async def stop_pubsub():
+    await pubsub.stop()
+
+@app.on_event("startup")
+async def start_write_behind():
+    # Replays any writes journaled before the last shutdown
+    await write_behind.start()
+
+@app.on_event("shutdown")
+async def stop_write_behind():
+    await write_behind.stop()
 
 # API Endpoints
 
@@ -355,116 +643,333 @@ async def health_check():
 
 @app.post("/api/users", response_model=User)
 async def create_user(request: CreateUserRequest):
-    user = User(name=request.name, goal=request.goal)
-    await db.users.insert_one(user.dict())
-    return user
+    user = User(name=request.name, goal=request.goal).dict()
+    await user_repository.insert(user)
+    await db.user_stats.insert_one(UserStats(user_id=user['id']).dict())
+    return FastJSONResponse(user)
 
 @app.get("/api/users/{user_id}", response_model=User)
-async def get_user(user_id: str):
-    user_doc = await db.users.find_one({"id": user_id})
+async def get_user(user_id: str, if_none_match: Optional[str] = Header(None)):
+    user_doc = await user_repository.get(user_id)
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
-    return User(**user_doc)
+    
+    etag = user_etag(user_doc, "user")
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return FastJSONResponse(
+        user_projector(user_doc),
+        headers={"ETag": etag, "Cache-Control": USER_CACHE_CONTROL}
+    )
+
+def record_chat_exchange(user_id: str, session_id: str, user_text: str, ai_text: str,
+                         personalities_used: List[str], user_data: Dict) -> Dict:
+    """Queue persistence for a finished exchange.
+
+    Nothing here waits on Mongo: the message pair is written behind the
+    response. Chatting changes none of the achievement metrics, so no rules are
+    evaluated. Returns the progress payload built from the user document
+    already in hand.
+    """
+    with stage_timer.stage("chat", "store_messages"):
+        user_msg = ChatMessage(
+            user_id=user_id,
+            session_id=session_id,
+            message_type="user",
+            content=user_text
+        )
+        ai_msg = ChatMessage(
+            user_id=user_id,
+            session_id=session_id,
+            message_type="ai",
+            content=ai_text,
+            personalities=personalities_used
+        )
+        write_behind.submit_insert_many("chat_messages", [user_msg.dict(), ai_msg.dict()])
+    
+    # Generate progress data
+    with stage_timer.stage("chat", "galaxy"):
+        galaxy = get_galaxy_progress_data(
+            user_data.get('current_streak', 0),
+            user_data.get('total_days_clean', 0),
+            user_data.get('achievements', [])
+        )
+    return {
+        "galaxy": galaxy,
+        "new_achievements": [],  # delivered by /progress once evaluated
+        "streak": user_data.get('current_streak', 0),
+        "best_streak": user_data.get('best_streak', 0)
+    }
+
+def record_llm_tokens(session_id: str, chat, prompt: str, reply: str) -> None:
+    """Count approximate prompt (system + user) and completion tokens.
+
+    The turn also counts towards the pooled chat's prompt size, since the
+    client sends it again as history on the session's next call.
+    """
+    system_message = getattr(chat, 'system_message', '') or ''
+    prompt_tokens, reply_tokens = estimate_tokens(prompt), estimate_tokens(reply)
+    llm_token_counter.inc(estimate_tokens(system_message) + prompt_tokens, direction="prompt")
+    llm_token_counter.inc(reply_tokens, direction="completion")
+    llm_pool.record_turn(session_id, prompt_tokens + reply_tokens)
+
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {dumps_str(data)}\n\n"
 
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_with_aura(request: ChatRequest):
+    return await handle_chat(request)
+
+async def handle_chat(request: ChatRequest, priority: bool = False):
     # Get user context
-    user_doc = await db.users.find_one({"id": request.user_id})
+    with stage_timer.stage("chat", "user_lookup"):
+        user_doc = await user_repository.get(request.user_id)
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user = User(**user_doc)
+    user = user_projector(user_doc)
     session_id = request.session_id or str(uuid.uuid4())
     
+    cache_lane = response_cache_lane(request, priority)
+    if cache_lane:
+        with stage_timer.stage("chat", "response_cache"):
+            cached = response_cache.lookup(user, cache_lane, request.message)
+        if cached is not None:
+            schedule_follow_up(request, user, session_id, priority)
+            return FastJSONResponse({
+                "ai_message": cached,
+                **finish_chat(request, session_id, user, cached, cached=True)
+            })
+    
+    with stage_timer.stage("chat", "admission"):
+        try:
+            ticket = await admit_llm_request(request.user_id, priority)
+        except HTTPException:
+            if not priority:
+                raise
+            # SOS skips the per-user bucket; a full priority lane still gets a grounding reply
+            response = fallback_reply(request.message, "admission", priority)
+            return FastJSONResponse({
+                "ai_message": response,
+                **finish_chat(request, session_id, user, response, fallback=True)
+            })
+    
+    fallback = None
     try:
         # Create unified LLM chat instance
-        chat = await create_unified_llm_chat(session_id, user.dict())
+        with stage_timer.stage("chat", "llm_client"):
+            chat = await create_unified_llm_chat(session_id, user, request.message)
         
         # Send message to LLM
-        user_message = UserMessage(text=request.message)
-        response = await chat.send_message(user_message)
-        
-        # Extract personalities used in response
-        personalities_used = extract_personalities_from_response(response)
-        
-        # Store user message in database
-        user_msg = ChatMessage(
-            user_id=request.user_id,
-            session_id=session_id,
-            message_type="user",
-            content=request.message
-        )
-        await db.chat_messages.insert_one(user_msg.dict())
-        
-        # Store AI response in database
-        ai_msg = ChatMessage(
-            user_id=request.user_id,
-            session_id=session_id,
-            message_type="ai",
-            content=response,
-            personalities=personalities_used
-        )
-        await db.chat_messages.insert_one(ai_msg.dict())
-        
-        # Check for new achievements
-        new_achievements = await check_and_award_achievements(request.user_id, user.dict())
+        with stage_timer.stage("chat", "llm_send"):
+            response = await request_llm_reply(chat, session_id, request.message, priority)
+        record_llm_tokens(session_id, chat, request.message, response)
+    except CircuitOpen:
+        fallback = "breaker_open"
+    except asyncio.TimeoutError:
+        error_counter.inc(endpoint="chat", type="TimeoutError")
+        if not priority:
+            raise HTTPException(status_code=504, detail="Aura is taking too long to respond, please try again")
+        fallback = "deadline"
+    except Exception as e:
+        error_counter.inc(endpoint="chat", type=type(e).__name__)
+        if not priority:
+            raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+        fallback = "error"
+    finally:
+        ticket.release()
+    
+    if fallback:
+        # SOS never ends in an error; plain chat only falls back while the breaker is open
+        response = fallback_reply(request.message, fallback, priority)
+    elif cache_lane:
+        response_cache.store(request.user_id, cache_lane, request.message, response)
+    
+    return FastJSONResponse({
+        "ai_message": response,
+        **finish_chat(request, session_id, user, response, fallback=fallback is not None)
+    })
+
+def finish_chat(request: ChatRequest, session_id: str, user: Dict, response: str,
+                fallback: bool = False, cached: bool = False) -> Dict:
+    """Record the exchange and build the reply fields shared by every chat route"""
+    personalities_used = extract_personalities_from_response(response)
+    progress_data = record_chat_exchange(
+        request.user_id, session_id, request.message, response, personalities_used, user
+    )
+    return {
+        "personalities_used": personalities_used,
+        "session_id": session_id,
+        "user_progress": progress_data,
+        "fallback": fallback,
+        "cached": cached
+    }
+
+def schedule_follow_up(request: ChatRequest, user: Dict, session_id: str, priority: bool) -> None:
+    if not RESPONSE_CACHE_FOLLOW_UP:
+        return
+    task = asyncio.create_task(send_follow_up(request, user, session_id, priority))
+    follow_up_tasks.add(task)
+    task.add_done_callback(follow_up_tasks.discard)
+
+async def send_follow_up(request: ChatRequest, user: Dict, session_id: str, priority: bool) -> None:
+    """Full LLM answer after a cached reply, stored in the session and pushed to open sockets"""
+    try:
+        ticket = await llm_admission.acquire(request.user_id, priority=priority)
+        async with ticket:
+            chat = await create_unified_llm_chat(session_id, user, request.message)
+            response = await request_llm_reply(chat, session_id, request.message, priority)
+    except Exception as e:
+        # The user already has an answer; a missing follow-up is not an error for them
+        logger.warning(f"Follow-up reply for {request.user_id} skipped: {type(e).__name__} {e}")
+        return
+    
+    record_llm_tokens(session_id, chat, request.message, response)
+    response_cache.store(request.user_id, SOS if priority else CHAT, request.message, response)
+    personalities_used = extract_personalities_from_response(response)
+    ai_msg = ChatMessage(
+        user_id=request.user_id,
+        session_id=session_id,
+        message_type="ai",
+        content=response,
+        personalities=personalities_used
+    )
+    write_behind.submit_insert_many("chat_messages", [ai_msg.dict()])
+    await live_updates.publish(request.user_id, {
+        "type": "chat_follow_up",
+        "session_id": session_id,
+        "ai_message": response,
+        "personalities_used": personalities_used
+    })
+
+@app.post("/api/chat/stream")
+async def chat_with_aura_stream(request: ChatRequest):
+    """Stream Aura's reply as Server-Sent Events.
+
+    Emits ``token`` events while the LLM is generating, then a single ``done``
+    event carrying the personalities and user progress once the exchange has
+    been stored. Failures arrive as an ``error`` event. Replies only arrive
+    token by token from clients that support streaming (see stream_llm_reply);
+    otherwise there is one ``token`` event with the full reply.
+    """
+    return await handle_chat_stream(request)
+
+async def handle_chat_stream(request: ChatRequest, priority: bool = False):
+    user_doc = await user_repository.get(request.user_id)
+    if not user_doc:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    user = user_projector(user_doc)
+    session_id = request.session_id or str(uuid.uuid4())
+    sse_headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    
+    cache_lane = response_cache_lane(request, priority)
+    cached = response_cache.lookup(user, cache_lane, request.message) if cache_lane else None
+    if cached is not None:
+        schedule_follow_up(request, user, session_id, priority)
         
-        # Get updated user data for progress
-        updated_user_doc = await db.users.find_one({"id": request.user_id})
-        updated_user = User(**updated_user_doc)
+        async def cached_stream():
+            yield format_sse("token", {"text": cached})
+            yield format_sse("done", finish_chat(request, session_id, user, cached, cached=True))
         
-        # Generate progress data
-        progress_data = {
-            "galaxy": get_galaxy_progress_data(
-                updated_user.current_streak, 
-                updated_user.total_days_clean, 
-                updated_user.achievements
-            ),
-            "new_achievements": [
-                next(a for a in ACHIEVEMENTS if a['id'] == achievement_id)
-                for achievement_id in new_achievements
-            ],
-            "streak": updated_user.current_streak,
-            "best_streak": updated_user.best_streak
-        }
+        return StreamingResponse(cached_stream(), media_type="text/event-stream", headers=sse_headers)
+    
+    def grounding_stream(reason: str) -> StreamingResponse:
+        """SOS reply when no LLM call can be made at all"""
+        response = fallback_reply(request.message, reason, priority)
         
-        return ChatResponse(
-            ai_message=response,
-            personalities_used=personalities_used,
-            session_id=session_id,
-            user_progress=progress_data
-        )
+        async def fallback_stream():
+            yield format_sse("token", {"text": response})
+            yield format_sse("done", finish_chat(request, session_id, user, response, fallback=True))
         
+        return StreamingResponse(fallback_stream(), media_type="text/event-stream", headers=sse_headers)
+    
+    # The slot is held until the stream finishes; admission happens before any bytes are sent
+    try:
+        ticket = await admit_llm_request(request.user_id, priority)
+    except HTTPException:
+        if not priority:
+            raise
+        return grounding_stream("admission")
+    try:
+        chat = await create_unified_llm_chat(session_id, user, request.message)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+        ticket.release()
+        if not priority:
+            raise
+        error_counter.inc(endpoint="chat_stream", type=type(e).__name__)
+        return grounding_stream("error")
+    
+    async def event_stream():
+        chunks = []
+        try:
+            fallback = None
+            try:
+                async for chunk in stream_llm_reply_guarded(chat, request.message):
+                    chunks.append(chunk)
+                    yield format_sse("token", {"text": chunk})
+            except CircuitOpen:
+                fallback = "breaker_open"
+            except asyncio.TimeoutError:
+                # Once words have reached the user a canned reply would only confuse
+                if chunks or not priority:
+                    raise HTTPException(status_code=504, detail="Aura is taking too long to respond, please try again")
+                error_counter.inc(endpoint="chat_stream", type="TimeoutError")
+                fallback = "deadline"
+            except Exception as e:
+                if chunks or not priority:
+                    raise
+                error_counter.inc(endpoint="chat_stream", type=type(e).__name__)
+                fallback = "error"
+            
+            if fallback:
+                response = fallback_reply(request.message, fallback, priority)
+                yield format_sse("token", {"text": response})
+            else:
+                response = "".join(chunks)
+                record_llm_tokens(session_id, chat, request.message, response)
+                if cache_lane:
+                    response_cache.store(request.user_id, cache_lane, request.message, response)
+            
+            # Persistence and achievements are queued only after the reply is delivered
+            yield format_sse("done", finish_chat(request, session_id, user, response, fallback=fallback is not None))
+        except HTTPException as e:
+            error_counter.inc(endpoint="chat_stream", type="TimeoutError")
+            yield format_sse("error", {"detail": e.detail})
+        except Exception as e:
+            error_counter.inc(endpoint="chat_stream", type=type(e).__name__)
+            yield format_sse("error", {"detail": f"Chat error: {str(e)}"})
+        finally:
+            ticket.release()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=sse_headers,
+        background=BackgroundTask(ticket.release)  # in case the stream never starts
+    )
 
 @app.post("/api/checkins", response_model=CheckIn)
 async def create_checkin(request: CheckInRequest):
-    # Get user to update streak
-    user_doc = await db.users.find_one({"id": request.user_id})
+    # Update streak and total days atomically, so concurrent check-ins can't lose counts
+    if request.stayed_on_track:
+        streak_update = [
+            {"$set": {
+                "current_streak": {"$add": [{"$ifNull": ["$current_streak", 0]}, 1]},
+                "total_days_clean": {"$add": [{"$ifNull": ["$total_days_clean", 0]}, 1]},
+                "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]}
+            }},
+            {"$set": {"best_streak": {"$max": [{"$ifNull": ["$best_streak", 0]}, "$current_streak"]}}}
+        ]
+    else:
+        streak_update = {"$set": {"current_streak": 0}, "$inc": {"revision": 1}}  # Reset streak on relapse
+    
+    user_doc = await user_repository.find_one_and_update(request.user_id, streak_update)
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user = User(**user_doc)
-    
-    # Update streak and total days based on check-in
-    if request.stayed_on_track:
-        user.current_streak += 1
-        user.total_days_clean += 1
-        if user.current_streak > user.best_streak:
-            user.best_streak = user.current_streak
-    else:
-        user.current_streak = 0  # Reset streak on relapse
-    
-    # Update user in database
-    await db.users.update_one(
-        {"id": request.user_id},
-        {"$set": {
-            "current_streak": user.current_streak,
-            "best_streak": user.best_streak,
-            "total_days_clean": user.total_days_clean
-        }}
-    )
+    user = user_projector(user_doc)
     
     # Create check-in record
     checkin = CheckIn(
@@ -476,128 +981,330 @@ async def create_checkin(request: CheckInRequest):
         urge_triggers=request.urge_triggers
     )
     
-    await db.checkins.insert_one(checkin.dict())
+    checkin_doc = checkin.dict()
+    await db.checkins.insert_one(dict(checkin_doc))
+    await record_checkin_stats(checkin)
+    await invalidate_weekly_report(checkin.user_id)
+    
+    # A kept streak adds one star; a reset resends the (empty) star list
+    since_day = min(user['current_streak'] - 1, MAX_STARS) if request.stayed_on_track else None
+    await live_updates.publish(request.user_id, build_progress_event(user_doc, since_day))
     
-    # Check for new achievements after checkin
-    await check_and_award_achievements(request.user_id, user.dict())
+    # Only rules whose metric this check-in can have moved are evaluated
+    changed_metrics = ["streak", "checkins", "good_mood_streak"]
+    if request.had_urges and request.stayed_on_track:
+        changed_metrics.append("urges_resisted")
+    if normalize_trigger(request.urge_triggers):
+        changed_metrics.append("triggers_identified")
+    await check_and_award_achievements(request.user_id, user, changed_metrics)
     
-    return checkin
+    return FastJSONResponse(checkin_doc)
 
 @app.get("/api/users/{user_id}/checkins", response_model=List[CheckIn])
 async def get_user_checkins(user_id: str):
-    checkins = await db.checkins.find({"user_id": user_id}).sort("created_at", -1).to_list(length=30)
-    return [CheckIn(**checkin) for checkin in checkins]
+    checkins = await db.checkins.find(
+        {"user_id": user_id}, checkin_projector.projection
+    ).sort("created_at", -1).to_list(length=30)
+    return FastJSONResponse(checkin_projector.many(checkins))
 
 @app.get("/api/users/{user_id}/progress")
-async def get_user_progress(user_id: str):
-    user_doc = await db.users.find_one({"id": user_id})
+async def get_user_progress(
+    user_id: str,
+    galaxy_since_day: Optional[int] = Query(None, ge=0),
+    if_none_match: Optional[str] = Header(None)
+):
+    user_doc = await user_repository.get(user_id)
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user = User(**user_doc)
+    # Unseen achievements are part of the payload, so clearing them bumps the revision too
+    since = galaxy_since_day if galaxy_since_day is not None else "all"
+    etag = user_etag(user_doc, "progress", since, ACHIEVEMENTS_VERSION)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
     
-    # Get galaxy progress data
+    progress = await build_progress(user_doc, galaxy_since_day)
+    return FastJSONResponse(progress, headers={"ETag": etag, "Cache-Control": USER_CACHE_CONTROL})
+
+async def build_progress(user_doc: Dict, galaxy_since_day: Optional[int] = None) -> Dict:
+    """Progress payload for a user document; marks unseen achievements as delivered"""
+    user = user_projector(user_doc)
+    
+    # Get galaxy progress data, only the stars after galaxy_since_day if given
     galaxy_data = get_galaxy_progress_data(
-        user.current_streak,
-        user.total_days_clean,
-        user.achievements
+        user['current_streak'],
+        user['total_days_clean'],
+        user['achievements'],
+        since_day=galaxy_since_day
     )
     
     # Get achievement details
-    user_achievement_details = []
-    for achievement_id in user.achievements:
-        achievement = next((a for a in ACHIEVEMENTS if a['id'] == achievement_id), None)
-        if achievement:
-            user_achievement_details.append(achievement)
+    user_achievement_details = achievement_engine.details(user['achievements'])
     
     # Get available achievements (not yet earned)
+    earned_ids = set(user['achievements'])
     available_achievements = [
-        a for a in ACHIEVEMENTS 
-        if a['id'] not in user.achievements
+        a for a in achievement_engine.catalog
+        if a['id'] not in earned_ids
     ]
     
+    # Achievements awarded in the background since the last fetch
+    unseen_achievements = user_doc.get('unseen_achievements', [])
+    if unseen_achievements:
+        await user_repository.update(user['id'], {
+            "$pullAll": {"unseen_achievements": unseen_achievements},
+            "$inc": {"revision": 1}
+        })
+    
     return {
         "galaxy": galaxy_data,
+        "new_achievements": achievement_engine.details(unseen_achievements),
         "achievements": {
             "earned": user_achievement_details,
             "available": available_achievements[:5]  # Show next 5 available
         },
         "stats": {
-            "current_streak": user.current_streak,
-            "best_streak": user.best_streak,
-            "total_days_clean": user.total_days_clean,
-            "total_achievements": len(user.achievements)
+            "current_streak": user['current_streak'],
+            "best_streak": user['best_streak'],
+            "total_days_clean": user['total_days_clean'],
+            "total_achievements": len(user['achievements'])
         }
     }
 
-@app.get("/api/users/{user_id}/weekly-report")
-async def generate_weekly_report(user_id: str):
-    """Generate weekly Aura Pulse report"""
-    user_doc = await db.users.find_one({"id": user_id})
+@app.get("/api/users/{user_id}/galaxy")
+async def get_user_galaxy(
+    user_id: str,
+    since_day: Optional[int] = Query(None, ge=0),
+    format: str = Query("full", pattern="^(full|compact)$"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Galaxy payload on its own, with delta (since_day) and ETag revalidation"""
+    user_doc = await user_repository.get(user_id)
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get data from last 7 days
-    week_start = datetime.now(timezone.utc) - timedelta(days=7)
-    week_checkins = await db.checkins.find({
-        "user_id": user_id,
-        "created_at": {"$gte": week_start.isoformat()}
-    }).to_list(None)
-    
-    if not week_checkins:
-        return {"message": "Not enough data for weekly report yet. Complete a few more check-ins!"}
+    streak = user_doc.get('current_streak', 0)
+    total_days = user_doc.get('total_days_clean', 0)
+    compact = format == "compact"
+    etag = galaxy_etag(streak, total_days, compact, since_day)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
     
-    # Calculate statistics
-    total_checkins = len(week_checkins)
-    clean_days = sum(1 for c in week_checkins if c.get('stayed_on_track'))
-    total_urges = sum(1 for c in week_checkins if c.get('had_urges'))
-    avg_mood = sum(c.get('mood', 3) for c in week_checkins) / total_checkins if total_checkins > 0 else 3
-    
-    # Find most common trigger
-    triggers = [c.get('urge_triggers') for c in week_checkins if c.get('urge_triggers')]
-    most_common_trigger = max(set(triggers), key=triggers.count) if triggers else None
+    galaxy_data = get_galaxy_progress_data(
+        streak, total_days, user_doc.get('achievements', []),
+        since_day=since_day, compact=compact
+    )
+    return FastJSONResponse(galaxy_data, headers={"ETag": etag, "Cache-Control": USER_CACHE_CONTROL})
+
+def get_report_week(moment: Optional[datetime] = None):
+    """Start (Monday 00:00 UTC) and exclusive end of the ISO week containing `moment`"""
+    moment = moment or datetime.now(timezone.utc)
+    week_start = (moment - timedelta(days=moment.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return week_start, week_start + timedelta(days=7)
+
+async def compute_weekly_stats(user_id: str, week_start: datetime, week_end: datetime) -> Optional[Dict]:
+    """Aggregate a week of check-ins server-side in a single round trip"""
+    pipeline = [
+        {"$match": {
+            "user_id": user_id,
+            "created_at": {"$gte": week_start.isoformat(), "$lt": week_end.isoformat()}
+        }},
+        {"$facet": {
+            "summary": [{"$group": {
+                "_id": None,
+                "total_checkins": {"$sum": 1},
+                "clean_days": {"$sum": {"$cond": ["$stayed_on_track", 1, 0]}},
+                "total_urges": {"$sum": {"$cond": ["$had_urges", 1, 0]}},
+                "avg_mood": {"$avg": {"$ifNull": ["$mood", 3]}}
+            }}],
+            "top_trigger": [
+                {"$match": {"urge_triggers": {"$nin": [None, ""]}}},
+                {"$group": {"_id": "$urge_triggers", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": 1}
+            ]
+        }}
+    ]
+    result = await db.checkins.aggregate(pipeline).to_list(1)
+    if not result or not result[0]["summary"] or not result[0]["summary"][0]["total_checkins"]:
+        return None
     
-    # Generate insights
+    stats = result[0]["summary"][0]
+    top_trigger = result[0]["top_trigger"]
+    stats["most_common_trigger"] = top_trigger[0]["_id"] if top_trigger else None
+    return stats
+
+def build_weekly_insights(stats: Dict) -> List[str]:
     insights = []
-    if avg_mood >= 4:
+    if stats["avg_mood"] >= 4:
         insights.append("🌟 Your mood has been consistently positive this week!")
-    if clean_days == total_checkins:
+    if stats["clean_days"] == stats["total_checkins"]:
         insights.append("🎉 Perfect week! You stayed on track every single day.")
-    if total_urges == 0:
+    if stats["total_urges"] == 0:
         insights.append("💪 Amazing! No urges reported this week - you're building strong mental fortitude.")
-    elif total_urges > 0:
-        insights.append(f"🛡️ You faced {total_urges} urges but stayed strong - that's real resilience!")
+    elif stats["total_urges"] > 0:
+        insights.append(f"🛡️ You faced {stats['total_urges']} urges but stayed strong - that's real resilience!")
     
-    if most_common_trigger:
-        insights.append(f"🔍 Your main trigger this week was '{most_common_trigger}' - let's create a specific plan for this.")
-    
-    # Check achievements earned this week
-    week_achievements = []  # Could implement by tracking achievement timestamps
+    if stats["most_common_trigger"]:
+        insights.append(f"🔍 Your main trigger this week was '{stats['most_common_trigger']}' - let's create a specific plan for this.")
+    return insights
+
+async def compute_weekly_report(user_id: str, week_start: datetime, week_end: datetime) -> Optional[WeeklyReport]:
+    """Compute the report for one ISO week, or None if there were no check-ins"""
+    stats = await compute_weekly_stats(user_id, week_start, week_end)
+    if stats is None:
+        return None
     
-    report = WeeklyReport(
+    return WeeklyReport(
         user_id=user_id,
         week_start=week_start.date().isoformat(),
-        week_end=datetime.now(timezone.utc).date().isoformat(),
-        avg_mood=avg_mood,
-        clean_days=clean_days,
-        total_urges=total_urges,
-        most_common_trigger=most_common_trigger,
-        achievements_earned=week_achievements,
-        insights=insights
+        week_end=(week_end - timedelta(days=1)).date().isoformat(),
+        avg_mood=stats["avg_mood"],
+        clean_days=stats["clean_days"],
+        total_urges=stats["total_urges"],
+        most_common_trigger=stats["most_common_trigger"],
+        achievements_earned=[],  # Could implement by tracking achievement timestamps
+        insights=build_weekly_insights(stats)
     )
+
+async def weekly_report_version(user_id: str, week_start: datetime) -> Optional[int]:
+    """Invalidation count of the stored user-week, read before computing its report"""
+    stored = await db.weekly_reports.find_one(
+        {"user_id": user_id, "week_start": week_start.date().isoformat()}, {"_id": 0, "version": 1}
+    )
+    return stored.get("version") if stored else None
+
+def weekly_report_upsert(report: WeeklyReport, version: Optional[int]):
+    """Filter and update that store `report` as its user-week's single copy.
+
+    Every check-in bumps the stored `version`, so the filter only matches if
+    none arrived since `version` was read; otherwise the upsert's insert hits
+    the unique (user_id, week_start) index and the stale flag stays raised.
+    The id of an existing report is kept.
+    """
+    report_fields = report.dict()
+    report_id = report_fields.pop("id")
+    return (
+        {"user_id": report.user_id, "week_start": report.week_start,
+         "version": version if version is not None else {"$exists": False}},
+        {"$set": {**report_fields, "stale": False}, "$setOnInsert": {"id": report_id}}
+    )
+
+async def build_weekly_report(user_id: str, week_start: datetime, week_end: datetime) -> Optional[WeeklyReport]:
+    """Compute the report for one ISO week and upsert it as that week's stored copy"""
+    version = await weekly_report_version(user_id, week_start)
+    report = await compute_weekly_report(user_id, week_start, week_end)
+    if report is None:
+        return None
     
-    # Store report
-    await db.weekly_reports.insert_one(report.dict())
-    
+    query, update = weekly_report_upsert(report, version)
+    try:
+        stored = await db.weekly_reports.find_one_and_update(
+            query,
+            update,
+            projection={"_id": 0, "id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A check-in landed while computing; serve this report but leave the stored one stale
+        return report
+    report.id = stored["id"]
     return report
 
+async def invalidate_weekly_report(user_id: str, moment: Optional[datetime] = None) -> None:
+    """Mark the stored report for the week containing `moment` as out of date"""
+    week_start, _ = get_report_week(moment)
+    # Upserted so a report being computed for a week with no stored copy yet is not saved as fresh
+    await db.weekly_reports.update_one(
+        {"user_id": user_id, "week_start": week_start.date().isoformat()},
+        {"$set": {"stale": True}, "$inc": {"version": 1}, "$setOnInsert": {"id": str(uuid.uuid4())}},
+        upsert=True
+    )
+
+@app.get("/api/users/{user_id}/weekly-report")
+async def generate_weekly_report(user_id: str):
+    """Generate weekly Aura Pulse report for the current ISO week"""
+    user_doc = await user_repository.get(user_id)
+    if not user_doc:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return FastJSONResponse(await load_weekly_report(user_id))
+
+async def load_weekly_report(user_id: str) -> Dict:
+    """This week's report, served from the stored copy unless a check-in arrived since it was built"""
+    week_start, week_end = get_report_week()
+    
+    cached = await db.weekly_reports.find_one(
+        {"user_id": user_id, "week_start": week_start.date().isoformat(), "stale": False},
+        {"_id": 0, "stale": 0, "version": 0}
+    )
+    if cached:
+        return cached
+    
+    report = await build_weekly_report(user_id, week_start, week_end)
+    if report is None:
+        return {"message": "Not enough data for weekly report yet. Complete a few more check-ins!"}
+    return report.dict()
+
+# Sections slower than this are left out of the dashboard and reported as pending
+DASHBOARD_SLOW_SECTION_SECONDS = float(os.environ.get('DASHBOARD_SLOW_SECTION_SECONDS', '0.5'))
+# The event loop only keeps weak references to tasks; sections outliving their request are held here
+dashboard_tasks: Set[asyncio.Task] = set()
+
+def log_background_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background dashboard section failed: {task.exception()}")
+
+@app.get("/api/users/{user_id}/dashboard")
+async def get_dashboard(user_id: str, galaxy_since_day: Optional[int] = Query(None, ge=0)):
+    """User, progress and weekly report in one round trip.
+
+    All sections share one user read and run concurrently. The weekly report
+    may need a full aggregation; if it isn't ready within
+    DASHBOARD_SLOW_SECTION_SECONDS it comes back as null and is listed under
+    ``pending``, while the computation carries on and stores the report for
+    the next /weekly-report or dashboard fetch.
+    """
+    user_doc = await user_repository.get(user_id)
+    if not user_doc:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    weekly_task = asyncio.create_task(load_weekly_report(user_id))
+    progress, (done, _) = await asyncio.gather(
+        build_progress(user_doc, galaxy_since_day),
+        asyncio.wait({weekly_task}, timeout=DASHBOARD_SLOW_SECTION_SECONDS)
+    )
+    
+    pending = []
+    weekly_report = None
+    if weekly_task in done and weekly_task.exception() is None:
+        weekly_report = weekly_task.result()
+    elif weekly_task in done:
+        logger.error(f"Dashboard weekly report for {user_id} failed: {weekly_task.exception()}")
+        pending.append("weekly_report")
+    else:
+        dashboard_tasks.add(weekly_task)
+        weekly_task.add_done_callback(dashboard_tasks.discard)
+        weekly_task.add_done_callback(log_background_failure)
+        pending.append("weekly_report")
+    
+    return FastJSONResponse({
+        "user": user_projector(user_doc),
+        "progress": progress,
+        "weekly_report": weekly_report,
+        "pending": pending
+    })
+
 @app.post("/api/relapses", response_model=Relapse)
 async def report_relapse(request: RelapseRequest):
     # Reset user streak but keep total days clean
-    await db.users.update_one(
-        {"id": request.user_id},
-        {"$set": {"current_streak": 0}}
+    user_doc = await user_repository.find_one_and_update(
+        request.user_id,
+        {"$set": {"current_streak": 0}, "$inc": {"revision": 1}}
     )
+    if user_doc:
+        await live_updates.publish(request.user_id, build_progress_event(user_doc))
     
     relapse = Relapse(
         user_id=request.user_id,
@@ -607,31 +1314,136 @@ async def report_relapse(request: RelapseRequest):
         time_of_day=request.time_of_day
     )
     
-    await db.relapses.insert_one(relapse.dict())
-    return relapse
+    relapse_doc = relapse.dict()
+    await db.relapses.insert_one(dict(relapse_doc))
+    return FastJSONResponse(relapse_doc)
+
+def parse_history_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        return decode_history_cursor(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 @app.get("/api/users/{user_id}/chat-history/{session_id}")
-async def get_chat_history(user_id: str, session_id: str):
-    messages = await db.chat_messages.find({
-        "user_id": user_id,
-        "session_id": session_id
-    }).sort("created_at", 1).to_list(length=100)
+async def get_chat_history(
+    user_id: str,
+    session_id: str,
+    limit: int = Query(100, ge=1, le=500),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """Chat history in (created_at, id) order, paged with keyset cursors.
+
+    Returns the oldest page by default; `before`/`after` take the cursors from the
+    X-Prev-Cursor / X-Next-Cursor headers. `format=ndjson` streams every message
+    after the `after` cursor (or from the start) without buffering.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    before_key, after_key = parse_history_cursor(before), parse_history_cursor(after)
+    
+    if format == "ndjson":
+        async def stream_messages():
+            async for message in chat_history.iter_messages(user_id, session_id, before_key, after_key):
+                yield dumps_str(message) + "\n"
+        
+        return StreamingResponse(stream_messages(), media_type="application/x-ndjson")
     
-    return [ChatMessage(**msg) for msg in messages]
+    messages, headers = await chat_history.page(user_id, session_id, limit, before_key, after_key)
+    return FastJSONResponse(messages, headers=headers)
+
+def to_sos_request(request: ChatRequest) -> ChatRequest:
+    """Add SOS context to message to trigger Alex personality"""
+    request.message = f"[SOS - URGENT SUPPORT NEEDED] {request.message}"
+    return request
 
 @app.post("/api/sos")
 async def sos_support(request: ChatRequest):
     """Special SOS endpoint for immediate urge support"""
-    # Add SOS context to message to trigger Alex personality
-    sos_message = f"[SOS - URGENT SUPPORT NEEDED] {request.message}"
-    request.message = sos_message
+    return await handle_chat(to_sos_request(request), priority=True)
+
+@app.post("/api/sos/stream")
+async def sos_support_stream(request: ChatRequest):
+    """Streaming SOS endpoint - first words reach the user as soon as they are generated"""
+    return await handle_chat_stream(to_sos_request(request), priority=True)
+
+@app.websocket("/ws/users/{user_id}")
+async def user_updates_socket(websocket: WebSocket, user_id: str):
+    """Push progress and achievement events for one user as JSON text frames.
+
+    A ``progress`` snapshot is sent on connect; later ``progress`` events carry
+    galaxy deltas (see galaxy.py) and ``achievements`` events carry new unlocks.
+    """
+    user_doc = await user_repository.get(user_id)
+    if not user_doc:
+        await websocket.close(code=4404)
+        return
     
-    return await chat_with_aura(request)
+    await websocket.accept()
+    queue = live_updates.connect(user_id)
+    
+    async def forward_events():
+        await websocket.send_text(dumps_str(build_progress_event(user_doc)))
+        while True:
+            await websocket.send_text(dumps_str(await queue.get()))
+    
+    sender = asyncio.create_task(forward_events())
+    try:
+        # Nothing is expected from the client; receiving just notices the disconnect
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        sender.cancel()
+        live_updates.disconnect(user_id, queue)
+
+@app.get("/api/llm/pool-stats")
+async def get_llm_pool_stats():
+    """Hit/miss/eviction counters for the pooled LLM sessions"""
+    return llm_pool.stats()
+
+@app.get("/api/cache/user-stats")
+async def get_user_cache_stats():
+    """Hit rate of the in-process user document cache"""
+    return user_repository.cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def export_metrics():
+    """Prometheus text exposition of latency histograms, counters and pool/cache gauges"""
+    for name, value in llm_pool.stats().items():
+        if isinstance(value, (int, float)):
+            metrics.gauge("aura_llm_pool", "LLM session pool statistics").set(value, stat=name)
+    for name, value in write_behind.stats().items():
+        metrics.gauge("aura_write_behind", "Write-behind queue statistics").set(value, stat=name)
+    for name, value in user_repository.cache.stats().items():
+        if isinstance(value, (int, float)):
+            metrics.gauge("aura_user_cache", "User document cache statistics").set(value, stat=name)
+    for name, value in llm_admission.stats().items():
+        metrics.gauge("aura_llm_admission", "LLM admission control queue and slot statistics").set(value, stat=name)
+    for name, value in llm_breaker.stats().items():
+        metrics.gauge("aura_llm_breaker", "LLM circuit breaker state").set(value, stat=name)
+    for name, value in {**prompt_assembler.stats(), **prompt_cache_usage.stats()}.items():
+        metrics.gauge("aura_llm_prompt_cache", "Prompt prefix cache statistics").set(value, stat=name)
+    for name, value in response_cache.stats().items():
+        metrics.gauge("aura_response_cache", "Semantic response cache statistics").set(value, stat=name)
+    for name, value in live_updates.stats().items():
+        metrics.gauge("aura_live_updates", "WebSocket live update statistics").set(value, stat=name)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/api/achievements")
-async def get_all_achievements():
+async def get_all_achievements(if_none_match: Optional[str] = Header(None)):
     """Get list of all available achievements"""
-    return {"achievements": ACHIEVEMENTS}
+    etag = f'W/"achievements-{ACHIEVEMENTS_VERSION}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, CATALOG_CACHE_CONTROL)
+    return FastJSONResponse(
+        {"achievements": achievement_engine.catalog},
+        headers={"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    )
 
 if __name__ == "__main__":
     import uvicorn
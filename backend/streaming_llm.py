@@ -0,0 +1,64 @@
+"""LlmChat-compatible client that streams replies straight from litellm.
+
+The emergentintegrations LlmChat only returns finished replies. This client
+keeps the same interface (with_model, send_message, and the session history
+in ``messages``) but calls litellm.acompletion itself, with stream=True for
+stream_message, so /api/chat/stream and /api/sos/stream deliver tokens as the
+provider generates them. The calls go through litellm.acompletion looked up
+at call time, so the prompt-cache wrapper in prompt_cache.py applies.
+
+Enabled with LLM_STREAMING=1. It talks to the provider directly, so it needs
+a provider key (LLM_STREAMING_API_KEY, or the variable litellm reads for the
+provider, e.g. ANTHROPIC_API_KEY); the Emergent universal key is not accepted.
+"""
+from typing import AsyncIterator, Dict, List, Optional
+
+try:
+    import litellm
+except ImportError:  # pragma: no cover - the client is simply unavailable
+    litellm = None
+
+
+class LiteLlmChat:
+    """Mimics the LlmChat interface used by server.py, adding stream_message"""
+
+    def __init__(self, api_key: Optional[str] = None, session_id: Optional[str] = None,
+                 system_message: str = "", max_tokens: int = 1024):
+        if litellm is None:
+            raise RuntimeError("LLM_STREAMING=1 needs litellm installed")
+        self.api_key = api_key
+        self.session_id = session_id
+        self.system_message = system_message
+        self.max_tokens = max_tokens
+        self.model = ""
+        self.messages: List[Dict[str, str]] = []
+
+    def with_model(self, provider: str, model: str):
+        self.model = f"{provider}/{model}"
+        return self
+
+    def _request(self, text: str) -> Dict:
+        messages = [{"role": "system", "content": self.system_message}] if self.system_message else []
+        messages += self.messages + [{"role": "user", "content": text}]
+        return {"model": self.model, "messages": messages, "max_tokens": self.max_tokens, "api_key": self.api_key}
+
+    def _remember(self, text: str, reply: str) -> None:
+        # Only completed turns become history, so a failed call can simply be retried
+        self.messages += [{"role": "user", "content": text}, {"role": "assistant", "content": reply}]
+
+    async def stream_message(self, user_message) -> AsyncIterator[str]:
+        """Yield reply text as the provider streams it"""
+        chunks = []
+        stream = await litellm.acompletion(**self._request(user_message.text), stream=True)
+        async for part in stream:
+            text = part.choices[0].delta.content if part.choices else None
+            if text:
+                chunks.append(text)
+                yield text
+        self._remember(user_message.text, "".join(chunks))
+
+    async def send_message(self, user_message) -> str:
+        response = await litellm.acompletion(**self._request(user_message.text))
+        reply = response.choices[0].message.content or ""
+        self._remember(user_message.text, reply)
+        return reply
@@ -0,0 +1,122 @@
+"""Read-through cache for user documents.
+
+UserRepository is the only code path that reads or writes the users
+collection from the API. Reads are served from an in-process LRU with a TTL.
+Writes go through the repository, which drops the cached copy and publishes an
+invalidation so other workers drop theirs too.
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+INVALIDATION_CHANNEL = "users:invalidate"
+
+
+class UserCache:
+    """LRU + TTL map of user_id -> user document"""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        # Bumped on every invalidation so an in-flight read can't store a stale copy
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        entry = self._entries.get(user_id)
+        if entry is None or self.clock() - entry[0] >= self.ttl:
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(user_id)
+        return dict(entry[1])
+
+    def generation(self, user_id: str) -> int:
+        return self._generations.get(user_id, 0)
+
+    def put(self, user_id: str, user_doc: Dict, generation: Optional[int] = None) -> None:
+        if generation is not None and generation != self.generation(user_id):
+            return  # invalidated while the read was in flight
+        self._entries[user_id] = (self.clock(), dict(user_doc))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        self._entries.pop(user_id, None)
+        self._generations[user_id] = self.generation(user_id) + 1
+        self.invalidations += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class UserRepository:
+    """Cached access to the users collection"""
+
+    def __init__(self, collection, cache: UserCache, pubsub=None):
+        self.collection = collection
+        self.cache = cache
+        self.pubsub = pubsub
+        if pubsub is not None:
+            pubsub.subscribe(INVALIDATION_CHANNEL, self._on_invalidation)
+
+    async def get(self, user_id: str) -> Optional[Dict]:
+        user_doc = self.cache.get(user_id)
+        if user_doc is not None:
+            return user_doc
+        generation = self.cache.generation(user_id)
+        user_doc = await self.collection.find_one({"id": user_id}, {"_id": 0})
+        if user_doc is not None:
+            self.cache.put(user_id, user_doc, generation)
+        return user_doc
+
+    async def insert(self, user_doc: Dict) -> None:
+        await self.collection.insert_one(dict(user_doc))
+        self.cache.put(user_doc["id"], user_doc)
+
+    async def update(self, user_id: str, update: Dict):
+        result = await self.collection.update_one({"id": user_id}, update)
+        await self.invalidate(user_id)
+        return result
+
+    async def find_one_and_update(self, user_id: str, update) -> Optional[Dict]:
+        """Apply `update` atomically and return (and cache) the updated document"""
+        user_doc = await self.collection.find_one_and_update(
+            {"id": user_id},
+            update,
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        await self.invalidate(user_id)
+        if user_doc is not None:
+            self.cache.put(user_id, user_doc, self.cache.generation(user_id))
+        return user_doc
+
+    async def invalidate(self, user_id: str) -> None:
+        if self.pubsub is None:
+            self.cache.invalidate(user_id)
+        else:
+            # Delivered to this worker's handler as well as every other worker's
+            await self.pubsub.publish(INVALIDATION_CHANNEL, {"user_id": user_id})
+
+    def _on_invalidation(self, message: Dict) -> None:
+        self.cache.invalidate(message["user_id"])
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Precompute weekly Aura Pulse reports for every user active this week.
+
+Active users are streamed from the week's check-ins in user_id order. Their
+reports are computed by a bounded pool of asyncio workers and written with
+one bulk_write of upserts per batch. A report whose week received a check-in
+while it was computed is not written (see weekly_report_upsert). After each
+batch the last user_id is checkpointed, so an interrupted run picks up where
+it stopped; a run after a completed one starts over.
+
+Usage (from the backend directory):
+    python weekly_report_job.py [--week YYYY-MM-DD] [--workers 16] [--batch-size 500] [--restart]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from server import db, get_report_week, compute_weekly_report, weekly_report_upsert, weekly_report_version
+
+
+async def active_user_ids(week_start, week_end, after=None):
+    """Stream the distinct users with check-ins in the week, in user_id order"""
+    pipeline = [
+        {"$match": {"created_at": {"$gte": week_start.isoformat(), "$lt": week_end.isoformat()}}},
+        {"$group": {"_id": "$user_id"}},
+    ]
+    if after is not None:
+        pipeline.append({"$match": {"_id": {"$gt": after}}})
+    pipeline.append({"$sort": {"_id": 1}})
+
+    async for group in db.checkins.aggregate(pipeline, allowDiskUse=True):
+        yield group["_id"]
+
+
+async def compute_batch(user_ids, week_start, week_end, workers):
+    """Compute reports for a batch with at most `workers` running at once"""
+    queue = asyncio.Queue()
+    for user_id in user_ids:
+        queue.put_nowait(user_id)
+    reports = []
+
+    async def worker():
+        while True:
+            try:
+                user_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            version = await weekly_report_version(user_id, week_start)
+            report = await compute_weekly_report(user_id, week_start, week_end)
+            if report is not None:
+                reports.append((report, version))
+
+    await asyncio.gather(*(worker() for _ in range(min(workers, len(user_ids)))))
+    return reports
+
+
+async def write_batch(reports):
+    if not reports:
+        return
+    try:
+        await db.weekly_reports.bulk_write(
+            [UpdateOne(*weekly_report_upsert(report, version), upsert=True) for report, version in reports],
+            ordered=False
+        )
+    except BulkWriteError as e:
+        # Duplicate keys are reports invalidated mid-computation; they stay stale
+        if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+
+async def run(week_start, week_end, workers=16, batch_size=500, restart=False):
+    job_id = f"weekly_reports:{week_start.date().isoformat()}"
+    if restart:
+        await db.job_checkpoints.delete_one({"_id": job_id})
+    checkpoint = await db.job_checkpoints.find_one({"_id": job_id}) or {}
+    if checkpoint.get("completed_at"):
+        # Only an interrupted run is resumed; after a completed one the week is rebuilt
+        await db.job_checkpoints.delete_one({"_id": job_id})
+        checkpoint = {}
+    after = checkpoint.get("last_user_id")
+    processed = checkpoint.get("processed", 0)
+    if after:
+        print(f"↪️  Resuming {job_id} after user {after} ({processed} already done)")
+
+    start = time.time()
+    done_this_run = 0
+    batch = []
+
+    async def flush():
+        nonlocal processed, done_this_run
+        reports = await compute_batch(batch, week_start, week_end, workers)
+        await write_batch(reports)
+        processed += len(batch)
+        done_this_run += len(batch)
+        await db.job_checkpoints.update_one(
+            {"_id": job_id},
+            {"$set": {
+                "last_user_id": batch[-1],
+                "processed": processed,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }},
+            upsert=True
+        )
+        elapsed = time.time() - start
+        print(f"  {processed} users done - {done_this_run / elapsed:.1f} users/s")
+        batch.clear()
+
+    async for user_id in active_user_ids(week_start, week_end, after):
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    await db.job_checkpoints.update_one(
+        {"_id": job_id},
+        {"$set": {"completed_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+    elapsed = time.time() - start
+    rate = done_this_run / elapsed if elapsed > 0 else 0.0
+    print(f"✅ {job_id}: {done_this_run} users in {elapsed:.1f}s ({rate:.1f} users/s)")
+    return {"processed": done_this_run, "seconds": elapsed, "users_per_second": rate}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute weekly reports")
+    parser.add_argument("--week", help="any date in the ISO week to build (default: current week)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    moment = None
+    if args.week:
+        moment = datetime.fromisoformat(args.week).replace(tzinfo=timezone.utc)
+    week_start, week_end = get_report_week(moment)
+    asyncio.run(run(week_start, week_end, args.workers, args.batch_size, args.restart))
+
+
+if __name__ == "__main__":
+    main()
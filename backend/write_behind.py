@@ -0,0 +1,216 @@
+"""Write-behind queue for work that doesn't need to finish before responding.
+
+Database writes are appended to an on-disk journal (JSON lines) before being
+queued, and marked done once Mongo acknowledges them. A failed write stays in
+the journal and is retried with backoff; after `max_attempts` it is moved to
+dead_letter.jsonl in the journal directory for manual replay. Anything still
+pending when the process dies is replayed on the next start. Each worker
+process claims its own journal file in the journal directory with an
+exclusive lock; journals left by workers that are gone are adopted and
+replayed.
+"""
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import os
+import uuid
+from typing import Dict, List
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class WriteBehindQueue:
+    def __init__(self, db, journal_dir: str, workers: int = 4,
+                 retry_base_delay: float = 0.5, retry_max_delay: float = 30.0,
+                 compact_threshold: int = 1000, max_attempts: int = 10):
+        self.db = db
+        self.journal_dir = journal_dir
+        self.workers = workers
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.compact_threshold = compact_threshold
+        self.max_attempts = max_attempts
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending: Dict[str, Dict] = {}
+        self._journal = None
+        self._done_since_compaction = 0
+        self._tasks: List[asyncio.Task] = []
+        self._retries: set = set()
+        self.completed = 0
+        self.failures = 0
+        self.dead_lettered = 0
+
+    # Journal
+
+    def _claim_journal(self) -> None:
+        os.makedirs(self.journal_dir, exist_ok=True)
+        slot = 0
+        while True:
+            path = os.path.join(self.journal_dir, f"write_behind.{slot}.jsonl")
+            handle = open(path, "a+")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                slot += 1
+                continue
+            self._journal = handle
+            self.journal_path = path
+            return
+
+    @staticmethod
+    def _read_pending(handle) -> Dict[str, Dict]:
+        handle.seek(0)
+        pending = {}
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn final line from a crash
+            if entry.get("done"):
+                pending.pop(entry["id"], None)
+            else:
+                pending[entry["id"]] = entry
+        return pending
+
+    def _adopt_orphaned_journals(self) -> Dict[str, Dict]:
+        """Collect pending writes from journals no live worker holds"""
+        adopted = {}
+        for path in glob.glob(os.path.join(self.journal_dir, "write_behind.*.jsonl")):
+            if path == self.journal_path:
+                continue
+            with open(path, "a+") as handle:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # owned by a running worker
+                adopted.update(self._read_pending(handle))
+                handle.truncate(0)
+        return adopted
+
+    def _append(self, entry: Dict) -> None:
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+
+    def _mark_done(self, entry_id: str) -> None:
+        self._pending.pop(entry_id, None)
+        self._append({"id": entry_id, "done": True})
+        self._done_since_compaction += 1
+        # Still-pending writes (e.g. ones awaiting a retry) are carried over
+        if self._done_since_compaction >= self.compact_threshold:
+            self._compact()
+
+    def _dead_letter(self, entry: Dict, error: Exception) -> None:
+        """Give up on a write: keep it outside the journal so it is no longer replayed"""
+        with open(os.path.join(self.journal_dir, "dead_letter.jsonl"), "a") as handle:
+            handle.write(json.dumps({**entry, "error": str(error)}) + "\n")
+        self.dead_lettered += 1
+        self._mark_done(entry["id"])
+
+    def _compact(self) -> None:
+        """Rewrite the journal with only the writes still pending"""
+        self._journal.truncate(0)
+        for entry in self._pending.values():
+            self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        self._done_since_compaction = 0
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        self._claim_journal()
+        self._pending = self._read_pending(self._journal)
+        self._pending.update(self._adopt_orphaned_journals())
+        self._compact()
+        if self._pending:
+            logger.info(f"Replaying {len(self._pending)} journaled writes")
+        for entry in self._pending.values():
+            self._queue.put_nowait((entry, 0))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Give queued work a chance to finish; anything left stays journaled"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Write-behind stopped with {self._queue.qsize()} jobs queued")
+        for task in self._tasks + list(self._retries):
+            task.cancel()
+        self._tasks = []
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+    # Submission
+
+    def submit_insert_many(self, collection: str, documents: List[Dict]) -> None:
+        entry = {"id": uuid.uuid4().hex, "op": "insert_many", "collection": collection, "documents": documents}
+        self._pending[entry["id"]] = entry
+        self._append(entry)
+        self._queue.put_nowait((entry, 0))
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "journaled": len(self._pending),
+            "completed": self.completed,
+            "failures": self.failures,
+            "dead_lettered": self.dead_lettered,
+        }
+
+    # Execution
+
+    async def _apply(self, entry: Dict) -> None:
+        if entry["op"] == "insert_many":
+            try:
+                # Copies, because insert_many adds _id to the documents it is given
+                await self.db[entry["collection"]].insert_many(
+                    [dict(doc) for doc in entry["documents"]], ordered=False
+                )
+            except BulkWriteError as e:
+                # A replayed write may have landed before the crash; duplicates are fine
+                if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+                    raise
+        else:
+            raise ValueError(f"Unknown journaled operation: {entry['op']}")
+
+    async def _retry_later(self, entry: Dict, attempt: int) -> None:
+        delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt))
+        await asyncio.sleep(delay)
+        self._queue.put_nowait((entry, attempt + 1))
+
+    async def _worker(self) -> None:
+        while True:
+            entry, attempt = await self._queue.get()
+            try:
+                await self._apply(entry)
+                self._mark_done(entry["id"])
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                if attempt + 1 >= self.max_attempts:
+                    logger.error(f"Write-behind {entry['op']} on {entry['collection']} failed {attempt + 1} times, "
+                                 f"moved to the dead-letter file: {e}")
+                    self._dead_letter(entry, e)
+                else:
+                    logger.warning(f"Write-behind {entry['op']} on {entry['collection']} failed (attempt {attempt + 1}): {e}")
+                    retry = asyncio.create_task(self._retry_later(entry, attempt))
+                    self._retries.add(retry)
+                    retry.add_done_callback(self._retries.discard)
+            finally:
+                self._queue.task_done()
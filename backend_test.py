@@ -8,6 +8,7 @@ import requests
 import json
 import uuid
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Get backend URL from environment
@@ -316,6 +317,55 @@ class AuraBackendTester:
             self.log_result("Daily Check-in", False, f"Check-in failed with exception: {str(e)}")
             return False
 
+    def test_concurrent_checkins(self):
+        """Test that simultaneous check-ins for one user never lose streak updates"""
+        concurrent_checkins = 10
+        
+        try:
+            response = requests.post(
+                f"{self.base_url}/users",
+                json={"name": "Concurrency Check", "goal": "Verify atomic streak accounting"},
+                headers={"Content-Type": "application/json"},
+                timeout=10
+            )
+            if response.status_code != 200:
+                self.log_result("Concurrent Check-ins", False, f"User creation failed with status {response.status_code}", response.text)
+                return False
+            user_id = response.json()["id"]
+            
+            def submit_checkin(_):
+                return requests.post(
+                    f"{self.base_url}/checkins",
+                    json={"user_id": user_id, "stayed_on_track": True, "mood": 4, "had_urges": False},
+                    headers={"Content-Type": "application/json"},
+                    timeout=30
+                ).status_code
+            
+            with ThreadPoolExecutor(max_workers=concurrent_checkins) as pool:
+                statuses = list(pool.map(submit_checkin, range(concurrent_checkins)))
+            
+            if any(status != 200 for status in statuses):
+                self.log_result("Concurrent Check-ins", False, "Some concurrent check-ins failed", statuses)
+                return False
+            
+            user = requests.get(f"{self.base_url}/users/{user_id}", timeout=10).json()
+            counts = {
+                "current_streak": user["current_streak"],
+                "best_streak": user["best_streak"],
+                "total_days_clean": user["total_days_clean"]
+            }
+            
+            if all(value == concurrent_checkins for value in counts.values()):
+                self.log_result("Concurrent Check-ins", True, f"{concurrent_checkins} simultaneous check-ins all counted", counts)
+                return True
+            else:
+                self.log_result("Concurrent Check-ins", False, f"Expected every counter to be {concurrent_checkins}", counts)
+                return False
+                
+        except Exception as e:
+            self.log_result("Concurrent Check-ins", False, f"Concurrent check-ins failed with exception: {str(e)}")
+            return False
+
     def test_sos_support(self):
         """Test /api/sos endpoint for urgent support"""
         if not self.test_user_id:
@@ -377,6 +427,69 @@ class AuraBackendTester:
             self.log_result("SOS Support", False, f"SOS failed with exception: {str(e)}")
             return False
 
+    def test_sos_streaming(self):
+        """Test /api/sos/stream Server-Sent Events endpoint"""
+        if not self.test_user_id:
+            self.log_result("SOS Streaming", False, "No test user ID available")
+            return False
+            
+        try:
+            sos_data = {
+                "user_id": self.test_user_id,
+                "message": "I'm having an urge right now, please help me get through it."
+            }
+            
+            start = time.time()
+            first_token_at = None
+            tokens = []
+            done_event = None
+            
+            with requests.post(
+                f"{self.base_url}/sos/stream",
+                json=sos_data,
+                headers={"Content-Type": "application/json"},
+                stream=True,
+                timeout=30
+            ) as response:
+                if response.status_code != 200:
+                    self.log_result("SOS Streaming", False, f"SOS stream failed with status {response.status_code}", response.text)
+                    return False
+                
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: "):
+                        payload = json.loads(line[len("data: "):])
+                        if event == "token":
+                            if first_token_at is None:
+                                first_token_at = time.time() - start
+                            tokens.append(payload["text"])
+                        elif event == "done":
+                            done_event = payload
+                        elif event == "error":
+                            self.log_result("SOS Streaming", False, "SOS stream returned an error event", payload)
+                            return False
+            
+            if tokens and done_event and "personalities_used" in done_event and "user_progress" in done_event:
+                self.log_result("SOS Streaming", True, "SOS reply streamed with final progress event", {
+                    "token_events": len(tokens),
+                    "time_to_first_token": round(first_token_at, 2),
+                    "total_time": round(time.time() - start, 2),
+                    "personalities_used": done_event["personalities_used"]
+                })
+                return True
+            else:
+                self.log_result("SOS Streaming", False, "SOS stream missing tokens or final done event", {
+                    "token_events": len(tokens),
+                    "done_event": done_event
+                })
+                return False
+                
+        except Exception as e:
+            self.log_result("SOS Streaming", False, f"SOS stream failed with exception: {str(e)}")
+            return False
+
     def test_chat_history(self):
         """Test chat history retrieval"""
         if not self.test_user_id or not self.test_session_id:
@@ -394,7 +507,7 @@ class AuraBackendTester:
                 if isinstance(data, list) and len(data) > 0:
                     # Check if messages have required fields
                     first_message = data[0]
-                    required_fields = ["id", "user_id", "session_id", "message_type", "content", "created_at"]
+                    required_fields = ["id", "message_type", "content", "created_at"]
                     
                     if all(field in first_message for field in required_fields):
                         self.log_result("Chat History", True, f"Chat history retrieved with {len(data)} messages", {
@@ -564,6 +677,43 @@ class AuraBackendTester:
             self.log_result("Galaxy Progress", False, f"Galaxy progress test failed with exception: {str(e)}")
             return False
 
+    def test_dashboard(self):
+        """Test /api/users/{user_id}/dashboard composite endpoint"""
+        if not self.test_user_id:
+            self.log_result("Dashboard", False, "No test user ID available")
+            return False
+            
+        try:
+            response = requests.get(f"{self.base_url}/users/{self.test_user_id}/dashboard", timeout=10)
+            
+            if response.status_code == 200:
+                data = response.json()
+                required_fields = ["user", "progress", "weekly_report", "pending"]
+                
+                if all(field in data for field in required_fields):
+                    if data["user"].get("id") == self.test_user_id and "galaxy" in data["progress"]:
+                        self.log_result("Dashboard", True, "Dashboard endpoint working correctly", {
+                            "current_streak": data["user"]["current_streak"],
+                            "stars_count": len(data["progress"]["galaxy"]["stars"]),
+                            "weekly_report_included": data["weekly_report"] is not None,
+                            "pending": data["pending"]
+                        })
+                        return True
+                    else:
+                        self.log_result("Dashboard", False, "Dashboard sections don't match the user", data)
+                        return False
+                else:
+                    missing_fields = [f for f in required_fields if f not in data]
+                    self.log_result("Dashboard", False, f"Missing required fields: {missing_fields}", data)
+                    return False
+            else:
+                self.log_result("Dashboard", False, f"Dashboard endpoint failed with status {response.status_code}", response.text)
+                return False
+                
+        except Exception as e:
+            self.log_result("Dashboard", False, f"Dashboard test failed with exception: {str(e)}")
+            return False
+
     def test_weekly_reports(self):
         """Test /api/users/{user_id}/weekly-report endpoint for Aura Pulse reports"""
         if not self.test_user_id:
@@ -685,9 +835,12 @@ class AuraBackendTester:
             ("Achievement System", self.test_achievement_system),
             ("Galaxy Progress", self.test_galaxy_progress),
             ("Weekly Reports", self.test_weekly_reports),
+            ("Dashboard", self.test_dashboard),
             ("Real-time Progress Updates", self.test_real_time_progress_updates),
             ("Daily Check-in", self.test_daily_checkin),
+            ("Concurrent Check-ins", self.test_concurrent_checkins),
             ("SOS Support", self.test_sos_support),
+            ("SOS Streaming", self.test_sos_streaming),
             ("Chat History", self.test_chat_history)
         ]
         
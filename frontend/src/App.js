@@ -12,6 +12,7 @@ function App() {
   const [sessionId, setSessionId] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
   const [userProgress, setUserProgress] = useState(null);
+  const galaxyStarsRef = useRef({ userId: null, stars: [] });
   const [weeklyReport, setWeeklyReport] = useState(null);
   const [checkinData, setCheckinData] = useState({
     stayed_on_track: true,
@@ -41,10 +42,50 @@ function App() {
     if (savedUser) {
       setUser(JSON.parse(savedUser));
       setCurrentView('dashboard');
-      loadUserProgress(JSON.parse(savedUser).id);
+      loadDashboard(JSON.parse(savedUser).id);
     }
   }, []);
 
+  // Live progress and achievement pushes while a user is signed in
+  useEffect(() => {
+    if (!user?.id) return undefined;
+    let socket;
+    let retryTimer;
+    let closed = false;
+
+    const connect = () => {
+      socket = new WebSocket(`${BACKEND_URL.replace(/^http/, 'ws')}/ws/users/${user.id}`);
+      socket.onmessage = (message) => {
+        const update = JSON.parse(message.data);
+        if (update.type === 'progress') {
+          applyProgressUpdate(user.id, update);
+        } else if (update.type === 'achievements') {
+          // Delivered (and marked seen) through the progress endpoint
+          loadUserProgress(user.id);
+        } else if (update.type === 'chat_follow_up') {
+          // Full answer following an instant cached reply
+          setChatMessages(prev => [...prev, {
+            id: Date.now(),
+            message_type: 'ai',
+            content: update.ai_message,
+            personalities: update.personalities_used || ['alex'],
+            created_at: new Date().toISOString()
+          }]);
+        }
+      };
+      socket.onclose = () => {
+        if (!closed) retryTimer = setTimeout(connect, 5000);
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      socket.close();
+    };
+  }, [user?.id]);
+
   // Helper Functions
   const saveUser = (userData) => {
     setUser(userData);
@@ -53,16 +94,72 @@ function App() {
 
   const loadUserProgress = async (userId) => {
     try {
-      const response = await fetch(`${BACKEND_URL}/api/users/${userId}/progress`);
+      // Only ask for stars we don't already hold for this user
+      const known = galaxyStarsRef.current.userId === userId ? galaxyStarsRef.current.stars : [];
+      const response = await fetch(`${BACKEND_URL}/api/users/${userId}/progress?galaxy_since_day=${known.length}`);
       if (response.ok) {
-        const progressData = await response.json();
-        setUserProgress(progressData);
+        applyProgressData(userId, known, await response.json());
       }
     } catch (error) {
       console.error('Error loading user progress:', error);
     }
   };
 
+  // User, progress and (when ready in time) the weekly report in one request
+  const loadDashboard = async (userId) => {
+    try {
+      const known = galaxyStarsRef.current.userId === userId ? galaxyStarsRef.current.stars : [];
+      const response = await fetch(`${BACKEND_URL}/api/users/${userId}/dashboard?galaxy_since_day=${known.length}`);
+      if (response.ok) {
+        const dashboard = await response.json();
+        saveUser(dashboard.user);
+        applyProgressData(userId, known, dashboard.progress);
+        if (dashboard.weekly_report) {
+          setWeeklyReport(dashboard.weekly_report);
+        }
+      }
+    } catch (error) {
+      console.error('Error loading dashboard:', error);
+    }
+  };
+
+  const applyProgressData = (userId, known, progressData) => {
+    const { galaxy } = progressData;
+    galaxy.stars = galaxy.star_offset > 0
+      ? known.slice(0, galaxy.star_offset).concat(galaxy.stars)
+      : galaxy.stars;
+    galaxyStarsRef.current = { userId, stars: galaxy.stars };
+    setUserProgress(progressData);
+    
+    // Achievements unlocked in the background since the last fetch
+    if (progressData.new_achievements && progressData.new_achievements.length > 0) {
+      progressData.new_achievements.forEach(achievement => {
+        showAchievementNotification(achievement);
+      });
+    }
+  };
+
+  const applyProgressUpdate = (userId, update) => {
+    const known = galaxyStarsRef.current.userId === userId ? galaxyStarsRef.current.stars : [];
+    const { galaxy } = update;
+    galaxy.stars = galaxy.star_offset > 0
+      ? known.slice(0, galaxy.star_offset).concat(galaxy.stars)
+      : galaxy.stars;
+    galaxyStarsRef.current = { userId, stars: galaxy.stars };
+    setUserProgress(prev => prev && {
+      ...prev,
+      galaxy,
+      stats: { ...prev.stats, ...update.stats }
+    });
+    setUser(prev => {
+      if (!prev || prev.id !== userId) return prev;
+      const { current_streak, best_streak, total_days_clean } = update.stats;
+      const updatedUser = { ...prev, current_streak, best_streak, total_days_clean };
+      localStorage.setItem('auraUser', JSON.stringify(updatedUser));
+      return updatedUser;
+    });
+  };
+
   const loadWeeklyReport = async (userId) => {
     try {
       const response = await fetch(`${BACKEND_URL}/api/users/${userId}/weekly-report`);
@@ -100,7 +197,24 @@ function App() {
     }
   };
 
-  const sendMessage = async (message, isWelcome = false) => {
+  // The server answers 429 with Retry-After when a user sends faster than their rate limit
+  const postChat = async (path, body, retries = 2) => {
+    for (let attempt = 0; ; attempt++) {
+      const response = await fetch(`${BACKEND_URL}${path}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+      });
+      if (response.status !== 429 || attempt >= retries) {
+        return response;
+      }
+      const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 1;
+      await new Promise(resolve => setTimeout(resolve, Math.min(retryAfter, 30) * 1000));
+    }
+  };
+
+  // SOS goes to /api/sos: the priority lane, never rate limited, with a grounding fallback
+  const sendMessage = async (message, isWelcome = false, sos = false) => {
     if (!message.trim() && !isWelcome) return;
     
     const messageToSend = message || chatInput;
@@ -120,16 +234,24 @@ function App() {
     }
     
     try {
-      const response = await fetch(`${BACKEND_URL}/api/chat`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          user_id: user.id,
-          message: messageToSend,
-          session_id: sessionId
-        })
+      const response = await postChat(sos ? '/api/sos' : '/api/chat', {
+        user_id: user.id,
+        message: messageToSend,
+        session_id: sessionId
       });
       
+      if (response.status === 429) {
+        // Still rate limited after waiting: say so instead of failing silently
+        setChatMessages(prev => [...prev, {
+          id: Date.now() + 1,
+          message_type: 'ai',
+          content: "🫂Alex: You're sending messages faster than I can keep up with. Give me a few seconds and try again - I'm not going anywhere.",
+          personalities: ['alex'],
+          created_at: new Date().toISOString()
+        }]);
+        return;
+      }
+      
       const result = await response.json();
       
       if (!sessionId) {
@@ -191,7 +313,7 @@ function App() {
   };
 
   const handleSOS = async () => {
-    await sendMessage("I'm having a strong urge right now and I need immediate support. Please help me through this moment and give me strategies to get through it safely.");
+    await sendMessage("I'm having a strong urge right now and I need immediate support. Please help me through this moment and give me strategies to get through it safely.", false, true);
     setCurrentView('chat');
   };
 
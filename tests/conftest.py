@@ -0,0 +1,44 @@
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# The backend is a flat set of modules imported by name, as server.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+
+class Clock:
+    """Manually advanced stand-in for time.monotonic"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+async def _seed_messages(db, count, content="Message number {i} about cravings and plans."):
+    """Insert `count` alternating user/ai messages of session u1/s1, a minute apart; returns them in order"""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    await db.chat_messages.insert_many([{
+        "id": str(uuid.uuid4()),
+        "user_id": "u1",
+        "session_id": "s1",
+        "message_type": "ai" if i % 2 else "user",
+        "content": content.format(i=i),
+        "personalities": None,
+        "created_at": (start + timedelta(minutes=i)).isoformat(),
+    } for i in range(count)])
+    return await db.chat_messages.find({}, {"_id": 0}).sort([("created_at", 1), ("id", 1)]).to_list(length=None)
+
+
+@pytest.fixture
+def seed_messages():
+    return _seed_messages
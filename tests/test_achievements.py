@@ -0,0 +1,48 @@
+import pytest
+
+from achievements import AchievementEngine
+
+CATALOG = [
+    {"id": "first_checkin", "unlock_condition": {"type": "checkins", "value": 1}},
+    {"id": "streak_7", "unlock_condition": {"type": "streak", "value": 7}},
+    {"id": "checkins_10", "unlock_condition": {"type": "checkins", "value": 10}},
+    {"id": "streak_3", "unlock_condition": {"type": "streak", "value": 3}},
+]
+
+
+def test_evaluate_returns_every_satisfied_rule_in_catalog_order():
+    engine = AchievementEngine(CATALOG)
+    assert engine.evaluate({"checkins": 10, "streak": 7}) == ["first_checkin", "streak_7", "checkins_10", "streak_3"]
+    assert engine.evaluate({"checkins": 9, "streak": 2}) == ["first_checkin"]
+    assert engine.evaluate({"checkins": 10, "streak": 5}, earned=["first_checkin"]) == ["checkins_10", "streak_3"]
+
+
+def test_only_changed_metrics_are_evaluated():
+    engine = AchievementEngine(CATALOG)
+    values = {"checkins": 10, "streak": 7}
+    assert engine.evaluate(values, changed=["streak"]) == ["streak_7", "streak_3"]
+    assert engine.evaluate(values, changed=[]) == []
+    # Metrics without a value or without rules are skipped
+    assert engine.evaluate({"streak": 7}, changed=["checkins", "mood", "streak"]) == ["streak_7", "streak_3"]
+
+
+def test_evaluate_many_reports_only_users_with_new_achievements():
+    engine = AchievementEngine(CATALOG)
+    results = engine.evaluate_many([
+        ("u1", {"checkins": 1, "streak": 0}, []),
+        ("u2", {"checkins": 1, "streak": 3}, ["first_checkin", "streak_3"]),
+        ("u3", {"checkins": 12, "streak": 3}, ["first_checkin"]),
+    ])
+    assert results == {"u1": ["first_checkin"], "u3": ["checkins_10", "streak_3"]}
+
+
+def test_resolve_metrics_uses_registered_resolvers():
+    engine = AchievementEngine(CATALOG, {"checkins": lambda user, stats: stats["checkins"]})
+    assert engine.resolve_metrics({}, {"checkins": 4}, metrics=["checkins", "mood"]) == {"checkins": 4}
+    with pytest.raises(KeyError):
+        engine.resolve_metrics({}, {"checkins": 4})
+
+
+def test_duplicate_achievement_ids_are_rejected():
+    with pytest.raises(ValueError):
+        AchievementEngine(CATALOG + [CATALOG[0]])
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionRejected, LlmAdmission
+
+
+def test_released_slot_goes_to_the_priority_lane_first():
+    async def scenario():
+        admission = LlmAdmission(max_in_flight=1, user_burst=10)
+        held = await admission.acquire("u0")
+        order = []
+
+        async def request(user_id, priority):
+            ticket = await admission.acquire(user_id, priority=priority)
+            order.append(user_id)
+            ticket.release()
+
+        waiting = [asyncio.create_task(request("normal", False))]
+        await asyncio.sleep(0)
+        waiting.append(asyncio.create_task(request("sos", True)))
+        await asyncio.sleep(0)
+        assert admission.queued() == 2
+        held.release()
+        await asyncio.gather(*waiting)
+        return order, admission.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["sos", "normal"]
+    assert stats["in_flight"] == 0 and stats["admitted"] == 3
+
+
+def test_cancelling_a_waiter_after_the_handover_frees_the_slot():
+    async def scenario():
+        admission = LlmAdmission(max_in_flight=1)
+        held = await admission.acquire("u0")
+        waiter = asyncio.create_task(admission.acquire("u1"))
+        await asyncio.sleep(0)
+        # The slot is handed to the waiter, which is cancelled before it resumes
+        held.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        in_flight = admission.in_flight
+        ticket = await asyncio.wait_for(admission.acquire("u2"), 1)
+        return in_flight, ticket, admission
+
+    in_flight, ticket, admission = asyncio.run(scenario())
+    assert in_flight == 0
+    ticket.release()
+    assert admission.in_flight == 0
+
+
+def test_waiting_past_the_queue_timeout_is_rejected():
+    async def scenario():
+        admission = LlmAdmission(max_in_flight=1, queue_timeout=0.01)
+        held = await admission.acquire("u0")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("u1")
+        queued = admission.queued()
+        held.release()
+        return rejected.value, queued, admission.in_flight
+
+    rejected, queued, in_flight = asyncio.run(scenario())
+    assert rejected.reason == "queue_timeout" and rejected.retry_after >= 1
+    assert queued == 0 and in_flight == 0
+
+
+def test_user_bucket_limits_normal_requests_but_not_sos(clock):
+    async def scenario():
+        admission = LlmAdmission(user_rate=1.0, user_burst=2, clock=clock)
+        for _ in range(2):
+            (await admission.acquire("u1")).release()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("u1")
+        (await admission.acquire("u1", priority=True)).release()
+        clock.now += 1.0
+        (await admission.acquire("u1")).release()
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == "user_rate" and rejected.retry_after == 1
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from chat_archive import ChatArchive, message_key
+from conversation_context import ConversationContextManager
+
+
+class CountingArchive(ChatArchive):
+    loaded = 0
+
+    async def _load(self, head):
+        self.loaded += 1
+        return await super()._load(head)
+
+
+def test_pages_decode_only_the_buckets_they_need(seed_messages):
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient().aura_test
+        rows = await seed_messages(db, 50)
+        archive = CountingArchive(db, bucket_size=10)
+        await archive.archive_session("u1", "s1")
+        heads = await archive.bucket_heads("u1", "s1")
+
+        after = await archive.messages_after(heads, message_key(rows[24]), 3)
+        loaded_after = archive.loaded
+        before = await archive.messages_before(heads, message_key(rows[24]), 3)
+        streamed = [m async for m in archive.iter_messages(heads, after=message_key(rows[5]),
+                                                           before=message_key(rows[15]))]
+        return rows, heads, after, loaded_after, before, streamed, archive.loaded
+
+    rows, heads, after, loaded_after, before, streamed, loaded = asyncio.run(scenario())
+    assert len(heads) == 5 and "data" not in heads[0]
+    assert [m["id"] for m in after] == [r["id"] for r in rows[25:28]]
+    assert loaded_after == 1
+    assert [m["id"] for m in before] == [r["id"] for r in reversed(rows[21:24])]
+    assert [m["id"] for m in streamed] == [r["id"] for r in rows[6:15]]
+    assert loaded == 1 + 1 + 2
+
+
+def test_expiring_raw_rows_folds_them_into_the_summary_first(seed_messages):
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient().aura_test
+        await seed_messages(db, 30)
+        context = ConversationContextManager(db, keep_messages=10, token_budget=3000)
+        archive = ChatArchive(db, bucket_size=10, summarize_through=context.summarize_through)
+        result = await archive.archive_session("u1", "s1", expire_raw=True)
+        return result, await db.chat_messages.count_documents({}), await context.build("u1", "s1")
+
+    result, remaining, window = asyncio.run(scenario())
+    assert result["expired"] == 30 and remaining == 0
+    assert len(window.summary.splitlines()) == 30
+    assert "Message number 29" in window.summary
@@ -0,0 +1,115 @@
+import asyncio
+import base64
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from chat_archive import ChatArchive, message_key
+from chat_history import ChatHistory, decode_history_cursor, encode_history_cursor, history_keyset_filter
+
+
+async def seed_tied_messages(db, count, per_timestamp=3):
+    """`count` messages where every `per_timestamp` consecutive ones share a created_at"""
+    await db.chat_messages.insert_many([{
+        "id": f"m{i:03d}",
+        "user_id": "u1",
+        "session_id": "s1",
+        "message_type": "user",
+        "content": f"Message {i}",
+        "personalities": None,
+        "created_at": f"2024-01-01T00:{i // per_timestamp:02d}:00+00:00",
+    } for i in range(count)])
+    return [f"m{i:03d}" for i in range(count)]
+
+
+def walk(history, limit, direction, start=None):
+    """Follow X-Next-Cursor (after) or X-Prev-Cursor (before) until it runs out"""
+    async def scenario():
+        pages, key = [], start
+        while True:
+            kwargs = {direction: key} if key else {}
+            messages, headers = await history.page("u1", "s1", limit, **kwargs)
+            pages.append([m["id"] for m in messages])
+            cursor = headers.get("X-Next-Cursor" if direction == "after" else "X-Prev-Cursor")
+            if cursor is None:
+                return pages
+            key = decode_history_cursor(cursor)
+    return asyncio.run(scenario())
+
+
+def test_cursor_round_trips_the_message_key():
+    message = {"created_at": "2024-01-01T00:00:00+00:00", "id": "m-1"}
+    cursor = encode_history_cursor(message)
+    assert "=" not in cursor
+    assert decode_history_cursor(cursor) == message_key(message)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"{}").decode(),
+    base64.urlsafe_b64encode(b'["2024-01-01", "m1", "extra"]').decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_history_cursor(cursor)
+
+
+def test_keyset_filter_breaks_created_at_ties_on_id():
+    key = ("2024-01-01T00:00:00+00:00", "m1")
+    assert history_keyset_filter(key, "after") == {"$or": [
+        {"created_at": {"$gt": key[0]}}, {"created_at": key[0], "id": {"$gt": "m1"}}
+    ]}
+    assert history_keyset_filter(key, "before")["$or"][1] == {"created_at": key[0], "id": {"$lt": "m1"}}
+
+
+def test_pages_split_inside_a_created_at_tie_without_skipping_or_repeating():
+    db = mongomock_motor.AsyncMongoMockClient().aura_test
+    ids = asyncio.run(seed_tied_messages(db, 10))
+    history = ChatHistory(db, ChatArchive(db))
+
+    forward = walk(history, 4, "after")
+    assert forward == [ids[0:4], ids[4:8], ids[8:10]]
+
+    backward = walk(history, 4, "before", start=("2024-01-01T00:03:00+00:00", "m009"))
+    assert backward == [ids[5:9], ids[1:5], ids[0:1]]
+
+
+def test_first_page_only_links_forward_and_a_before_page_links_both_ways():
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient().aura_test
+        await seed_tied_messages(db, 6)
+        history = ChatHistory(db, ChatArchive(db))
+        first = await history.page("u1", "s1", 2)
+        middle = await history.page("u1", "s1", 2, before=("2024-01-01T00:01:00+00:00", "m005"))
+        return first[1], middle
+
+    first_headers, (messages, headers) = asyncio.run(scenario())
+    assert set(first_headers) == {"X-Next-Cursor"}
+    assert [m["id"] for m in messages] == ["m003", "m004"]
+    assert decode_history_cursor(headers["X-Prev-Cursor"]) == message_key(messages[0])
+    assert decode_history_cursor(headers["X-Next-Cursor"]) == message_key(messages[-1])
+
+
+def test_streamed_history_spans_archived_and_hot_rows_in_order():
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient().aura_test
+        ids = await seed_tied_messages(db, 12)
+        archive = ChatArchive(db, bucket_size=4)
+        await archive.archive_session("u1", "s1", expire_raw=True)
+        # Hot rows arriving after the archive run, one tied with the newest archived message
+        await db.chat_messages.insert_many([
+            {"id": "m100", "user_id": "u1", "session_id": "s1", "message_type": "ai", "content": "late",
+             "personalities": None, "created_at": "2024-01-01T00:03:00+00:00"},
+            {"id": "m101", "user_id": "u1", "session_id": "s1", "message_type": "ai", "content": "later",
+             "personalities": None, "created_at": "2024-01-01T00:04:00+00:00"},
+        ])
+        history = ChatHistory(db, archive)
+        everything = [m["id"] async for m in history.iter_messages("u1", "s1")]
+        after = [m["id"] async for m in history.iter_messages("u1", "s1", after=("2024-01-01T00:02:00+00:00", "m007"))]
+        return ids, everything, after
+
+    ids, everything, after = asyncio.run(scenario())
+    assert everything == ids + ["m100", "m101"]
+    assert after == ids[8:] + ["m100", "m101"]
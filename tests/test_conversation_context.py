@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from conversation_context import ConversationContextManager
+
+
+# Long enough for the token budgets below to trim the window
+CONTENT = "Message number {i} about cravings, plans and how the day went. " * 3
+
+
+def window_shape(window):
+    return len(window.summary.splitlines()), len(window.recent)
+
+
+def test_long_message_does_not_shrink_stored_summary(seed_messages):
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient().aura_test
+        await seed_messages(db, 40, CONTENT)
+        manager = ConversationContextManager(db, keep_messages=10, token_budget=3000)
+
+        normal = window_shape(await manager.build("u1", "s1", reserved_tokens=500))
+        squeezed = window_shape(await manager.build("u1", "s1", reserved_tokens=2950))
+        after = window_shape(await manager.build("u1", "s1", reserved_tokens=500))
+        stored = await db.chat_summaries.find_one({"user_id": "u1", "session_id": "s1"})
+        return normal, squeezed, after, stored
+
+    normal, squeezed, after, stored = asyncio.run(scenario())
+    assert normal == (30, 10)
+    # The big call gets a trimmed window...
+    assert squeezed[0] + squeezed[1] < sum(normal)
+    # ...but the next normal call sees the same context as before
+    assert after == normal
+    assert len(stored["summary"].splitlines()) == 30
+
+
+def test_recent_overflow_is_folded_into_summary(seed_messages):
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient().aura_test
+        await seed_messages(db, 10, CONTENT)
+        manager = ConversationContextManager(db, keep_messages=10, token_budget=400)
+        return await manager.build("u1", "s1")
+
+    window = asyncio.run(scenario())
+    assert window.summary
+    assert 0 < len(window.recent) < 10
@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from db_indexes import ensure_indexes
+
+
+def test_legacy_duplicate_reports_are_removed_before_the_unique_index():
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient().aura_test
+        await db.weekly_reports.insert_many([
+            {"id": str(i), "user_id": "u1", "week_start": "2024-01-01", "stale": False} for i in range(3)
+        ] + [{"id": "other", "user_id": "u2", "week_start": "2024-01-01", "stale": False}])
+        await ensure_indexes(db)
+        return (await db.weekly_reports.find({}, {"_id": 0, "id": 1}).sort("id", 1).to_list(length=None),
+                await db.weekly_reports.index_information())
+
+    reports, indexes = asyncio.run(scenario())
+    assert [report["id"] for report in reports] == ["2", "other"]
+    assert indexes["user_week_unique"]["unique"]
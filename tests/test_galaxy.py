@@ -0,0 +1,15 @@
+from galaxy import MAX_STARS, galaxy_etag, get_galaxy_progress_data
+
+
+def test_etag_differs_for_bodies_starting_at_different_stars():
+    full = galaxy_etag(10, 40)
+    delta = galaxy_etag(10, 40, since_day=7)
+    assert full != delta != galaxy_etag(10, 40, since_day=8)
+    assert galaxy_etag(10, 40, compact=True, since_day=7) not in (delta, galaxy_etag(10, 40, compact=True))
+
+
+def test_etag_matches_whenever_the_body_is_the_full_list():
+    # since_day 0, or past the streak (the client must start over), returns every star
+    for since_day in (None, 0, 11, MAX_STARS + 5):
+        assert get_galaxy_progress_data(10, 40, [], since_day=since_day)["star_offset"] == 0
+        assert galaxy_etag(10, 40, since_day=since_day) == galaxy_etag(10, 40)
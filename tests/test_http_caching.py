@@ -0,0 +1,57 @@
+from typing import Optional
+
+import pytest
+from fastapi import FastAPI, Header
+
+pytest.importorskip("httpx")  # required by TestClient
+
+from fastapi.testclient import TestClient
+
+from http_caching import USER_CACHE_CONTROL, etag_matches, not_modified, user_etag
+
+
+def test_user_etag_follows_the_revision_and_variant():
+    etag = user_etag({"revision": 3}, "progress", 7, "v2")
+    assert etag == 'W/"progress-3-7-v2"'
+    assert user_etag({}, "user") == 'W/"user-0"'
+    assert user_etag({"revision": 4}, "progress", 7, "v2") != etag
+    assert user_etag({"revision": 3}, "progress", 8, "v2") != etag
+
+
+@pytest.mark.parametrize("if_none_match", [
+    'W/"user-3"',
+    '"user-3"',
+    '"other", W/"user-3"',
+    'W/"other",W/"user-3" , "more"',
+    "*",
+])
+def test_weak_comparison_matches(if_none_match):
+    assert etag_matches(if_none_match, 'W/"user-3"')
+
+
+@pytest.mark.parametrize("if_none_match", [None, "", 'W/"user-2"', '"user-30"', 'W/"user-2", "other"', "user-3"])
+def test_other_values_do_not_match(if_none_match):
+    assert not etag_matches(if_none_match, 'W/"user-3"')
+
+
+def test_matching_request_gets_an_empty_304_with_the_validator():
+    app = FastAPI()
+    user = {"revision": 1}
+
+    @app.get("/user")
+    async def get_user(if_none_match: Optional[str] = Header(None)):
+        etag = user_etag(user, "user")
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return {"revision": user["revision"]}
+
+    client = TestClient(app)
+    etag = user_etag(user, "user")
+    response = client.get("/user", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert response.headers["Cache-Control"] == USER_CACHE_CONTROL
+
+    user["revision"] = 2
+    assert client.get("/user", headers={"If-None-Match": etag}).status_code == 200
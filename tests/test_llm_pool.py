@@ -0,0 +1,47 @@
+from llm_pool import LlmSessionPool
+
+
+def turn(pool, session_id, context_key):
+    """What create_unified_llm_chat does: reuse the pooled chat or build and pool one"""
+    chat = pool.get(session_id, context_key)
+    if chat is None:
+        chat = object()
+        pool.put(session_id, context_key, chat)
+    return chat
+
+
+def test_session_turns_reuse_one_chat_until_max_turns(clock):
+    pool = LlmSessionPool(max_turns=5, clock=clock)
+    chats = [turn(pool, "s1", "prefix+user") for _ in range(6)]
+    assert len({id(chat) for chat in chats[:5]}) == 1
+    assert chats[5] is not chats[0]
+    assert (pool.hits, pool.misses) == (4, 2)
+
+
+def test_changed_user_context_rebuilds_the_chat(clock):
+    pool = LlmSessionPool(clock=clock)
+    first = turn(pool, "s1", "prefix+streak 3")
+    assert turn(pool, "s1", "prefix+streak 4") is not first
+
+
+def test_idle_and_least_recently_used_sessions_are_evicted(clock):
+    pool = LlmSessionPool(max_sessions=2, idle_ttl=10, clock=clock)
+    turn(pool, "a", "k")
+    turn(pool, "b", "k")
+    turn(pool, "c", "k")
+    assert pool.get("a", "k") is None
+    clock.now = 11
+    assert pool.get("b", "k") is None
+    assert pool.stats()["live_sessions"] == 0
+
+
+def test_chat_is_rebuilt_before_its_history_goes_over_the_token_budget(clock):
+    pool = LlmSessionPool(max_turns=10, token_budget=1000, clock=clock)
+    chat = object()
+    assert pool.get("s1", "k", 50) is None
+    pool.put("s1", "k", chat, tokens=700)
+    pool.record_turn("s1", 50 + 150)
+    assert pool.get("s1", "k", 50) is chat  # 900 + 50 fits
+    pool.record_turn("s1", 50 + 150)
+    assert pool.get("s1", "k", 50) is None  # 1100 + 50 does not
+    assert pool.stats()["live_sessions"] == 0
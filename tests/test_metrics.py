@@ -0,0 +1,51 @@
+from metrics import MetricsRegistry, StageTimer
+
+
+def test_exposition_follows_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("aura_requests_total", "Requests served")
+    requests.inc(route="/api/chat")
+    requests.inc(2, route="/api/chat")
+    requests.inc(route='/say "hi"\n')
+    registry.gauge("aura_llm_pool", "LLM pool statistics").set(0.75, stat="hit_rate")
+    latency = registry.histogram("aura_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, stage="llm")
+
+    assert registry.render().splitlines() == [
+        "# HELP aura_requests_total Requests served",
+        "# TYPE aura_requests_total counter",
+        'aura_requests_total{route="/api/chat"} 3',
+        'aura_requests_total{route="/say \\"hi\\"\\n"} 1',
+        "# HELP aura_llm_pool LLM pool statistics",
+        "# TYPE aura_llm_pool gauge",
+        'aura_llm_pool{stat="hit_rate"} 0.75',
+        "# HELP aura_latency_seconds Latency",
+        "# TYPE aura_latency_seconds histogram",
+        'aura_latency_seconds_bucket{stage="llm",le="0.1"} 1',
+        'aura_latency_seconds_bucket{stage="llm",le="1.0"} 2',
+        'aura_latency_seconds_bucket{stage="llm",le="+Inf"} 3',
+        'aura_latency_seconds_sum{stage="llm"} 5.55',
+        'aura_latency_seconds_count{stage="llm"} 3',
+    ]
+    assert registry.render().endswith("\n")
+
+
+def test_registering_a_metric_twice_returns_the_same_one():
+    registry = MetricsRegistry()
+    assert registry.counter("aura_x_total", "X") is registry.counter("aura_x_total", "X")
+
+
+def test_stages_are_only_timed_for_sampled_requests():
+    registry = MetricsRegistry(sample_rate=0.0)
+    timer = StageTimer(registry)
+    registry.begin_request()
+    with timer.stage("chat", "llm"):
+        pass
+    assert timer.histogram.count(endpoint="chat", stage="llm") == 0
+
+    registry.sample_rate = 1.0
+    registry.begin_request()
+    with timer.stage("chat", "llm"):
+        pass
+    assert timer.histogram.count(endpoint="chat", stage="llm") == 1
@@ -0,0 +1,27 @@
+import pytest
+
+import personality_classifier
+from personality_classifier import PersonalityClassifier
+
+REPLIES = {
+    "🫂Alex: I hear you. ⚡Leo: You're strong and I'm proud of you!": ["alex", "leo"],
+    "Casey here - let's make a plan for the next trigger.": ["casey"],
+    "That sounds tough. Let's make a plan, you're strong.": ["alex", "casey", "leo"],
+    "Breathe in slowly and count to four.": ["alex"],
+}
+
+
+@pytest.fixture(params=["aho-corasick", "substring"])
+def classifier(request, monkeypatch):
+    if request.param == "substring":
+        monkeypatch.setattr(personality_classifier, "ahocorasick", None)
+    elif personality_classifier.ahocorasick is None:
+        pytest.skip("pyahocorasick not installed")
+    classifier = PersonalityClassifier()
+    assert classifier.backend == request.param
+    return classifier
+
+
+def test_explicit_markers_win_over_inferred_tone(classifier):
+    for reply, expected in REPLIES.items():
+        assert classifier.classify(reply) == expected, reply
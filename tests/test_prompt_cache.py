@@ -0,0 +1,48 @@
+from prompt_cache import MIN_CACHEABLE_TOKENS, _mark_cacheable_prefix
+
+PREFIX = "You are Aura. " * 125  # about as long as the real persona prompt, ~440 tokens
+SNAPSHOT = PREFIX + "\n\nUSER CONTEXT:\n- Streak: 3 days" + "\n- earlier turn about cravings" * 150
+
+
+def marked_span(messages):
+    """Estimated tokens up to and including the cache breakpoint, or 0 if none"""
+    length = 0
+    for message in messages:
+        content = message["content"]
+        blocks = [{"text": content}] if isinstance(content, str) else content
+        length += sum(len(block["text"]) for block in blocks)
+        if any("cache_control" in block for block in blocks):
+            return length // 4
+    return 0
+
+
+def test_first_call_marks_the_whole_system_prompt():
+    messages = [{"role": "system", "content": SNAPSHOT}, {"role": "user", "content": "hi"}]
+    system, user = _mark_cacheable_prefix(messages, PREFIX)
+    assert system["content"] == [{"type": "text", "text": SNAPSHOT, "cache_control": {"type": "ephemeral"}}]
+    assert user == messages[1]
+    assert marked_span([system, user]) >= MIN_CACHEABLE_TOKENS
+
+
+def test_later_calls_mark_the_last_turn_of_the_chats_history():
+    messages = [
+        {"role": "system", "content": SNAPSHOT},
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "🫂Alex: hello"},
+        {"role": "user", "content": "I'm struggling"},
+    ]
+    marked = _mark_cacheable_prefix(messages, PREFIX)
+    assert marked[0] == messages[0] and marked[3] == messages[3]
+    assert marked[2]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert marked_span(marked) >= MIN_CACHEABLE_TOKENS
+
+
+def test_prompts_below_the_cacheable_minimum_are_not_marked():
+    messages = [{"role": "system", "content": PREFIX + "\n\nUSER CONTEXT"}, {"role": "user", "content": "hi"}]
+    assert len(PREFIX) // 4 < MIN_CACHEABLE_TOKENS
+    assert _mark_cacheable_prefix(messages, PREFIX) == messages
+
+
+def test_other_system_messages_are_left_alone():
+    messages = [{"role": "system", "content": "something else" * 1000}, {"role": "user", "content": "hi"}]
+    assert _mark_cacheable_prefix(messages, PREFIX) == messages
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from resilience import (CLOSED, CRISIS_LINE, HALF_OPEN, OPEN, CircuitBreaker, FallbackResponder, hedged,
+                        iterate_with_deadline)
+
+
+def open_breaker(clock):
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, slow_call_seconds=5,
+                             open_seconds=30, clock=clock)
+    breaker.record_success(1.0)
+    breaker.record_success(1.0)
+    breaker.record_failure()
+    breaker.record_success(6.0)  # too slow, counts as a failure
+    return breaker
+
+
+def test_breaker_opens_on_failure_rate_and_blocks_calls(clock):
+    breaker = open_breaker(clock)
+    assert breaker.state == OPEN and breaker.times_opened == 1
+    clock.now = 29.9
+    assert not breaker.allow()
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success(clock):
+    breaker = open_breaker(clock)
+    clock.now = 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success(1.0)
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_probe_reopens_and_abandoned_probe_frees_the_slot(clock):
+    breaker = open_breaker(clock)
+    clock.now = 30
+    assert breaker.allow()
+    breaker.abandon()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.times_opened == 2
+    clock.now = 59
+    assert not breaker.allow()
+
+
+def attempts(*behaviours):
+    """A call that runs the next (delay, result or exception) each time it is started"""
+    started = []
+
+    async def call():
+        delay, outcome = behaviours[len(started)]
+        started.append(delay)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return call, started
+
+
+def test_hedge_starts_at_once_when_the_first_attempt_fails():
+    call, started = attempts((0, RuntimeError("boom")), (0, "second"))
+    result = asyncio.run(hedged(call, hedge_after=10, deadline=1))
+    assert result == "second" and len(started) == 2
+
+
+def test_hedge_wins_over_a_slow_first_attempt():
+    call, started = attempts((5, "first"), (0, "second"))
+    result = asyncio.run(asyncio.wait_for(hedged(call, hedge_after=0.01, deadline=1), 2))
+    assert result == "second" and len(started) == 2
+
+
+def test_hedge_raises_when_both_attempts_fail_or_the_deadline_passes():
+    call, _ = attempts((0, RuntimeError("one")), (0, RuntimeError("two")))
+    with pytest.raises(RuntimeError, match="two"):
+        asyncio.run(hedged(call, hedge_after=0.01, deadline=1))
+    call, _ = attempts((5, "first"), (5, "second"))
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(hedged(call, hedge_after=0.01, deadline=0.05))
+
+
+async def chunks(first_delay, delay, count):
+    await asyncio.sleep(first_delay)
+    for index in range(count):
+        yield index
+        await asyncio.sleep(delay)
+
+
+def collect(items, first_item_timeout, deadline):
+    async def scenario():
+        seen = []
+        try:
+            async for item in iterate_with_deadline(items, first_item_timeout, deadline):
+                seen.append(item)
+        except asyncio.TimeoutError:
+            return seen, True
+        return seen, False
+
+    return asyncio.run(scenario())
+
+
+def test_iterate_with_deadline_passes_a_timely_stream_through():
+    assert collect(chunks(0, 0, 3), 0.5, 1) == ([0, 1, 2], False)
+
+
+def test_iterate_with_deadline_times_out_on_a_late_first_item_or_overall():
+    assert collect(chunks(0.2, 0, 3), 0.02, 1) == ([], True)
+    seen, timed_out = collect(chunks(0, 0.02, 100), 0.5, 0.1)
+    assert timed_out and 0 < len(seen) < 100
+
+
+def test_sos_fallback_always_answers_with_the_crisis_line():
+    responder = FallbackResponder()
+    for message in ["I'm having an urge", "", "help", "🆘" * 200]:
+        reply = responder.reply(message, sos=True)
+        assert reply.startswith("🫂Alex: ") and reply.endswith(CRISIS_LINE)
+        assert reply == responder.reply(message, sos=True)
+    assert CRISIS_LINE not in responder.reply("hi")
+    assert responder.served == 9
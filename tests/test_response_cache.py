@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from response_cache import CHAT, SOS, ResponseCache
+
+USER = {"id": "u1", "name": "Sam", "current_streak": 4}
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache()
+
+
+@pytest.mark.parametrize("message", [
+    "[SOS - URGENT SUPPORT NEEDED] I'm having an urge right now!",
+    "having urges now",
+    "the cravings are bad right now",
+])
+def test_near_duplicate_sos_gets_personalised_template(cache, message):
+    reply = cache.lookup(USER, SOS, message)
+    assert reply is not None and "Sam" in reply and "4 days" in reply
+
+
+def test_negated_message_misses(cache):
+    assert cache.lookup(USER, SOS, "I'm having an urge right now") is not None
+    assert cache.lookup(USER, SOS, "I'm not having an urge right now") is None
+    assert cache.lookup(USER, CHAT, "I'm not struggling today, great day") is None
+
+
+@pytest.mark.parametrize("message", [
+    "I'm having an urge to hurt myself right now",
+    "I'm having an urge to kill myself right now",
+    "I'm having urges, I want to die",
+    "I'm having an urge to end it right now",
+    "thinking about suicide right now",
+    "the cravings are really bad right now and I have pills",
+    "I'm having an urge right now, I have a knife",
+    "I'm about to relapse and overdose",
+])
+def test_crisis_messages_always_bypass_the_cache(cache, message):
+    assert cache.lookup(USER, SOS, message) is None
+    cache.store(USER["id"], SOS, message, "an earlier reply")
+    assert cache.lookup(USER, SOS, message) is None
+    assert cache.stats()["crisis_bypassed"] == 2
+
+
+def test_learned_replies_stay_with_their_user_and_expire():
+    now = [0.0]
+    cache = ResponseCache(ttl_seconds=10, clock=lambda: now[0])
+    cache.store("u1", SOS, "my boss yelled at me and I want to drink", "LLM reply")
+    assert cache.lookup(USER, SOS, "My boss yelled at me, and I want to drink!") == "LLM reply"
+    assert cache.lookup({"id": "u2"}, SOS, "my boss yelled at me and I want to drink") is None
+    now[0] = 11
+    assert cache.lookup(USER, SOS, "my boss yelled at me and I want to drink") is None
+    assert cache.stats()["expired"] == 1
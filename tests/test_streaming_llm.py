@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+import streaming_llm
+from streaming_llm import LiteLlmChat
+
+
+class FakeLitellm:
+    """Records acompletion calls and streams the reply in pieces"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    async def acompletion(self, stream=False, **kwargs):
+        self.calls.append({**kwargs, "stream": stream})
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+        async def parts():
+            for start in range(0, len(self.reply), 4):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.reply[start:start + 4]))])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None))])
+
+        return parts()
+
+
+def test_stream_message_yields_provider_chunks_and_keeps_history(monkeypatch):
+    fake = FakeLitellm("🫂Alex: breathe with me")
+    monkeypatch.setattr(streaming_llm, "litellm", fake)
+    chat = LiteLlmChat(api_key="key", session_id="s1", system_message="SYSTEM").with_model("anthropic", "claude")
+
+    async def scenario():
+        chunks = [chunk async for chunk in chat.stream_message(SimpleNamespace(text="help"))]
+        reply = await chat.send_message(SimpleNamespace(text="thanks"))
+        return chunks, reply
+
+    chunks, reply = asyncio.run(scenario())
+    assert len(chunks) > 1 and "".join(chunks) == fake.reply == reply
+    first, second = fake.calls
+    assert first["stream"] and first["model"] == "anthropic/claude" and first["api_key"] == "key"
+    assert first["messages"] == [{"role": "system", "content": "SYSTEM"}, {"role": "user", "content": "help"}]
+    assert second["messages"][1:] == [
+        {"role": "user", "content": "help"},
+        {"role": "assistant", "content": fake.reply},
+        {"role": "user", "content": "thanks"},
+    ]
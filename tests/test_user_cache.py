@@ -0,0 +1,70 @@
+import asyncio
+
+from user_cache import UserCache, UserRepository
+
+
+class SlowUsers:
+    """users collection whose reads fetch at once but return only when `release` is set"""
+
+    def __init__(self, user_doc):
+        self.user_doc = user_doc
+        self.reading = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def find_one(self, query, projection=None):
+        user_doc = dict(self.user_doc)
+        self.reading.set()
+        await self.release.wait()
+        return user_doc
+
+    async def update_one(self, query, update):
+        self.user_doc.update(update["$set"])
+
+
+def test_invalidation_bumps_the_generation_and_drops_the_entry():
+    cache = UserCache()
+    cache.put("u1", {"id": "u1"})
+    assert cache.generation("u1") == 0
+    cache.invalidate("u1")
+    cache.invalidate("u1")
+    assert cache.generation("u1") == 2
+    assert cache.get("u1") is None
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_put_with_an_old_generation_is_ignored():
+    cache = UserCache()
+    generation = cache.generation("u1")
+    cache.invalidate("u1")
+    cache.put("u1", {"id": "u1", "streak": 1}, generation)
+    assert cache.get("u1") is None
+    cache.put("u1", {"id": "u1", "streak": 2}, cache.generation("u1"))
+    assert cache.get("u1") == {"id": "u1", "streak": 2}
+
+
+def test_write_during_an_in_flight_read_keeps_the_stale_copy_out_of_the_cache():
+    async def scenario():
+        users = SlowUsers({"id": "u1", "streak": 1})
+        repository = UserRepository(users, UserCache())
+        read = asyncio.create_task(repository.get("u1"))
+        await users.reading.wait()
+        # The read has fetched streak 1; a check-in updates the user before it is cached
+        await repository.update("u1", {"$set": {"streak": 2}})
+        users.release.set()
+        return await read, repository.cache.get("u1")
+
+    stale_read, cached = asyncio.run(scenario())
+    assert stale_read["streak"] == 1
+    assert cached is None
+
+
+def test_entries_expire_after_the_ttl_and_the_least_recently_used_is_evicted(clock):
+    cache = UserCache(max_entries=2, ttl=10, clock=clock)
+    cache.put("a", {"id": "a"})
+    cache.put("b", {"id": "b"})
+    cache.get("a")
+    cache.put("c", {"id": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": "a"}
+    clock.now = 10
+    assert cache.get("a") is None
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from write_behind import WriteBehindQueue
+
+
+def journal_line(entry_id, documents=None):
+    if documents is None:
+        return json.dumps({"id": entry_id, "done": True}) + "\n"
+    return json.dumps({"id": entry_id, "op": "insert_many", "collection": "chat_messages",
+                       "documents": documents}) + "\n"
+
+
+def read_journal(path):
+    with open(path) as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def run_queue(queue, body=None):
+    async def scenario():
+        await queue.start()
+        if body is not None:
+            await body(queue)
+        await queue.stop(timeout=2)
+        return await queue.db.chat_messages.find({}, {"_id": 0}).sort("id", 1).to_list(length=None)
+
+    return asyncio.run(scenario())
+
+
+def test_pending_journal_entries_are_replayed_on_start(tmp_path):
+    (tmp_path / "write_behind.0.jsonl").write_text(
+        journal_line("a", [{"id": "m1"}]) + journal_line("b", [{"id": "m2"}]) + journal_line("a")
+        + '{"id": "torn'
+    )
+    queue = WriteBehindQueue(mongomock_motor.AsyncMongoMockClient().aura_test, str(tmp_path), workers=1)
+    stored = run_queue(queue)
+    assert stored == [{"id": "m2"}]
+    assert queue.stats()["journaled"] == 0
+
+
+def test_orphaned_journals_are_adopted_and_emptied(tmp_path):
+    orphan = tmp_path / "write_behind.3.jsonl"
+    orphan.write_text(journal_line("c", [{"id": "m3"}]))
+    queue = WriteBehindQueue(mongomock_motor.AsyncMongoMockClient().aura_test, str(tmp_path), workers=1)
+    stored = run_queue(queue)
+    assert stored == [{"id": "m3"}]
+    assert queue.journal_path.endswith("write_behind.0.jsonl")
+    assert orphan.read_text() == ""
+
+
+def test_journal_is_compacted_while_writes_are_still_pending(tmp_path):
+    async def body(queue):
+        queue._pending["stuck"] = {"id": "stuck", "op": "insert_many", "collection": "chat_messages",
+                                   "documents": [{"id": "later"}]}
+        for index in range(5):
+            queue.submit_insert_many("chat_messages", [{"id": f"m{index}"}])
+        await queue._queue.join()
+
+    queue = WriteBehindQueue(mongomock_motor.AsyncMongoMockClient().aura_test, str(tmp_path), workers=1,
+                             compact_threshold=2)
+    run_queue(queue, body)
+    entries = read_journal(os.path.join(tmp_path, "write_behind.0.jsonl"))
+    # Five writes done against a threshold of 2: at most one done marker since the last compaction
+    assert len(entries) <= 3
+    assert {"id": "stuck"}.items() <= entries[0].items()
+
+
+class FailingCollection:
+    async def insert_many(self, documents, ordered=False):
+        raise ConnectionError("mongo unavailable")
+
+
+def test_writes_failing_max_attempts_times_go_to_the_dead_letter_file(tmp_path):
+    async def body(queue):
+        queue.submit_insert_many("chat_messages", [{"id": "m1"}])
+        for _ in range(100):
+            if queue.dead_lettered:
+                break
+            await asyncio.sleep(0.01)
+
+    class FailingDb(dict):
+        def __missing__(self, name):
+            return FailingCollection()
+
+    queue = WriteBehindQueue(FailingDb(), str(tmp_path), workers=1, retry_base_delay=0, max_attempts=3)
+
+    async def scenario():
+        await queue.start()
+        await body(queue)
+        await queue.stop(timeout=1)
+
+    asyncio.run(scenario())
+    assert queue.failures == 3 and queue.dead_lettered == 1
+    assert queue.stats()["journaled"] == 0
+    dead = read_journal(os.path.join(tmp_path, "dead_letter.jsonl"))
+    assert dead[0]["documents"] == [{"id": "m1"}] and "mongo unavailable" in dead[0]["error"]
+    # A restart doesn't replay it
+    with open(os.path.join(tmp_path, "write_behind.0.jsonl")) as journal:
+        assert WriteBehindQueue._read_pending(journal) == {}